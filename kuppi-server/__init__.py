@@ -1,7 +1,8 @@
-from flask import Flask
+import threading
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_mail import Mail
+from werkzeug.exceptions import RequestEntityTooLarge
 from config import Config
 from routes.auth_routes import auth_bp
 from routes.notes_routes import notes_bp
@@ -9,7 +10,12 @@ from routes.ocr_routes import ocr_bp
 from routes.password_reset_routes import pass_reset_bp
 from routes.generate_answer_routes import generate_answer_bp
 from routes.generate_summary_routes import generate_summary_bp
+from routes.pipeline_routes import pipeline_bp
+from routes.metrics_routes import metrics_bp
 from db import db
+from services.ocr_job_service import start_job_workers
+from services.email_service import start_mail_dispatcher
+from services.metrics_service import instrument_app, start_metrics_writer
 
 def create_app():
     app = Flask(__name__)
@@ -17,9 +23,13 @@ def create_app():
 
     CORS(app)
     JWTManager(app)
-    mail = Mail(app)  
 
     app.mongo = db
+    instrument_app(app)
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def request_too_large(e):
+        return jsonify({"error": f"Request is larger than {Config.MAX_CONTENT_LENGTH // (1024 * 1024)} MB"}), 413
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(notes_bp)
@@ -27,5 +37,23 @@ def create_app():
     app.register_blueprint(ocr_bp)
     app.register_blueprint(generate_answer_bp)
     app.register_blueprint(generate_summary_bp)
+    app.register_blueprint(pipeline_bp)
+    app.register_blueprint(metrics_bp)
 
     return app
+
+def start_background_workers():
+    """Starts this API process's OCR job workers, mail dispatcher and metrics writer.
+
+    Kept out of create_app so importing the app (tests, OCR pool children
+    re-importing app.py) never starts threads; gunicorn calls this from its
+    post_fork hook (gunicorn.conf.py) and app.py when run directly.
+    """
+    if Config.OCR_JOB_EMBEDDED_WORKERS > 0:
+        start_job_workers(Config.OCR_JOB_EMBEDDED_WORKERS, threading.Event())
+
+    if Config.MAIL_DISPATCHER_ENABLED:
+        start_mail_dispatcher(threading.Event())
+
+    if Config.METRICS_DIR:
+        start_metrics_writer(threading.Event())
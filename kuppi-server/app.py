@@ -1,6 +1,10 @@
-from __init__ import create_app
+import os
+from __init__ import create_app, start_background_workers
 
 app = create_app()
 
 if __name__ == '__main__':
+    # The debug reloader runs this file twice; only its child serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""Micro-benchmark for single-note lookups.
+
+Seeds users with 10, 1,000 and 10,000 notes in a scratch database and times
+``find_note`` (indexed lookup in the notes collection, ``$elemMatch``
+projection for embedded notes) against the old approach of loading the user
+document and scanning ``user["notes"]`` in Python.
+
+Needs a reachable MongoDB. Run from the kuppi-server directory:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_note_lookup
+"""
+import datetime
+import random
+import statistics
+import time
+from bson import ObjectId
+from db import client
+import services.notes_service as notes_service
+
+NOTE_COUNTS = [10, 1000, 10000]
+LOOKUPS = 200
+NOTE_CONTENT = "මෙය පරීක්ෂණ සටහනකි. " * 40
+
+
+def seed(bench_db, count):
+    email = f"bench-{count}@example.com"
+    notes = [{
+        "_id": ObjectId(),
+        "title": f"Note {i}",
+        "content": NOTE_CONTENT,
+        "created_at": datetime.datetime.now(datetime.timezone.utc)
+    } for i in range(count)]
+
+    bench_db["users"].insert_one({"email": email, "notes": notes})
+    bench_db["notes"].insert_many([dict(note, owner=email) for note in notes])
+    return email, [note["_id"] for note in notes]
+
+
+def time_lookups(lookup, email, note_ids):
+    samples = []
+    for note_id in random.choices(note_ids, k=LOOKUPS):
+        start = time.perf_counter()
+        lookup(email, note_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), statistics.quantiles(samples, n=100)[98]
+
+
+def linear_scan(email, note_id):
+    user = notes_service.users_collection.find_one({"email": email})
+    return next((note for note in user.get("notes", []) if str(note.get("_id")) == str(note_id)), None)
+
+
+def embedded_elem_match(email, note_id):
+    return notes_service.users_collection.find_one({"email": email}, {"notes": {"$elemMatch": {"_id": note_id}}})
+
+
+def main():
+    bench_db = client["KuppiBench"]
+    client.drop_database(bench_db.name)
+    bench_db["notes"].create_index([("owner", 1), ("_id", 1)])
+    bench_db["users"].create_index("email", unique=True)
+
+    # Point the service at the scratch database
+    notes_service.users_collection = bench_db["users"]
+    notes_service.notes_collection = bench_db["notes"]
+
+    print(f"{'notes':>8} {'strategy':>22} {'p50 ms':>9} {'p99 ms':>9}")
+    try:
+        for count in NOTE_COUNTS:
+            email, note_ids = seed(bench_db, count)
+            strategies = [
+                ("linear scan (old)", linear_scan),
+                ("$elemMatch embedded", embedded_elem_match),
+                ("notes collection", notes_service.find_note),
+            ]
+            for name, lookup in strategies:
+                p50, p99 = time_lookups(lookup, email, note_ids)
+                print(f"{count:>8} {name:>22} {p50:>9.2f} {p99:>9.2f}")
+    finally:
+        client.drop_database(bench_db.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compares per-image OCR latency of the pytesseract and tesserocr backends.
+
+pytesseract starts a tesseract process and loads sin.traineddata for every
+image; tesserocr keeps one API handle with the model loaded. The gap is
+largest on small, receipt-sized images where start-up dominates.
+
+Needs the tesseract binary and sin.traineddata (as installed by the
+Dockerfile). Run from the kuppi-server directory:
+
+    python -m benchmarks.bench_ocr_backends --images path/to/receipts
+    python -m benchmarks.bench_ocr_backends --font NotoSansSinhala-Regular.ttf
+
+Without --images, receipt-sized images are drawn with --font (a font with
+Sinhala glyphs gives realistic text; the default font is used otherwise).
+"""
+import argparse
+import os
+import statistics
+import time
+import pytesseract
+import tesserocr
+from PIL import Image, ImageDraw, ImageFont
+from config import Config
+from services.ocr_worker import OCR_LANGUAGE
+
+RECEIPT_SIZE = (400, 600)
+SAMPLE_LINES = [
+    "ශ්‍රී ලංකා විශ්වවිද්‍යාලය",
+    "රසායන විද්‍යාව - දේශනය 3",
+    "පරමාණුක ව්‍යුහය සහ බන්ධන",
+    "ඉලෙක්ට්‍රෝන වින්‍යාසය",
+    "මුළු ලකුණු: 75",
+]
+
+
+def synthetic_images(font_path, count):
+    font = ImageFont.truetype(font_path, 24) if font_path else ImageFont.load_default()
+    images = []
+    for index in range(count):
+        image = Image.new("L", RECEIPT_SIZE, 255)
+        draw = ImageDraw.Draw(image)
+        for line_number, line in enumerate(SAMPLE_LINES):
+            draw.text((20, 30 + line_number * 50), f"{line} {index}", fill=0, font=font)
+        images.append(image)
+    return images
+
+
+def load_images(directory):
+    return [
+        Image.open(os.path.join(directory, name)).convert("L")
+        for name in sorted(os.listdir(directory))
+        if name.lower().endswith((".png", ".jpg", ".jpeg", ".tif", ".tiff"))
+    ]
+
+
+def measure(recognize, images, iterations):
+    samples = []
+    for _ in range(iterations):
+        for image in images:
+            start = time.perf_counter()
+            recognize(image)
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), statistics.quantiles(samples, n=20)[18]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="directory of sample images")
+    parser.add_argument("--font", help="TTF font used for synthetic images")
+    parser.add_argument("--count", type=int, default=10, help="number of synthetic images")
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_images(args.images) if args.images else synthetic_images(args.font, args.count)
+    if Config.TESSERACT_PATH:
+        pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_PATH
+
+    def with_pytesseract(image):
+        return pytesseract.image_to_string(image, lang=OCR_LANGUAGE)
+
+    api_options = {"path": Config.TESSDATA_PATH} if Config.TESSDATA_PATH else {}
+    with tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE, **api_options) as api:
+        def with_tesserocr(image):
+            api.SetImage(image)
+            return api.GetUTF8Text()
+
+        print(f"{len(images)} images of {images[0].size[0]}x{images[0].size[1]}, {args.iterations} iterations")
+        print(f"{'backend':>12} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, recognize in [("pytesseract", with_pytesseract), ("tesserocr", with_tesserocr)]:
+            p50, p95 = measure(recognize, images, args.iterations)
+            print(f"{name:>12} {p50:>9.1f} {p95:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compares OCR preprocessing profiles on sample pages.
+
+For every profile, reports preprocessing and OCR time, peak Python memory
+during preprocessing (tracemalloc) and the character error rate against
+ground truth. Each sample image needs a UTF-8 ``.txt`` file of the same
+name holding the page's correct text.
+
+Needs the tesseract binary and sin.traineddata (as installed by the
+Dockerfile). Run from the kuppi-server directory:
+
+    python -m benchmarks.bench_ocr_preprocessing --images path/to/pages
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+import unicodedata
+import pytesseract
+from config import Config
+from services.ocr_preprocessing import PROFILES, preprocess
+from services.ocr_worker import OCR_LANGUAGE
+
+
+def load_samples(directory):
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        truth_path = os.path.join(directory, f"{stem}.txt")
+        if extension.lower() in (".png", ".jpg", ".jpeg", ".tif", ".tiff") and os.path.exists(truth_path):
+            with open(truth_path, encoding="utf-8") as truth:
+                samples.append((os.path.join(directory, name), truth.read()))
+    return samples
+
+
+def _normalize(text):
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def character_error_rate(recognized, truth):
+    """Levenshtein distance between the texts over the length of the truth."""
+    recognized, truth = _normalize(recognized), _normalize(truth)
+    previous = list(range(len(recognized) + 1))
+    for i, truth_char in enumerate(truth, 1):
+        current = [i]
+        for j, recognized_char in enumerate(recognized, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (truth_char != recognized_char)
+            ))
+        previous = current
+    return previous[-1] / max(len(truth), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="directory of sample images with .txt ground truth")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    samples = load_samples(args.images)
+    if not samples:
+        parser.error("no images with matching .txt ground truth found")
+    if Config.TESSERACT_PATH:
+        pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_PATH
+
+    print(f"{len(samples)} pages")
+    print(f"{'profile':>10} {'prep ms':>9} {'ocr ms':>9} {'peak MB':>9} {'CER':>7}")
+    for profile in args.profiles:
+        preprocess_ms, ocr_ms, peaks, error_rates = [], [], [], []
+        for path, truth in samples:
+            tracemalloc.start()
+            start = time.perf_counter()
+            image = preprocess(path, profile)
+            image.load()
+            preprocess_ms.append((time.perf_counter() - start) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 2 ** 20)
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            text = pytesseract.image_to_string(image, lang=OCR_LANGUAGE)
+            ocr_ms.append((time.perf_counter() - start) * 1000)
+            error_rates.append(character_error_rate(text, truth))
+
+        print(
+            f"{profile:>10} {statistics.median(preprocess_ms):>9.1f} {statistics.median(ocr_ms):>9.1f} "
+            f"{max(peaks):>9.1f} {statistics.mean(error_rates):>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Throughput of OTP issue + verify cycles for each OTP store backend.
+
+Each cycle issues an OTP for a fresh email, submits one wrong code and then
+the right one, as a user mistyping once would. The Mongo backend runs
+against a scratch database, alongside the read-check-write sequence the
+services used before the store existed (find_one for the cooldown, an
+upsert, then find_one / $inc / delete_one to verify).
+
+Mongo results need a reachable MongoDB; without one only the memory
+backend is measured. Run from the kuppi-server directory:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_otp_store --threads 8
+"""
+import argparse
+import datetime
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import PyMongoError
+from db import client
+from services.otp_store import MemoryOTPStore, MongoOTPStore
+
+TTL_SECONDS = 600
+COOLDOWN_SECONDS = 60
+MAX_ATTEMPTS = 3
+
+
+class LegacyOTPFlow:
+    """The services' previous sequence of separate reads and writes."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def issue(self, email, otp, ttl_seconds, cooldown_seconds):
+        entry = self._collection.find_one({"email": email})
+        if entry and (datetime.datetime.now() - entry["timestamp"]).total_seconds() < cooldown_seconds:
+            return False
+        self._collection.update_one(
+            {"email": email},
+            {"$set": {"otp": otp, "timestamp": datetime.datetime.now(), "attempts": 0}},
+            upsert=True
+        )
+        return True
+
+    def verify(self, email, otp, max_attempts):
+        entry = self._collection.find_one({"email": email})
+        if not entry or entry["attempts"] >= max_attempts:
+            return False
+        if otp != entry["otp"]:
+            self._collection.update_one({"email": email}, {"$inc": {"attempts": 1}})
+            return False
+        self._collection.delete_one({"email": email})
+        return True
+
+
+def cycle(store):
+    email = f"{uuid.uuid4().hex}@example.com"
+    store.issue(email, "123456", TTL_SECONDS, COOLDOWN_SECONDS)
+    store.verify(email, "000000", MAX_ATTEMPTS)
+    store.verify(email, "123456", MAX_ATTEMPTS)
+
+
+def cycles_per_second(store, threads, count):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: cycle(store), range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--cycles", type=int, default=2000)
+    args = parser.parse_args()
+
+    stores = [("memory", MemoryOTPStore())]
+    bench_db = client["KuppiBench"]
+    try:
+        client.drop_database(bench_db.name)
+        for name in ["otp_store", "otp_legacy"]:
+            bench_db[name].create_index("email", unique=True)
+        stores += [
+            ("mongo", MongoOTPStore(bench_db["otp_store"])),
+            ("mongo, read-check-write (old)", LegacyOTPFlow(bench_db["otp_legacy"])),
+        ]
+    except PyMongoError as e:
+        print(f"MongoDB not reachable, measuring the memory backend only: {e}")
+
+    print(f"{args.cycles} issue/verify cycles on {args.threads} threads")
+    print(f"{'backend':>30} {'cycles/s':>10}")
+    try:
+        for name, store in stores:
+            print(f"{name:>30} {cycles_per_second(store, args.threads, args.cycles):>10.0f}")
+    finally:
+        if len(stores) > 1:
+            client.drop_database(bench_db.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Measures login throughput under different password hashing parameters.
+
+A login is one ``check_password_hash``, so checks per second on one thread
+are logins per second per core. With --threads the same checks run on a
+thread pool, as in services.password_hash_service, to show how far they
+scale across cores (hashlib releases the GIL while hashing). scrypt also
+needs 128 * n * r bytes of memory per hash in flight.
+
+Needs nothing beyond the Python requirements. Run from the kuppi-server
+directory:
+
+    python -m benchmarks.bench_password_hash
+    python -m benchmarks.bench_password_hash --threads 4 --method scrypt:65536:8:1
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+
+METHODS = [
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:260000",
+    "scrypt:32768:8:1",
+    "scrypt:16384:8:1",
+]
+PASSWORD = "correct horse battery staple"
+
+
+def logins_per_second(password_hash, threads, duration):
+    checks = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        while time.perf_counter() - start < duration:
+            list(executor.map(lambda _: check_password_hash(password_hash, PASSWORD), range(threads)))
+            checks += threads
+    return checks / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--method", action="append", help="werkzeug method to measure (repeatable)")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per method")
+    args = parser.parse_args()
+
+    methods = args.method or sorted(set(METHODS + [Config.PASSWORD_HASH_METHOD]))
+    print(f"{args.threads} thread(s), {args.duration:.0f} s per method; configured: {Config.PASSWORD_HASH_METHOD}")
+    print(f"{'method':>24} {'ms/login':>9} {'logins/s':>9} {'per core':>9}")
+    for method in methods:
+        password_hash = generate_password_hash(PASSWORD, method=method)
+        rate = logins_per_second(password_hash, args.threads, args.duration)
+        print(f"{method:>24} {1000 / rate * args.threads:>9.1f} {rate:>9.1f} {rate / args.threads:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,106 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_USERNAME') 
+    # Emails go through a MongoDB outbox drained by a dispatcher thread per
+    # API worker, which keeps its SMTP connection open between messages
+    MAIL_DISPATCHER_ENABLED = os.getenv('MAIL_DISPATCHER_ENABLED', 'true').lower() == 'true'
+    MAIL_TIMEOUT_SECONDS = int(os.getenv('MAIL_TIMEOUT_SECONDS', 20))
+    # Gmail drops idle connections after a few minutes; reconnect before that
+    MAIL_IDLE_SECONDS = int(os.getenv('MAIL_IDLE_SECONDS', 120))
+    MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', 5))
+    MAIL_RETRY_BASE_SECONDS = int(os.getenv('MAIL_RETRY_BASE_SECONDS', 5))
+    MAIL_OUTBOX_TTL_SECONDS = int(os.getenv('MAIL_OUTBOX_TTL_SECONDS', 24 * 60 * 60))
     MONGO_URI = os.getenv('MONGO_URI')
+    # Connection pool per process. Requests wait at most
+    # MONGO_WAIT_QUEUE_TIMEOUT_MS for a free connection, then fail.
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 2))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000))
+    # How long migrations (index creation on start up) wait for MongoDB
+    MONGO_MIGRATION_TIMEOUT_MS = int(os.getenv('MONGO_MIGRATION_TIMEOUT_MS', 5000))
+    # Comma-separated wire compressors in order of preference: zlib, or
+    # zstd / snappy with their Python packages installed. Empty disables it.
+    MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')
     TESSERACT_PATH = os.getenv('TESSERACT_PATH')
-    GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
\ No newline at end of file
+    GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+
+    # "mongo", or "memory" for tests and single-process deployments
+    OTP_STORE = os.getenv('OTP_STORE', 'mongo')
+
+    # Authenticated requests look the user up in a per-worker cache first.
+    # A deleted user can pass the check for up to the TTL.
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', 60))
+
+    # Metrics are served at /metrics. With several gunicorn workers, point
+    # METRICS_DIR at a directory they share (emptied on each deploy): every
+    # worker writes its metrics there each METRICS_FLUSH_SECONDS and the
+    # scraped worker merges them.
+    METRICS_DIR = os.getenv('METRICS_DIR')
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+
+    # Any werkzeug hashing method; missing cost parameters take werkzeug's
+    # defaults. Stored hashes carry the method they were made with; older
+    # ones are rehashed on login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Hashing runs on a thread pool (hashlib releases the GIL); requests
+    # beyond workers + queue size get a 503
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 16))
+    PASSWORD_HASH_TIMEOUT_SECONDS = int(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+    PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv('PASSWORD_HASH_RETRY_AFTER_SECONDS', 2))
+
+    # Generated summaries are cached per worker (LRU) and in MongoDB
+    SUMMARY_CACHE_MEMORY_SIZE = int(os.getenv('SUMMARY_CACHE_MEMORY_SIZE', 256))
+    SUMMARY_CACHE_TTL_SECONDS = int(os.getenv('SUMMARY_CACHE_TTL_SECONDS', 7 * 24 * 60 * 60))
+    SUMMARY_CACHE_MAX_DOCUMENTS = int(os.getenv('SUMMARY_CACHE_MAX_DOCUMENTS', 10000))
+
+    # Notes longer than the threshold are summarized chunk by chunk in parallel
+    SUMMARY_CHUNK_THRESHOLD_CHARS = int(os.getenv('SUMMARY_CHUNK_THRESHOLD_CHARS', 12000))
+    SUMMARY_CHUNK_CHARS = int(os.getenv('SUMMARY_CHUNK_CHARS', 6000))
+    SUMMARY_MAX_WORKERS = int(os.getenv('SUMMARY_MAX_WORKERS', 4))
+    # Inputs longer than this are trimmed with the local extractive summarizer
+    # before being sent to Gemini
+    SUMMARY_PRESHRINK_CHARS = int(os.getenv('SUMMARY_PRESHRINK_CHARS', 60000))
+
+    # Number of note passages put in the prompt when answering from notes
+    ANSWER_TOP_K_PASSAGES = int(os.getenv('ANSWER_TOP_K_PASSAGES', 5))
+
+    # Flask rejects larger request bodies with 413 before reading them
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 100 * 1024 * 1024))
+    # Per uploaded image or PDF. Images are checked from their header before
+    # any pixels are decoded.
+    OCR_MAX_UPLOAD_BYTES = int(os.getenv('OCR_MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+    OCR_MAX_IMAGE_PIXELS = int(os.getenv('OCR_MAX_IMAGE_PIXELS', 50000000))
+
+    # OCR runs in a process pool; jobs beyond workers + queue size get a 503
+    OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+    OCR_QUEUE_SIZE = int(os.getenv('OCR_QUEUE_SIZE', 8))
+    OCR_TIMEOUT_SECONDS = int(os.getenv('OCR_TIMEOUT_SECONDS', 30))
+    OCR_REQUEST_TIMEOUT_SECONDS = int(os.getenv('OCR_REQUEST_TIMEOUT_SECONDS', 60))
+    OCR_RETRY_AFTER_SECONDS = int(os.getenv('OCR_RETRY_AFTER_SECONDS', 5))
+    # "tesserocr" keeps a warm Tesseract API per OCR worker, "pytesseract"
+    # runs the tesseract binary per image, "auto" prefers tesserocr
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto')
+    TESSDATA_PATH = os.getenv('TESSDATA_PATH')
+    # One of services.ocr_preprocessing.PROFILES: none, fast, standard, full
+    OCR_PREPROCESSING_PROFILE = os.getenv('OCR_PREPROCESSING_PROFILE', 'standard')
+    # OCR results are cached per worker (LRU) and in MongoDB, keyed by the
+    # image's SHA-256. With OCR_CACHE_PERCEPTUAL=true a perceptual hash is
+    # also stored, so re-encoded or resized copies of an image hit as well.
+    OCR_CACHE_MEMORY_SIZE = int(os.getenv('OCR_CACHE_MEMORY_SIZE', 512))
+    OCR_CACHE_TTL_SECONDS = int(os.getenv('OCR_CACHE_TTL_SECONDS', 30 * 24 * 60 * 60))
+    OCR_CACHE_MAX_DOCUMENTS = int(os.getenv('OCR_CACHE_MAX_DOCUMENTS', 50000))
+    OCR_CACHE_PERCEPTUAL = os.getenv('OCR_CACHE_PERCEPTUAL', 'false').lower() == 'true'
+    # Batch OCR keeps up to OCR_WORKERS pages in flight per request
+    OCR_MAX_BATCH_PAGES = int(os.getenv('OCR_MAX_BATCH_PAGES', 50))
+
+    # Asynchronous OCR jobs are queued in MongoDB. Each API worker drains the
+    # queue with OCR_JOB_EMBEDDED_WORKERS threads; set it to 0 when running
+    # `python -m workers.ocr_job_worker` separately.
+    OCR_JOB_EMBEDDED_WORKERS = int(os.getenv('OCR_JOB_EMBEDDED_WORKERS', 1))
+    OCR_JOB_RESULT_TTL_SECONDS = int(os.getenv('OCR_JOB_RESULT_TTL_SECONDS', 24 * 60 * 60))
+    OCR_JOB_LEASE_SECONDS = int(os.getenv('OCR_JOB_LEASE_SECONDS', 120))
+    OCR_JOB_MAX_ATTEMPTS = int(os.getenv('OCR_JOB_MAX_ATTEMPTS', 3))
+    OCR_JOB_POLL_SECONDS = float(os.getenv('OCR_JOB_POLL_SECONDS', 1))
@@ -1,9 +1,94 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, IndexModel, monitoring
+from pymongo.errors import OperationFailure
 from config import Config
 import atexit
+import metrics
+
+mongo_command_seconds = metrics.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command", "outcome")
+)
+mongo_pool_wait_seconds = metrics.histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection", ("outcome",)
+)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records the latency of every command by collection and command name."""
+
+    def __init__(self):
+        # Collection names by request, from started to succeeded/failed events
+        self._collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+
+    def _record(self, event, outcome):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name, outcome)
+
+    def succeeded(self, event):
+        self._record(event, "success")
+
+    def failed(self, event):
+        self._record(event, "failure")
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Records how long operations wait to check out a connection."""
+
+    def connection_checked_out(self, event):
+        mongo_pool_wait_seconds.observe(event.duration, "success")
+
+    def connection_check_out_failed(self, event):
+        # "timeout" when the pool stayed full for MONGO_WAIT_QUEUE_TIMEOUT_MS
+        mongo_pool_wait_seconds.observe(event.duration, event.reason)
+
+    # The base class requires every event; the rest are not recorded
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+def _client_options():
+    options = {
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "maxIdleTimeMS": Config.MONGO_MAX_IDLE_TIME_MS,
+        "event_listeners": [CommandMetrics(), PoolMetrics()]
+    }
+    if Config.MONGO_COMPRESSORS:
+        options["compressors"] = Config.MONGO_COMPRESSORS
+    return options
+
 
 # Create MongoDB Client
-client = MongoClient(Config.MONGO_URI)
+client = MongoClient(Config.MONGO_URI, **_client_options())
 db = client["KuppiDB"]
 
 # Define Collections
@@ -11,6 +96,73 @@ users_collection = db["users"]
 pending_users_collection = db["pending_users"]
 otp_storage_signup_collection = db["otp_storage_signup"]
 otp_storage_password_reset_collection = db["otp_storage_password_reset"]
+notes_collection = db["notes"]
+summary_cache_collection = db["summary_cache"]
+note_passages_collection = db["note_passages"]
+note_index_stats_collection = db["note_index_stats"]
+ocr_jobs_collection = db["ocr_jobs"]
+ocr_cache_collection = db["ocr_cache"]
+ocr_image_hashes_collection = db["ocr_image_hashes"]
+email_outbox_collection = db["email_outbox"]
+
+
+def _create_indexes(collection, indexes):
+    # One round trip per collection; if the batch fails, an index that cannot
+    # be built (e.g. duplicates under a unique index) should not stop the
+    # remaining ones from being created
+    try:
+        collection.create_indexes(indexes)
+        return
+    except OperationFailure:
+        pass
+    for index in indexes:
+        try:
+            collection.create_indexes([index])
+        except OperationFailure as e:
+            print(f"Error creating index on {collection.name}: {e}")
+
+
+def ensure_indexes(database=None):
+    """Creates the indexes the services rely on. Safe to run on every deploy.
+
+    Run by ``python -m migrations.create_indexes``, not at app start up.
+    """
+    database = db if database is None else database
+    # Let MongoDB purge expired documents. Documents carry their own UTC
+    # "expires_at", so expireAfterSeconds is 0.
+    expiry = IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    # Every auth and password reset lookup is by email
+    by_email = IndexModel([("email", ASCENDING)], unique=True)
+
+    indexes = {
+        "users": [by_email],
+        # Expired OTPs and abandoned sign ups are purged
+        "pending_users": [by_email, expiry],
+        "otp_storage_signup": [by_email, expiry],
+        "otp_storage_password_reset": [by_email, expiry],
+        # Notes are always read per owner, in (created_at, _id) keyset order or by id
+        "notes": [
+            IndexModel([("owner", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("owner", ASCENDING), ("_id", ASCENDING)])
+        ],
+        # Inverted index over note passages: a multikey index on the distinct
+        # terms finds candidate passages, the note_id index serves deletes
+        "note_passages": [
+            IndexModel([("owner", ASCENDING), ("terms", ASCENDING)]),
+            IndexModel([("owner", ASCENDING), ("note_id", ASCENDING)])
+        ],
+        # Cache entries expire on their own and the oldest are trimmed first
+        "summary_cache": [expiry],
+        "ocr_cache": [expiry],
+        # Perceptual hashes of cached images are looked up by their row bands
+        "ocr_image_hashes": [IndexModel([("bands", ASCENDING)]), expiry],
+        # OCR workers claim the oldest job by status; finished jobs expire
+        "ocr_jobs": [IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]), expiry],
+        # The mail dispatcher claims due messages; delivered ones expire
+        "email_outbox": [IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]), expiry],
+    }
+    for name, collection_indexes in indexes.items():
+        _create_indexes(database[name], collection_indexes)
 
 # Close MongoDB connection on exit
 atexit.register(client.close)
@@ -0,0 +1,15 @@
+# Read by gunicorn from the working directory (the Docker image's /app)
+import subprocess
+import sys
+
+
+def on_starting(server):
+    # Once per deploy, in a child process so the master never opens a
+    # MongoDB client before forking; a failure does not stop the API
+    subprocess.run([sys.executable, "-m", "migrations.create_indexes"], check=False)
+
+
+def post_fork(server, worker):
+    # Background threads must start in each worker, not in the master
+    from __init__ import start_background_workers
+    start_background_workers()
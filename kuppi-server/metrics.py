@@ -0,0 +1,302 @@
+"""In-process metrics: counters, gauges and latency histograms with labels.
+
+Metrics are registered once at import time and updated from any thread.
+Each update takes one short lock, so recording is cheap enough to leave on
+everywhere. ``collect()`` returns a snapshot of every metric.
+
+With several worker processes, each one periodically writes its snapshot
+to a shared directory (``write_snapshot``) and whichever worker is scraped
+merges them (``read_snapshots``) before rendering the Prometheus text
+format (``render``).
+"""
+import bisect
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+# Upper bounds in seconds; one more bucket catches everything slower
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, label_names):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {labels}")
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        self._check(labels)
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._series)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        self._check(labels)
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._series)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, label_names, buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        self._check(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """Returns ``{labels: {"buckets": [...], "sum": s, "count": n}}``."""
+        with self._lock:
+            return {
+                labels: {"buckets": list(counts), "sum": total, "count": count}
+                for labels, (counts, total, count) in self._series.items()
+            }
+
+
+def _register(metric_class, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = metric_class(name, *args, **kwargs)
+        elif not isinstance(metric, metric_class):
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+
+def counter(name, description, label_names=()):
+    """Returns the counter called ``name``, creating it on first use."""
+    return _register(Counter, name, description, label_names)
+
+
+def gauge(name, description, label_names=()):
+    """Returns the gauge called ``name``, creating it on first use."""
+    return _register(Gauge, name, description, label_names)
+
+
+def histogram(name, description, label_names=(), buckets=LATENCY_BUCKETS):
+    """Returns the histogram called ``name``, creating it on first use."""
+    return _register(Histogram, name, description, label_names, buckets=buckets)
+
+
+def collect():
+    """Snapshots every registered metric, sorted by name."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    return [(metric, metric.snapshot()) for metric in metrics]
+
+
+@contextlib.contextmanager
+def timed(histogram, *labels, gauge=None, gauge_labels=()):
+    """Times the block into ``histogram``, with an outcome label appended.
+
+    The outcome is "success", "failure" (an exception) or "cancelled" (a
+    generator closed mid-block, e.g. a client leaving a stream). ``gauge``
+    is raised by one while the block runs.
+    """
+    if gauge is not None:
+        gauge.inc(*gauge_labels)
+    outcome = "success"
+    start = time.perf_counter()
+    try:
+        yield
+    except GeneratorExit:
+        outcome = "cancelled"
+        raise
+    except BaseException:
+        outcome = "failure"
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, *labels, outcome)
+        if gauge is not None:
+            gauge.dec(*gauge_labels)
+
+
+def _to_family(metric, series):
+    family = {"name": metric.name, "kind": metric.kind, "description": metric.description, "label_names": list(metric.label_names)}
+    if metric.kind == "histogram":
+        family["buckets"] = list(metric.buckets)
+    family["series"] = [[list(labels), value] for labels, value in series.items()]
+    return family
+
+
+def families():
+    """Every registered metric as a JSON-serializable family."""
+    return [_to_family(metric, series) for metric, series in collect()]
+
+
+# (pid, token) of this process; a forked child gets a fresh token
+_process_token = None
+
+
+def _snapshot_name():
+    # The token keeps a worker that reuses a dead worker's pid from
+    # overwriting that worker's snapshot, and with it its totals
+    global _process_token
+    pid = os.getpid()
+    if _process_token is None or _process_token[0] != pid:
+        _process_token = (pid, uuid.uuid4().hex)
+    return f"{pid}-{_process_token[1]}.json"
+
+
+def write_snapshot(directory):
+    """Writes this process's metrics to ``<directory>/<pid>-<token>.json``.
+
+    The file is replaced atomically, so readers never see half of it.
+    """
+    path = os.path.join(directory, _snapshot_name())
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w") as snapshot:
+            json.dump({"pid": os.getpid(), "written_at": time.time(), "families": families()}, snapshot)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(merged, family, include_gauges):
+    if family["kind"] == "gauge" and not include_gauges:
+        return
+    target = merged.setdefault(family["name"], dict(family, series={}))
+    for labels, value in family["series"]:
+        key = tuple(labels)
+        current = target["series"].get(key)
+        if current is None:
+            target["series"][key] = value
+        elif family["kind"] == "histogram":
+            current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+            current["sum"] += value["sum"]
+            current["count"] += value["count"]
+        else:
+            target["series"][key] = current + value
+
+
+def read_snapshots(directory):
+    """Merges this process's live metrics with the other workers' snapshots.
+
+    Counters and histograms are summed over every snapshot, including those
+    of workers that have exited, so totals never go backwards while the
+    directory lives. Gauges only count live workers.
+    """
+    merged = {}
+    for family in families():
+        _merge(merged, family, include_gauges=True)
+
+    own_name = _snapshot_name()
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith(".json") or name == own_name:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as snapshot:
+                snapshots.append(json.load(snapshot))
+        except (OSError, ValueError):
+            continue  # Removed or being replaced; picked up next scrape
+
+    # Of several snapshots under a reused pid, only the newest can belong to
+    # the live process; older ones (and any under this process's pid) are dead
+    live = {}
+    for data in snapshots:
+        pid = data["pid"]
+        if pid == os.getpid() or not _process_alive(pid):
+            continue
+        if pid not in live or data.get("written_at", 0) > live[pid].get("written_at", 0):
+            live[pid] = data
+    for data in snapshots:
+        alive = live.get(data["pid"]) is data
+        for family in data["families"]:
+            _merge(merged, family, include_gauges=alive)
+
+    for family in merged.values():
+        family["series"] = [[list(labels), value] for labels, value in family["series"].items()]
+    return sorted(merged.values(), key=lambda family: family["name"])
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metric_families):
+    """Renders metric families in the Prometheus text exposition format."""
+    lines = []
+    for family in metric_families:
+        name, label_names = family["name"], family["label_names"]
+        description = family["description"].replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        for labels, value in sorted(family["series"], key=lambda series: series[0]):
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(family["buckets"] + [float("inf")], value["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(label_names, labels, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(label_names, labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,35 @@
+"""Rebuilds the per-user note passage index used for retrieval.
+
+Run from the kuppi-server directory after moving notes into the notes
+collection (or whenever the index needs to be rebuilt):
+
+    python -m migrations.build_note_index
+"""
+from db import notes_collection, ensure_indexes
+from services.note_index_service import index_note, remove_all_notes
+
+
+def rebuild_user_index(owner):
+    remove_all_notes(owner)
+    count = 0
+    for note in notes_collection.find({"owner": owner}, {"title": 1, "content": 1}):
+        index_note(owner, note["_id"], note.get("title", ""), note.get("content", ""))
+        count += 1
+    return count
+
+
+def rebuild_all():
+    ensure_indexes()
+
+    indexed_users = 0
+    indexed_notes = 0
+    for owner in notes_collection.distinct("owner"):
+        indexed_notes += rebuild_user_index(owner)
+        indexed_users += 1
+
+    return indexed_users, indexed_notes
+
+
+if __name__ == "__main__":
+    users, notes = rebuild_all()
+    print(f"Indexed {notes} notes for {users} users.")
@@ -0,0 +1,25 @@
+"""Creates the MongoDB indexes the services rely on.
+
+Run from the kuppi-server directory on each deploy (gunicorn.conf.py runs it
+once when gunicorn starts):
+
+    python -m migrations.create_indexes
+
+Gives up after MONGO_MIGRATION_TIMEOUT_MS if MongoDB cannot be reached.
+"""
+from pymongo import MongoClient
+from config import Config
+from db import ensure_indexes
+
+
+def create_indexes():
+    client = MongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=Config.MONGO_MIGRATION_TIMEOUT_MS)
+    try:
+        ensure_indexes(client["KuppiDB"])
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    create_indexes()
+    print("Indexes created.")
@@ -0,0 +1,69 @@
+"""One-shot migration: moves notes embedded in ``users.notes`` into the ``notes`` collection.
+
+Run from the kuppi-server directory:
+
+    python -m migrations.move_notes_to_collection
+
+The migration is idempotent. Existing note ids are kept and notes without
+one get an id derived from their user and position, so running it twice (or
+after a partial failure) does not duplicate notes.
+"""
+import datetime
+import hashlib
+from bson import ObjectId
+from pymongo import UpdateOne
+from db import users_collection, notes_collection, ensure_indexes
+from services.notes_service import make_preview
+
+
+def _embedded_note_id(user_id, index):
+    # Notes saved without an id get the same one on every run, so a re-run
+    # upserts them instead of copying them again. The array is only dropped
+    # once every note has been written, so the indexes do not shift.
+    return ObjectId(hashlib.sha256(f"{user_id}:{index}".encode()).digest()[:12])
+
+
+def migrate_user_notes(user):
+    """Copies one user's embedded notes into the notes collection and drops the array."""
+    operations = []
+    for index, note in enumerate(user.get("notes", [])):
+        note_id = note.get("_id") or _embedded_note_id(user["_id"], index)
+        operations.append(UpdateOne(
+            {"_id": note_id},
+            {"$setOnInsert": {
+                "owner": user["email"],
+                "title": note.get("title", ""),
+                "content": note.get("content", ""),
+                "preview": make_preview(note.get("content", "")),
+                "created_at": note.get("created_at") or datetime.datetime.now(datetime.timezone.utc)
+            }},
+            upsert=True
+        ))
+
+    if operations:
+        notes_collection.bulk_write(operations, ordered=False)
+
+    users_collection.update_one({"_id": user["_id"]}, {"$unset": {"notes": ""}})
+    return len(operations)
+
+
+def migrate_all():
+    ensure_indexes()
+
+    migrated_users = 0
+    migrated_notes = 0
+    # Users are streamed one at a time so only a single notes array is in memory
+    for user in users_collection.find({"notes": {"$exists": True}}, {"email": 1, "notes": 1}):
+        migrated_notes += migrate_user_notes(user)
+        migrated_users += 1
+
+    # Notes written before previews were stored get theirs computed once here
+    for note in notes_collection.find({"preview": {"$exists": False}}, {"content": 1}):
+        notes_collection.update_one({"_id": note["_id"]}, {"$set": {"preview": make_preview(note.get("content", ""))}})
+
+    return migrated_users, migrated_notes
+
+
+if __name__ == "__main__":
+    users, notes = migrate_all()
+    print(f"Migrated {notes} notes for {users} users.")
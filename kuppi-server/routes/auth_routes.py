@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.auth_service import signup_user_service, login_user_service, verify_signup_otp_service
-from db import users_collection
+from services.user_cache_service import get_user
+from config import Config
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -12,6 +13,8 @@ def signup_user():
         return jsonify({"error": "Email, name, and password are required!"}), 400
     
     response, status = signup_user_service(data["email"], data["name"], data["password"])
+    if status == 503:
+        return jsonify(response), status, {"Retry-After": str(Config.PASSWORD_HASH_RETRY_AFTER_SECONDS)}
     return jsonify(response), status
 
 @auth_bp.route("/verify-signup-otp", methods=["POST"])
@@ -30,13 +33,15 @@ def login_user():
         return jsonify({"error": "Email and password are required!"}), 400
 
     response, status = login_user_service(data["email"], data["password"])
+    if status == 503:
+        return jsonify(response), status, {"Retry-After": str(Config.PASSWORD_HASH_RETRY_AFTER_SECONDS)}
     return jsonify(response), status
 
 @auth_bp.route("/validate-token", methods=["POST"])
 @jwt_required()
 def validate_token():
     current_user_email = get_jwt_identity()
-    user = users_collection.find_one({"email": current_user_email})
+    user = get_user(current_user_email)
 
     if not user:
         return jsonify({"success": False, "error": "Invalid token or user not found"}), 404
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from services.generate_answer_service import generate_answer_service
+from services.generate_answer_service import generate_answer_service, stream_answer_service
+from services.streaming_service import sse_response
 
 generate_answer_bp = Blueprint("generate_answer", __name__)
 
@@ -9,4 +10,10 @@ generate_answer_bp = Blueprint("generate_answer", __name__)
 def generate_answer():
     data = request.json
     response, status = generate_answer_service(data)
-    return jsonify(response),status
\ No newline at end of file
+    return jsonify(response),status
+
+@generate_answer_bp.route("/generate-answer/stream", methods=["POST"])
+@jwt_required()
+def stream_answer():
+    data = request.json
+    return sse_response(stream_answer_service(data))
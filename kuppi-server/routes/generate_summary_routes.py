@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from services.generate_summary_service import generate_summary_service
+from services.generate_summary_service import generate_summary_service, stream_summary_service
+from services.streaming_service import sse_response
 
 generate_summary_bp = Blueprint("generate_summary", __name__)
 
@@ -9,4 +10,10 @@ generate_summary_bp = Blueprint("generate_summary", __name__)
 def generate_summary():
     data = request.json
     response, status = generate_summary_service(data)
-    return jsonify(response),status
\ No newline at end of file
+    return jsonify(response),status
+
+@generate_summary_bp.route("/generate-summary/stream", methods=["POST"])
+@jwt_required()
+def stream_summary():
+    data = request.json
+    return sse_response(stream_summary_service(data))
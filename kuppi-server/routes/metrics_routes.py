@@ -0,0 +1,8 @@
+from flask import Blueprint
+from services.metrics_service import metrics_text
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return metrics_text(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from services.notes_service import add_note_service, get_notes_service, get_note_by_id_service, delete_note_service, delete_all_notes_service
+from services.notes_service import add_note_service, get_notes_service, get_note_by_id_service, delete_note_service, delete_all_notes_service, search_notes_service, MAX_PAGE_SIZE
 
 notes_bp = Blueprint("notes", __name__)
 
@@ -14,7 +14,34 @@ def add_note():
 @notes_bp.route("/notes", methods=["GET"])
 @jwt_required()
 def get_notes():
-    response, status = get_notes_service()
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    response, status = get_notes_service(limit, request.args.get("after"))
+    return jsonify(response), status
+
+@notes_bp.route("/notes/search", methods=["GET"])
+@jwt_required()
+def search_notes():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Search query is required"}), 400
+
+    try:
+        limit = int(request.args.get("limit", 20))
+        page = int(request.args.get("page", 1))
+    except ValueError:
+        return jsonify({"error": "limit and page must be integers"}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE or page < 1:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE} and page at least 1"}), 400
+
+    response, status = search_notes_service(query, limit, page)
     return jsonify(response), status
 
 @notes_bp.route("/notes/<string:note_id>", methods=["GET"])
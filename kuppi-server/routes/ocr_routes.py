@@ -1,5 +1,10 @@
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from config import Config
 from services.ocr_service import extract_text_from_image
+from services.ocr_batch_service import start_batch_ocr
+from services.ocr_job_service import create_ocr_job_service, get_ocr_job_service
+from services.streaming_service import sse_response
 
 ocr_bp = Blueprint("ocr", __name__)
 
@@ -11,4 +16,33 @@ def ocr():
     image_file = request.files['image']
     result, status_code = extract_text_from_image(image_file)
 
-    return jsonify(result), status_code
\ No newline at end of file
+    if status_code == 503:
+        return jsonify(result), status_code, {"Retry-After": str(Config.OCR_RETRY_AFTER_SECONDS)}
+    return jsonify(result), status_code
+
+@ocr_bp.route('/ocr/batch', methods=['POST'])
+def ocr_batch():
+    # Either several "images" fields or one "pdf" field
+    batch, status_code = start_batch_ocr(request.files.getlist('images'), request.files.get('pdf'))
+    if status_code != 200:
+        return jsonify(batch), status_code
+
+    response = sse_response(batch["events"])
+    # Runs even if the client disconnects before the stream starts
+    response.call_on_close(batch["close"])
+    return response
+
+@ocr_bp.route('/ocr/jobs', methods=['POST'])
+@jwt_required()
+def create_ocr_job():
+    if 'image' not in request.files:
+        return jsonify({"error": "No image uploaded"}), 400
+
+    result, status_code = create_ocr_job_service(request.files['image'])
+    return jsonify(result), status_code
+
+@ocr_bp.route('/ocr/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_ocr_job(job_id):
+    result, status_code = get_ocr_job_service(job_id)
+    return jsonify(result), status_code
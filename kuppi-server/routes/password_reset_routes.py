@@ -1,4 +1,5 @@
 from flask import Blueprint, jsonify, request
+from config import Config
 from services.password_reset_service import request_password_reset_service, verify_password_reset_otp_service, reset_password_service
 
 pass_reset_bp = Blueprint("pass_reset", __name__)
@@ -29,4 +30,6 @@ def reset_password():
 
 
     response, status = reset_password_service(data["email"], data["newPassword"])
+    if status == 503:
+        return jsonify(response), status, {"Retry-After": str(Config.PASSWORD_HASH_RETRY_AFTER_SECONDS)}
     return jsonify(response), status
\ No newline at end of file
@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from services.pipeline_service import ocr_summary_pipeline
+from services.streaming_service import sse_response
+
+pipeline_bp = Blueprint("pipeline", __name__)
+
+@pipeline_bp.route("/pipeline/ocr-summary", methods=["POST"])
+@jwt_required()
+def ocr_summary():
+    if 'image' not in request.files:
+        return jsonify({"error": "No image uploaded"}), 400
+
+    try:
+        percentage = int(request.form.get("percentage", 50))
+    except ValueError:
+        return jsonify({"error": "percentage must be an integer"}), 400
+
+    save = request.form.get("save", "false").lower() == "true"
+    title = request.form.get("title")
+    if save and not title:
+        return jsonify({"error": "Title is required to save the note"}), 400
+
+    options = {
+        "percentage": percentage,
+        "style": request.form.get("style", "academic"),
+        "mode": request.form.get("mode"),
+        "include_text": request.form.get("include_text", "false").lower() == "true",
+        "save": save,
+        "title": title
+    }
+    return sse_response(ocr_summary_pipeline(request.files['image'], options))
@@ -1,40 +1,47 @@
 import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
-from services.otp_service import generate_otp
-from services.email_service import send_email
+from pymongo.errors import PyMongoError
+from services.otp_service import generate_otp, otp_error_response
+from services.otp_store import create_otp_store, VERIFIED
+from services.email_service import enqueue_email
+from services.user_cache_service import invalidate_user
+from services.password_hash_service import hash_password, verify_password, needs_rehash, busy_response, PasswordHashBusyError
 from db import users_collection, pending_users_collection, otp_storage_signup_collection
 
 MAX_OTP_ATTEMPTS = 3
 OTP_EXPIRY_SECONDS = 600  # 10 minutes
 OTP_REQUEST_COOLDOWN_SECONDS = 60  # 1 minute
 
+signup_otp_store = create_otp_store(otp_storage_signup_collection)
+
+
+def _expires_at(seconds):
+    # Read by the TTL indexes, which always compare against UTC
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+
 
 def signup_user_service(email, name, password):
     if not email or not password or not name:
         return {"error": "Email, name, and password are required!"}, 400
     
-    if users_collection.find_one({"email": email}):
+    if users_collection.find_one({"email": email}, {"_id": 1}):
         return {"error": "User already exists!"}, 400
     
-    otp_data = otp_storage_signup_collection.find_one({"email": email})
-    if otp_data and (datetime.datetime.now() - otp_data.get("timestamp")).total_seconds() < OTP_REQUEST_COOLDOWN_SECONDS:
-        return {"error": "Please wait before requesting another OTP."}, 429
-    
     otp = generate_otp()
+    if not signup_otp_store.issue(email, otp, OTP_EXPIRY_SECONDS, OTP_REQUEST_COOLDOWN_SECONDS):
+        return {"error": "Please wait before requesting another OTP."}, 429
+
+    try:
+        password_hash = hash_password(password)
+    except PasswordHashBusyError:
+        signup_otp_store.delete(email, otp)
+        return busy_response()
     
     try:
-        # Store OTP data in the OTP storage collection
-        otp_storage_signup_collection.update_one(
-            {"email": email},
-            {"$set": {"otp": otp, "timestamp": datetime.datetime.now(), "attempts": 0}},
-            upsert=True
-        )
-        
         # Store pending user data
         pending_users_collection.update_one(
             {"email": email},
-            {"$set": {"email": email, "name": name, "password": generate_password_hash(password)}},
+            {"$set": {"email": email, "name": name, "password": password_hash, "expires_at": _expires_at(OTP_EXPIRY_SECONDS)}},
             upsert=True
         )
         
@@ -75,37 +82,27 @@ def signup_user_service(email, name, password):
                 </div>
                 """
         
-        # Send the OTP email
-        if not send_email(email, subject, content):
-            # Clean up if email sending fails
-            otp_storage_signup_collection.delete_one({"email": email})
+        # Queue the OTP email; if it is never delivered the dispatcher drops
+        # this OTP, and the pending user expires on its own
+        cleanup = [{"collection": "otp_storage_signup", "filter": {"email": email, "otp": otp}}]
+        if not enqueue_email(email, subject, content, OTP_EXPIRY_SECONDS, cleanup):
+            # Clean up if the email could not be queued
+            signup_otp_store.delete(email, otp)
             pending_users_collection.delete_one({"email": email})
             return {"error": "Failed to send OTP. Please try again."}, 500
         
         return {"success": True, "message": "OTP sent to your email. Please verify to complete registration."}, 200
     except Exception as e:
         # Cleanup in case of any other errors
-        otp_storage_signup_collection.delete_one({"email": email})
+        signup_otp_store.delete(email, otp)
         pending_users_collection.delete_one({"email": email})
         return {"error": f"An error occurred: {str(e)}"}, 500
 
 
 def verify_signup_otp_service(email, otp):
-    otp_data = otp_storage_signup_collection.find_one({"email": email})
-    if not otp_data:
-        return {"error": "No OTP found for this email."}, 400
-    
-    if (datetime.datetime.now() - otp_data["timestamp"]).total_seconds() > OTP_EXPIRY_SECONDS:
-        otp_storage_signup_collection.delete_one({"email": email})
-        return {"error": "OTP has expired. Please request a new one."}, 400
-    
-    if otp_data["attempts"] >= MAX_OTP_ATTEMPTS:
-        otp_storage_signup_collection.delete_one({"email": email})
-        return {"error": "Too many incorrect attempts. Request a new OTP."}, 403
-    
-    if otp != otp_data["otp"]:
-        otp_storage_signup_collection.update_one({"email": email}, {"$inc": {"attempts": 1}})
-        return {"error": "Invalid OTP. Please try again."}, 400
+    result = signup_otp_store.verify(email, otp, MAX_OTP_ATTEMPTS)
+    if result != VERIFIED:
+        return otp_error_response(result)
     
     user_data = pending_users_collection.find_one_and_delete({"email": email})
     if not user_data:
@@ -114,24 +111,44 @@ def verify_signup_otp_service(email, otp):
     users_collection.insert_one({
         "email": user_data["email"],
         "password": user_data["password"],
-        "name": user_data["name"],
-        "notes": []
+        "name": user_data["name"]
     })
-    
-    otp_storage_signup_collection.delete_one({"email": email})
+    invalidate_user(email)
     
     token = create_access_token(identity=email, expires_delta=datetime.timedelta(days=10))
     
     return {"success": True, "token": token, "user": {"email": email, "name": user_data["name"]}}, 201
 
 
+def _rehash_password(email, old_hash, password):
+    """Upgrades a stored hash to the configured parameters after a successful login."""
+    try:
+        new_hash = hash_password(password)
+    except PasswordHashBusyError:
+        return  # Not worth failing the login over; the next one retries
+    try:
+        # Matching the old hash keeps a concurrent password reset from being overwritten
+        users_collection.update_one({"email": email, "password": old_hash}, {"$set": {"password": new_hash}})
+    except PyMongoError as e:
+        print(f"Error rehashing password: {e}")
+
+
 def login_user_service(email, password):
     if not email or not password:
         return {"error": "Email and password are required!"}, 400
     
-    user = users_collection.find_one({"email": email})
-    if not user or not check_password_hash(user["password"], password):
+    user = users_collection.find_one({"email": email}, {"email": 1, "name": 1, "password": 1})
+    if not user:
         return {"error": "Invalid email or password."}, 401
+
+    try:
+        if not verify_password(user["password"], password):
+            return {"error": "Invalid email or password."}, 401
+    except PasswordHashBusyError:
+        return busy_response()
+
+    if needs_rehash(user["password"]):
+        _rehash_password(email, user["password"], password)
     
     token = create_access_token(identity=email, expires_delta=datetime.timedelta(hours=24))
     
@@ -0,0 +1,87 @@
+import datetime
+import threading
+from cachetools import LRUCache
+from pymongo.errors import PyMongoError
+
+# How many writes go by between checks of the persistent tier's size
+TRIM_CHECK_INTERVAL = 100
+
+
+class TwoTierCache:
+    """A per-process LRU in front of a MongoDB collection.
+
+    Entries in the collection carry an ``expires_at`` (removed by a TTL
+    index) and the collection is trimmed, oldest first, once it grows past
+    ``max_documents``. The persistent tier is best-effort: if MongoDB is
+    unavailable the cache behaves like a miss instead of failing the request.
+    """
+
+    def __init__(self, collection, memory_size, ttl_seconds, max_documents):
+        self._collection = collection
+        self._memory = LRUCache(maxsize=memory_size)
+        self._ttl = datetime.timedelta(seconds=ttl_seconds)
+        self._max_documents = max_documents
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get(self, key):
+        with self._lock:
+            value = self._memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        try:
+            entry = self._collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.datetime.now(datetime.timezone.utc)}},
+                {"value": 1}
+            )
+        except PyMongoError as e:
+            print(f"Error reading cache: {e}")
+            entry = None
+
+        if not entry:
+            self._count("misses")
+            return None
+
+        with self._lock:
+            self._memory[key] = entry["value"]
+        self._count("persistent_hits")
+        return entry["value"]
+
+    def set(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._writes += 1
+            check_size = self._writes % TRIM_CHECK_INTERVAL == 0
+
+        try:
+            self._collection.update_one(
+                {"_id": key},
+                {"$set": {"value": value, "expires_at": datetime.datetime.now(datetime.timezone.utc) + self._ttl}},
+                upsert=True
+            )
+            if check_size:
+                self._trim()
+        except PyMongoError as e:
+            print(f"Error writing cache: {e}")
+
+    def _trim(self):
+        excess = self._collection.estimated_document_count() - self._max_documents
+        if excess <= 0:
+            return
+        oldest = self._collection.find({}, {"_id": 1}).sort("expires_at", 1).limit(excess)
+        self._collection.delete_many({"_id": {"$in": [entry["_id"] for entry in oldest]}})
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, memory_entries=len(self._memory))
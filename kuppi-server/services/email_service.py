@@ -1,13 +1,202 @@
-from flask_mail import Message
-from flask import current_app
+import datetime
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+from config import Config
+from db import db, email_outbox_collection
+from metrics import timed
+from services.metrics_service import smtp_send_seconds, dependency_in_flight
 
-def send_email(email, subject, content):
-    msg = Message(subject, recipients=[email])
-    msg.html = content
+# Collections a failed delivery may clean up, so an outbox entry can never
+# name an arbitrary collection
+CLEANUP_COLLECTIONS = {"otp_storage_signup", "otp_storage_password_reset"}
+
+# A dispatcher that died mid-send leaves its message to be retried after this
+SEND_LEASE_SECONDS = 120
+POLL_SECONDS = 5
+
+# Wakes the dispatcher of this process as soon as something is queued
+_wake = threading.Event()
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def enqueue_email(email, subject, content, deliver_within_seconds=None, on_failure=None):
+    """Queues an HTML email in the outbox and returns straight away.
+
+    ``on_failure`` is a list of ``{"collection", "filter"}`` deletes to run
+    if the message can never be delivered, e.g. of the OTP it carries; the
+    filter should match that OTP only, not one requested since. A
+    message not delivered within ``deliver_within_seconds`` counts as
+    failed. Returns False if the message could not be queued.
+    """
+    now = _now()
+    message = {
+        "to": email,
+        "subject": subject,
+        "html": content,
+        "status": "pending",
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now,
+        "deliver_by": now + datetime.timedelta(seconds=deliver_within_seconds or Config.MAIL_OUTBOX_TTL_SECONDS),
+        "expires_at": now + datetime.timedelta(seconds=Config.MAIL_OUTBOX_TTL_SECONDS),
+        "on_failure": on_failure or []
+    }
     try:
-        mail = current_app.extensions['mail']
-        mail.send(msg)
-    except Exception as e:
-        print(f"Error sending email: {e}")
+        email_outbox_collection.insert_one(message)
+    except PyMongoError as e:
+        print(f"Error queueing email: {e}")
         return False
-    return True
\ No newline at end of file
+    _wake.set()
+    return True
+
+
+def _is_permanent(error):
+    # 5xx replies mean the message will never be accepted (bad address,
+    # rejected content); credentials are a configuration problem, so retry
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class MailDispatcher:
+    """Delivers outbox messages over one reused SMTP connection.
+
+    The connection is opened on first use and kept between messages, so
+    only the first email after an idle period pays for the TLS handshake and
+    login. Several processes can run a dispatcher; each message is claimed
+    atomically.
+    """
+
+    def __init__(self, smtp_factory=None):
+        self._smtp_factory = smtp_factory or (smtplib.SMTP_SSL if Config.MAIL_USE_SSL else smtplib.SMTP)
+        self._connection = None
+        self._last_used = 0
+
+    def _connect(self):
+        connection = self._smtp_factory(Config.MAIL_SERVER, Config.MAIL_PORT, timeout=Config.MAIL_TIMEOUT_SECONDS)
+        if Config.MAIL_USERNAME:
+            connection.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
+        return connection
+
+    def _get_connection(self):
+        if self._connection is not None and time.monotonic() - self._last_used > Config.MAIL_IDLE_SECONDS:
+            # The server has probably closed it already
+            self.close()
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def close(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._connection = None
+
+    def _send(self, message):
+        email = EmailMessage()
+        email["From"] = Config.MAIL_DEFAULT_SENDER
+        email["To"] = message["to"]
+        email["Subject"] = message["subject"]
+        email.set_content(message["html"], subtype="html")
+
+        with timed(smtp_send_seconds, gauge=dependency_in_flight, gauge_labels=("smtp",)):
+            try:
+                self._get_connection().send_message(email)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError):
+                # A stale connection; reconnect once before counting a failure
+                self.close()
+                self._get_connection().send_message(email)
+        self._last_used = time.monotonic()
+
+    def claim(self):
+        now = _now()
+        return email_outbox_collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lt": now}}
+            ]},
+            {
+                "$set": {"status": "sending", "lease_until": now + datetime.timedelta(seconds=SEND_LEASE_SECONDS)},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _fail(self, message, error):
+        email_outbox_collection.update_one(
+            {"_id": message["_id"]},
+            {"$set": {"status": "failed", "last_error": error}, "$unset": {"lease_until": ""}}
+        )
+        for cleanup in message.get("on_failure", []):
+            if cleanup["collection"] in CLEANUP_COLLECTIONS:
+                db[cleanup["collection"]].delete_one(cleanup["filter"])
+        print(f"Error sending email to {message['to']}: {error}")
+
+    def deliver(self, message):
+        """Sends a claimed message and records the outcome.
+
+        Transient failures are retried with exponential backoff until
+        MAIL_MAX_ATTEMPTS or the message's deadline; then, or on a permanent
+        rejection, the message is marked failed and its cleanup runs.
+        """
+        if message["deliver_by"].replace(tzinfo=datetime.timezone.utc) < _now():
+            self._fail(message, "Not delivered in time")
+            return
+
+        try:
+            self._send(message)
+        except (smtplib.SMTPException, OSError) as e:
+            self.close()
+            if _is_permanent(e) or message["attempts"] >= Config.MAIL_MAX_ATTEMPTS:
+                self._fail(message, str(e))
+                return
+            delay = Config.MAIL_RETRY_BASE_SECONDS * 2 ** (message["attempts"] - 1)
+            email_outbox_collection.update_one(
+                {"_id": message["_id"]},
+                {
+                    "$set": {"status": "pending", "next_attempt_at": _now() + datetime.timedelta(seconds=delay), "last_error": str(e)},
+                    "$unset": {"lease_until": ""}
+                }
+            )
+            return
+
+        email_outbox_collection.update_one(
+            {"_id": message["_id"]},
+            {"$set": {"status": "sent", "sent_at": _now()}, "$unset": {"lease_until": "", "html": ""}}
+        )
+
+    def run(self, stop_event):
+        """Delivers messages until ``stop_event`` is set."""
+        while not stop_event.is_set():
+            try:
+                message = self.claim()
+                if message is not None:
+                    self.deliver(message)
+                    continue
+            except PyMongoError as e:
+                print(f"Error reading email outbox: {e}")
+            # Idle; drop the connection rather than let the server time it out
+            if self._connection is not None and time.monotonic() - self._last_used > Config.MAIL_IDLE_SECONDS:
+                self.close()
+            _wake.wait(POLL_SECONDS)
+            _wake.clear()
+        self.close()
+
+
+def start_mail_dispatcher(stop_event):
+    thread = threading.Thread(target=MailDispatcher().run, args=(stop_event,), name="mail-dispatcher", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,101 @@
+import numpy as np
+from services.sinhala_text import split_sentences, tokenize
+
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+
+
+def _tfidf_matrix(tokenized):
+    """Builds L2-normalized TF-IDF sentence vectors.
+
+    Only terms shared by at least two sentences can contribute to a
+    similarity, so the dense matrix keeps just those columns; the rest only
+    count towards each sentence's norm. This keeps memory proportional to
+    the shared vocabulary instead of the whole vocabulary.
+    """
+    vocabulary = {}
+    rows = []
+    columns = []
+    for row, tokens in enumerate(tokenized):
+        for token in tokens:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    sentence_count = len(tokenized)
+    if not vocabulary:
+        return np.zeros((sentence_count, 0), dtype=np.float32)
+
+    vocabulary_size = len(vocabulary)
+    pairs, term_counts = np.unique(np.array(rows) * vocabulary_size + np.array(columns), return_counts=True)
+    pair_rows = pairs // vocabulary_size
+    pair_columns = pairs % vocabulary_size
+
+    document_frequency = np.bincount(pair_columns, minlength=vocabulary_size)
+    idf = np.log((1 + sentence_count) / (1 + document_frequency)) + 1
+    weights = (1 + np.log(term_counts)) * idf[pair_columns]
+
+    norms = np.sqrt(np.bincount(pair_rows, weights=weights ** 2, minlength=sentence_count))
+    weights = weights / norms[pair_rows]
+
+    shared = document_frequency[pair_columns] >= 2
+    shared_terms, shared_columns = np.unique(pair_columns[shared], return_inverse=True)
+    matrix = np.zeros((sentence_count, len(shared_terms)), dtype=np.float32)
+    matrix[pair_rows[shared], shared_columns] = weights[shared]
+    return matrix
+
+
+def rank_sentences(tokenized):
+    """Scores sentences with TextRank over cosine similarity of TF-IDF vectors.
+
+    The n x n similarity matrix is never materialized: each power iteration
+    multiplies through the TF-IDF matrix instead, so long documents stay
+    cheap in memory.
+    """
+    sentence_count = len(tokenized)
+    matrix = _tfidf_matrix(tokenized)
+    self_similarity = np.einsum("ij,ij->i", matrix, matrix)
+
+    def similarity_times(vector):
+        return matrix @ (matrix.T @ vector) - self_similarity * vector
+
+    out_weight = similarity_times(np.ones(sentence_count, dtype=np.float32))
+    dangling = out_weight <= 0
+    safe_out_weight = np.where(dangling, 1, out_weight)
+
+    scores = np.full(sentence_count, 1 / sentence_count, dtype=np.float32)
+    for _ in range(MAX_ITERATIONS):
+        # Sentences similar to nothing spread their score evenly
+        dangling_mass = scores[dangling].sum()
+        spread = similarity_times(np.where(dangling, 0, scores / safe_out_weight))
+        new_scores = (1 - DAMPING) / sentence_count + DAMPING * (spread + dangling_mass / sentence_count)
+        converged = np.abs(new_scores - scores).sum() < TOLERANCE
+        scores = new_scores
+        if converged:
+            break
+    return scores
+
+
+def extractive_summary(text, percentage):
+    """Picks the highest ranked sentences up to ``percentage`` of the text length.
+
+    Sentences are returned in their original order. Runs locally, so it
+    works without the LLM and in well under 100 ms for typical notes.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= 1:
+        return " ".join(sentences)
+
+    scores = rank_sentences([tokenize(sentence) for sentence in sentences])
+
+    budget = sum(len(sentence) for sentence in sentences) * float(percentage) / 100
+    selected = []
+    used = 0
+    # Stable sort keeps earlier sentences first among equal scores
+    for index in np.argsort(-scores, kind="stable"):
+        if selected and used + len(sentences[index]) > budget:
+            continue
+        selected.append(index)
+        used += len(sentences[index])
+
+    return " ".join(sentences[index] for index in sorted(selected))
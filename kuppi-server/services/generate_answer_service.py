@@ -1,14 +1,94 @@
 from google import genai
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity
 from config import Config
+from services.note_index_service import search_passages
+from services.streaming_service import format_sse
+from services.metrics_service import gemini_request_seconds, dependency_in_flight
+from metrics import timed
+import time
 
 client = genai.Client(api_key=Config.GEMINI_API_KEY)
 
+ANSWER_MODEL = "gemini-2.0-flash"
+
+def build_grounded_prompt(question, passages):
+    notes = "\n\n".join(f"[{index}] {passage['title']}\n{passage['text']}" for index, passage in enumerate(passages, start=1))
+    return (
+        "You are a helpful study assistant. Answer the question using the student's notes below. "
+        "If the notes do not contain the answer, say so before answering from general knowledge. "
+        "Answer in the language of the question.\n\n"
+        f"Notes:\n{notes}\n\n"
+        f"Question: {question}"
+    )
+
+def _prepare_contents(data):
+    """Returns the model input and, when answering from notes, the source notes.
+
+    With ``mode`` set to ``notes`` only the current user's top ranked
+    passages go into the prompt, so its size does not grow with the library.
+    """
+    question = data.get("question")
+    if data.get("mode") != "notes":
+        return question, None
+
+    passages = search_passages(get_jwt_identity(), question or "", Config.ANSWER_TOP_K_PASSAGES)
+    sources = {}
+    for passage in passages:
+        sources.setdefault(str(passage["note_id"]), passage["title"])
+    return build_grounded_prompt(question, passages), [{"note_id": note_id, "title": title} for note_id, title in sources.items()]
+
 def generate_answer_service(data):
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=data.get("question")
-        )
+        contents, sources = _prepare_contents(data)
+        with timed(gemini_request_seconds, "answer", gauge=dependency_in_flight, gauge_labels=("gemini",)):
+            response = client.models.generate_content(
+                model=ANSWER_MODEL,
+                contents=contents
+            )
+        if sources is not None:
+            return {"answer": response.text, "sources": sources}, 200
         return {"answer": response.text}, 200  
     except Exception as e:
         return {"error": str(e)}, 500
+
+def stream_answer_service(data):
+    """Yields the answer as server-sent events while Gemini generates it.
+
+    Emits ``chunk`` events, then a ``done`` event carrying the first-token and
+    total latency in milliseconds, or an ``error`` event. Closing the generator
+    (client disconnect) closes the upstream stream and stops generation.
+    """
+    started = time.perf_counter()
+    first_token_ms = None
+    outcome = "cancelled"
+    stream = None
+    try:
+        contents, sources = _prepare_contents(data)
+        if sources is not None:
+            yield format_sse({"sources": sources}, "sources")
+
+        with timed(gemini_request_seconds, "answer_stream", gauge=dependency_in_flight, gauge_labels=("gemini",)):
+            stream = client.models.generate_content_stream(
+                model=ANSWER_MODEL,
+                contents=contents
+            )
+            for chunk in stream:
+                if not chunk.text:
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                yield format_sse({"text": chunk.text}, "chunk")
+
+        outcome = "completed"
+        total_ms = (time.perf_counter() - started) * 1000
+        yield format_sse({"first_token_ms": first_token_ms, "total_ms": total_ms}, "done")
+    except Exception as e:
+        outcome = "failed"
+        yield format_sse({"error": str(e)}, "error")
+    finally:
+        if stream is not None:
+            stream.close()
+        total_ms = (time.perf_counter() - started) * 1000
+        first_token = f"{first_token_ms:.0f} ms" if first_token_ms is not None else "none"
+        current_app.logger.info(f"Answer stream {outcome}: first token {first_token}, total {total_ms:.0f} ms")
@@ -1,37 +1,190 @@
 from google import genai
 from config import Config
+from db import summary_cache_collection
+from services.cache_service import TwoTierCache
+from services.sinhala_text import chunk_text
+from services.extractive_summary_service import extractive_summary
+from services.streaming_service import format_sse
+from services.metrics_service import gemini_request_seconds, dependency_in_flight
+from metrics import timed
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import unicodedata
 
 client = genai.Client(api_key=Config.GEMINI_API_KEY)
 
+SUMMARY_MODEL = "gemini-2.0-flash"
+
+# Map style to descriptive text
+STYLE_DESCRIPTIONS = {
+    "casual": "conversational and easy to understand",
+    "formal": "professional and straightforward",
+    "academic": "scholarly with precise terminology"
+}
+
+summary_cache = TwoTierCache(
+    summary_cache_collection,
+    memory_size=Config.SUMMARY_CACHE_MEMORY_SIZE,
+    ttl_seconds=Config.SUMMARY_CACHE_TTL_SECONDS,
+    max_documents=Config.SUMMARY_CACHE_MAX_DOCUMENTS
+)
+
+# Shared by all requests so a burst of long notes cannot fan out into an
+# unbounded number of concurrent Gemini calls
+chunk_executor = ThreadPoolExecutor(max_workers=Config.SUMMARY_MAX_WORKERS, thread_name_prefix="summary-chunk")
+
+def summary_cache_key(content, percentage, style, model=SUMMARY_MODEL):
+    """Hashes everything that changes the generated summary.
+
+    Content is NFC normalized and whitespace collapsed, so the same note
+    re-sent with different spacing or Unicode composition maps to one key.
+    """
+    normalized = " ".join(unicodedata.normalize("NFC", content or "").split())
+    payload = json.dumps([normalized, str(percentage), style, model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _generate(prompt):
+    with timed(gemini_request_seconds, "summary", gauge=dependency_in_flight, gauge_labels=("gemini",)):
+        response = client.models.generate_content(
+            model=SUMMARY_MODEL,
+            contents=prompt
+        )
+    return response.text
+
+def build_summary_prompt(content, percentage, style_description):
+    # Create a prompt that includes length and style parameters
+    return (
+        "You are a helpful AI that provides concise summaries of text. "
+        f"Summarize the following content in a {style_description} style. "
+        f"The summary should be approximately {percentage}% of the original length "
+        "(summarize the content in the provided language itself):\n\n"
+        f"{content}"
+    )
+
+def summarize_chunks(chunks, percentage, style_description):
+    """Map step: summarizes every chunk concurrently, returned in input order."""
+    prompts = [
+        (
+            "You are a helpful AI that provides concise summaries of text. "
+            f"The following is part {index} of {len(chunks)} of a longer document. "
+            f"Summarize it in a {style_description} style to approximately {percentage}% of its length, "
+            "keeping every key point, in the provided language itself:\n\n"
+            f"{chunk}"
+        )
+        for index, chunk in enumerate(chunks, start=1)
+    ]
+    return list(chunk_executor.map(_generate, prompts))
+
+def build_reduce_prompt(partial_summaries, original_word_count, percentage, style_description):
+    """Reduce step: merges the chunk summaries to the length asked for the whole note."""
+    target_words = max(1, round(original_word_count * float(percentage) / 100))
+    joined = "\n\n".join(partial_summaries)
+    return (
+        "You are a helpful AI that provides concise summaries of text. "
+        "The following are summaries of consecutive parts of one document. "
+        f"Combine them into a single coherent summary in a {style_description} style "
+        f"of approximately {target_words} words, without repeating points "
+        "(write the summary in the provided language itself):\n\n"
+        f"{joined}"
+    )
+
+def is_long_document(content):
+    return len(content or "") > Config.SUMMARY_CHUNK_THRESHOLD_CHARS
+
+def _prepare_prompt(user_content, percentage, style):
+    style_description = STYLE_DESCRIPTIONS.get(style, STYLE_DESCRIPTIONS["casual"])
+
+    if is_long_document(user_content):
+        original_word_count = len(user_content.split())
+        if len(user_content) > Config.SUMMARY_PRESHRINK_CHARS:
+            # Drop the least central sentences locally before paying for prompt tokens
+            user_content = extractive_summary(user_content, 100 * Config.SUMMARY_PRESHRINK_CHARS / len(user_content))
+
+        # Long notes are summarized as map-reduce so wall-clock time follows
+        # the slowest chunk rather than the whole document
+        chunks = chunk_text(user_content, Config.SUMMARY_CHUNK_CHARS)
+        partial_summaries = summarize_chunks(chunks, percentage, style_description)
+        return build_reduce_prompt(partial_summaries, original_word_count, percentage, style_description)
+
+    return build_summary_prompt(user_content, percentage, style_description)
+
 def generate_summary_service(data):
     try:
         user_content = data.get("content")
         percentage = data.get("percentage", 50)  # Default to 50% if not provided
         style = data.get("style", "academic")  # Default to academic if not provided
-        
-        # Map style to descriptive text
-        style_descriptions = {
-            "casual": "conversational and easy to understand",
-            "formal": "professional and straightforward",
-            "academic": "scholarly with precise terminology"
-        }
-        
-        style_description = style_descriptions.get(style, style_descriptions["casual"])
-        
-        # Create a prompt that includes length and style parameters
-        prompt = (
-            "You are a helpful AI that provides concise summaries of text. "
-            f"Summarize the following content in a {style_description} style. "
-            f"The summary should be approximately {percentage}% of the original length "
-            "(summarize the content in the provided language itself):\n\n"
-            f"{user_content}"
-        )
-        
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
-        
-        return {"summary": response.text}, 200
+
+        if data.get("mode") == "extractive":
+            # Local TextRank summary, no Gemini call
+            return {"summary": extractive_summary(user_content or "", percentage)}, 200
+
+        cache_key = summary_cache_key(user_content, percentage, style)
+        cached_summary = summary_cache.get(cache_key)
+        if cached_summary is not None:
+            return {"summary": cached_summary}, 200
+
+        summary = _generate(_prepare_prompt(user_content, percentage, style))
+        # An empty reply (e.g. a blocked response) is not worth serving again
+        if summary:
+            summary_cache.set(cache_key, summary)
+
+        return {"summary": summary}, 200
     except Exception as e:
-        return {"error": str(e)}, 500
\ No newline at end of file
+        return {"error": str(e)}, 500
+
+def summary_events(data):
+    """Generates the summary incrementally as ``(event, payload)`` pairs.
+
+    Produces ``chunk`` events with incremental text, then a ``done`` event,
+    or an ``error`` event. Closing the generator closes the upstream Gemini
+    stream, so generation stops and the worker is freed.
+    """
+    user_content = data.get("content")
+    percentage = data.get("percentage", 50)
+    style = data.get("style", "academic")
+
+    stream = None
+    try:
+        if data.get("mode") == "extractive":
+            yield "chunk", {"text": extractive_summary(user_content or "", percentage)}
+            yield "done", {"cached": False}
+            return
+
+        cache_key = summary_cache_key(user_content, percentage, style)
+        cached_summary = summary_cache.get(cache_key)
+        if cached_summary is not None:
+            yield "chunk", {"text": cached_summary}
+            yield "done", {"cached": True}
+            return
+
+        prompt = _prepare_prompt(user_content, percentage, style)
+        parts = []
+        with timed(gemini_request_seconds, "summary_stream", gauge=dependency_in_flight, gauge_labels=("gemini",)):
+            stream = client.models.generate_content_stream(
+                model=SUMMARY_MODEL,
+                contents=prompt
+            )
+            for chunk in stream:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield "chunk", {"text": chunk.text}
+
+        summary = "".join(parts)
+        if summary:
+            summary_cache.set(cache_key, summary)
+        yield "done", {"cached": False}
+    except Exception as e:
+        yield "error", {"error": str(e)}
+    finally:
+        if stream is not None:
+            stream.close()
+
+def stream_summary_service(data):
+    """Yields the summary as server-sent events while Gemini generates it."""
+    events = summary_events(data)
+    try:
+        for event, payload in events:
+            yield format_sse(payload, event)
+    finally:
+        events.close()
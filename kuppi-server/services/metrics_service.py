@@ -0,0 +1,81 @@
+import atexit
+import os
+import time
+import threading
+from flask import g, request
+import metrics
+from config import Config
+
+# Recorded on teardown, which for stream_with_context responses (SSE) runs
+# only once the stream has ended, so streams are timed to their last event
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Time to handle a request; streamed responses until the stream ends", ("endpoint", "method")
+)
+http_requests_total = metrics.counter("http_requests_total", "Requests by response status", ("endpoint", "method", "status"))
+http_errors_total = metrics.counter("http_request_errors_total", "Requests that failed with a 5xx or an exception", ("endpoint", "method"))
+http_in_flight = metrics.gauge("http_requests_in_flight", "Requests being handled", ("endpoint",))
+
+# Dependencies; MongoDB commands are recorded by the listeners in db.py
+gemini_request_seconds = metrics.histogram(
+    "gemini_request_duration_seconds", "Gemini calls; streams are timed until the last chunk", ("operation", "outcome")
+)
+ocr_seconds = metrics.histogram(
+    "ocr_duration_seconds", "OCR tasks (preprocessing and Tesseract) timed inside the worker process, queueing excluded", ("task", "outcome")
+)
+smtp_send_seconds = metrics.histogram("smtp_send_duration_seconds", "SMTP sends, reconnects included", ("outcome",))
+dependency_in_flight = metrics.gauge("dependency_calls_in_flight", "Calls to other services in progress", ("dependency",))
+
+def _endpoint():
+    # The route's function name, never the raw path, to keep label counts bounded
+    return request.endpoint or "unmatched"
+
+def instrument_app(app):
+    """Records count, errors, latency and in-flight requests per endpoint."""
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        http_in_flight.inc(_endpoint())
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(error):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        endpoint, method = _endpoint(), request.method
+        status = 500 if error is not None else g.pop("metrics_status", 500)
+        http_in_flight.dec(endpoint)
+        http_request_seconds.observe(time.perf_counter() - started, endpoint, method)
+        http_requests_total.inc(endpoint, method, str(status))
+        if status >= 500:
+            http_errors_total.inc(endpoint, method)
+
+def _write_snapshot():
+    try:
+        metrics.write_snapshot(Config.METRICS_DIR)
+    except OSError as e:
+        print(f"Error writing metrics: {e}")
+
+def _run_writer(stop_event):
+    while not stop_event.wait(Config.METRICS_FLUSH_SECONDS):
+        _write_snapshot()
+
+def start_metrics_writer(stop_event):
+    """Writes this worker's metrics to METRICS_DIR periodically and at exit."""
+    os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    atexit.register(_write_snapshot)
+    thread = threading.Thread(target=_run_writer, args=(stop_event,), name="metrics-writer", daemon=True)
+    thread.start()
+    return thread
+
+def metrics_text():
+    """All workers' metrics in the Prometheus text format."""
+    if Config.METRICS_DIR:
+        _write_snapshot()
+        return metrics.render(metrics.read_snapshots(Config.METRICS_DIR))
+    return metrics.render(metrics.families())
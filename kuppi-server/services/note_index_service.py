@@ -0,0 +1,151 @@
+import heapq
+import math
+from collections import Counter
+from db import note_passages_collection, note_index_stats_collection
+from services.sinhala_text import chunk_text, tokenize
+
+# Notes are indexed as passages so retrieval can return just the relevant
+# part of a long note
+PASSAGE_CHARS = 800
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def _passages(title, content):
+    return chunk_text(f"{title}\n\n{content}", PASSAGE_CHARS)
+
+
+def index_note(owner, note_id, title, content):
+    """Adds a note's passages to the owner's inverted index.
+
+    Each passage stores its distinct terms (covered by a multikey index on
+    owner + terms) and per-term frequencies; the per-owner passage count and
+    total length needed by BM25 are maintained incrementally.
+    """
+    documents = []
+    for position, text in enumerate(_passages(title, content)):
+        tokens = tokenize(text)
+        if not tokens:
+            continue
+        term_frequencies = Counter(tokens)
+        documents.append({
+            "owner": owner,
+            "note_id": note_id,
+            "title": title,
+            "position": position,
+            "text": text,
+            "terms": list(term_frequencies),
+            "tf": dict(term_frequencies),
+            "length": len(tokens)
+        })
+
+    if not documents:
+        return
+
+    note_passages_collection.insert_many(documents)
+    note_index_stats_collection.update_one(
+        {"_id": owner},
+        {"$inc": {"passage_count": len(documents), "total_length": sum(document["length"] for document in documents)}},
+        upsert=True
+    )
+
+
+def remove_note(owner, note_id):
+    passages = list(note_passages_collection.find({"owner": owner, "note_id": note_id}, {"length": 1}))
+    if not passages:
+        return
+
+    note_passages_collection.delete_many({"owner": owner, "note_id": note_id})
+    note_index_stats_collection.update_one(
+        {"_id": owner},
+        {"$inc": {"passage_count": -len(passages), "total_length": -sum(passage["length"] for passage in passages)}}
+    )
+
+
+def remove_all_notes(owner):
+    note_passages_collection.delete_many({"owner": owner})
+    note_index_stats_collection.delete_one({"_id": owner})
+
+
+def _score_passages(owner, terms):
+    """Scores every passage of ``owner`` containing one of ``terms`` with BM25.
+
+    Only passages containing a query term are read, and of those only the
+    length and the query terms' frequencies are projected. Returns
+    ``(score, passage_id, note_id)`` tuples in no particular order.
+    """
+    stats = note_index_stats_collection.find_one({"_id": owner})
+    if not stats or stats.get("passage_count", 0) <= 0:
+        return []
+
+    projection = {"note_id": 1, "length": 1}
+    projection.update({f"tf.{term}": 1 for term in terms})
+    candidates = list(note_passages_collection.find({"owner": owner, "terms": {"$in": terms}}, projection))
+    if not candidates:
+        return []
+
+    passage_count = stats["passage_count"]
+    average_length = stats["total_length"] / passage_count
+    document_frequency = Counter(term for candidate in candidates for term in candidate.get("tf", {}))
+    idf = {
+        term: math.log(1 + (passage_count - count + 0.5) / (count + 0.5))
+        for term, count in document_frequency.items()
+    }
+
+    def score(candidate):
+        length_norm = K1 * (1 - B + B * candidate["length"] / average_length)
+        return sum(
+            idf[term] * frequency * (K1 + 1) / (frequency + length_norm)
+            for term, frequency in candidate.get("tf", {}).items()
+        )
+
+    return [(score(candidate), candidate["_id"], candidate.get("note_id")) for candidate in candidates]
+
+
+def _fetch_passages(scores):
+    if not scores:
+        return {}
+
+    passages = note_passages_collection.find(
+        {"_id": {"$in": list(scores)}},
+        {"note_id": 1, "title": 1, "position": 1, "text": 1}
+    )
+    return {passage["_id"]: dict(passage, score=scores[passage["_id"]]) for passage in passages}
+
+
+def search_passages(owner, query, top_k):
+    """Returns the owner's ``top_k`` passages ranked by BM25 for ``query``.
+
+    Passage text is fetched for the winners alone.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+
+    ranked = heapq.nlargest(top_k, _score_passages(owner, terms), key=lambda scored: scored[0])
+    passages = _fetch_passages({passage_id: passage_score for passage_score, passage_id, _ in ranked})
+    return sorted(passages.values(), key=lambda passage: passage["score"], reverse=True)
+
+
+def search_notes(owner, query, limit, offset):
+    """Ranks the owner's notes for ``query`` by their best matching passage.
+
+    Returns ``(hits, has_more)`` where each hit carries the note id, title,
+    score and the best passage's text for building a snippet.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return [], False
+
+    best = {}
+    for passage_score, passage_id, note_id in _score_passages(owner, terms):
+        if note_id not in best or passage_score > best[note_id][0]:
+            best[note_id] = (passage_score, passage_id)
+
+    ranked = heapq.nlargest(offset + limit + 1, best.values(), key=lambda scored: scored[0])
+    page = ranked[offset:offset + limit]
+    passages = _fetch_passages({passage_id: passage_score for passage_score, passage_id in page})
+    hits = [passages[passage_id] for _, passage_id in page if passage_id in passages]
+    return hits, len(ranked) > offset + limit
@@ -1,13 +1,38 @@
 from flask_jwt_extended import get_jwt_identity
-from db import users_collection
+from db import users_collection, notes_collection
+from services.note_index_service import index_note, remove_note, remove_all_notes, search_notes
+from services.sinhala_text import tokenize, highlight_snippet
+from services.user_cache_service import get_user
 from bson import ObjectId
+import base64
 import datetime
 
+PREVIEW_WORD_COUNT = 10
+MAX_PAGE_SIZE = 100
+SNIPPET_CHARS = 160
+
+def make_preview(content):
+    return " ".join(content.split(" ")[:PREVIEW_WORD_COUNT])
+
+def _encode_cursor(note):
+    created_at = note["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+    millis = int(created_at.timestamp() * 1000)
+    return base64.urlsafe_b64encode(f"{millis}:{note['_id']}".encode()).decode()
+
+def _decode_cursor(cursor):
+    millis, note_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+    created_at = datetime.datetime.fromtimestamp(int(millis) / 1000, datetime.timezone.utc)
+    return created_at, ObjectId(note_id)
+
+def _user_exists(email):
+    return get_user(email) is not None
+
 def add_note_service(data):
     current_user_email = get_jwt_identity()
-    user = users_collection.find_one({"email": current_user_email})
 
-    if not user:
+    if not _user_exists(current_user_email):
         return {"error": "User not found"}, 404
 
     title = data.get("title")
@@ -17,42 +42,91 @@ def add_note_service(data):
         return {"error": "Title and content are required"}, 400
 
     new_note = {
-        "_id": ObjectId(),  
+        "owner": current_user_email,
         "title": title,
         "content": content,
+        "preview": make_preview(content),
         "created_at": datetime.datetime.now(datetime.timezone.utc)
     }
 
-    users_collection.update_one(
-        {"email": current_user_email},
-        {"$push": {"notes": new_note}}
-    )
+    result = notes_collection.insert_one(new_note)
+    index_note(current_user_email, result.inserted_id, title, content)
 
     return {"success": True, "message": "Note added successfully!"}, 201
 
-def get_notes_service():
+def get_notes_service(limit=None, after=None):
+    """Lists note previews in creation order.
+
+    Without ``limit`` every note is returned (the mobile client's behaviour).
+    With ``limit`` one page is returned along with a ``next_cursor`` to pass
+    back as ``after``; pages are keyset based, so deep pages cost the same as
+    the first one.
+    """
     current_user_email = get_jwt_identity()
-    user = users_collection.find_one({"email": current_user_email})
 
-    if not user:
+    if not _user_exists(current_user_email):
         return {"error": "User not found"}, 404
 
-    notes_preview = [{"_id": str(note["_id"]) if "_id" in note else None, "title": note["title"], "content": " ".join(note["content"].split(" ")[:10])} for note in user.get("notes", [])]
-    return {"notes": notes_preview}, 200
+    query = {"owner": current_user_email}
+    if after:
+        try:
+            after_created_at, after_id = _decode_cursor(after)
+        except Exception as e:
+            return {"error": "Invalid cursor"}, 400
+        query["$or"] = [
+            {"created_at": {"$gt": after_created_at}},
+            {"created_at": after_created_at, "_id": {"$gt": after_id}}
+        ]
+
+    cursor = notes_collection.find(
+        query,
+        {"_id": 1, "title": 1, "preview": 1, "created_at": 1}
+    ).sort([("created_at", 1), ("_id", 1)])
+
+    if limit is not None:
+        # Fetch one extra note to know whether another page exists
+        cursor = cursor.limit(limit + 1)
+
+    notes = list(cursor)
+
+    next_cursor = None
+    if limit is not None and len(notes) > limit:
+        notes = notes[:limit]
+        next_cursor = _encode_cursor(notes[-1])
+
+    notes_preview = [{"_id": str(note["_id"]), "title": note["title"], "content": note.get("preview", "")} for note in notes]
+    return {"notes": notes_preview, "next_cursor": next_cursor}, 200
+
+def find_note(email, object_id):
+    """Fetches a single note in one indexed round trip.
+
+    Users that have not been migrated yet still keep their notes embedded in
+    the user document; for them MongoDB picks out the matching element with
+    an ``$elemMatch`` projection instead of shipping the whole array.
+    Returns ``(user_found, note)``.
+    """
+    note = notes_collection.find_one({"owner": email, "_id": object_id}, {"owner": 0})
+    if note:
+        return True, note
+
+    user = users_collection.find_one({"email": email}, {"notes": {"$elemMatch": {"_id": object_id}}})
+    if not user:
+        return False, None
+
+    return True, next(iter(user.get("notes", [])), None)
 
 def get_note_by_id_service(note_id):
     current_user_email = get_jwt_identity()
-    user = users_collection.find_one({"email": current_user_email})
-
-    if not user:
-        return {"error": "User not found"}, 404
 
     try:
         object_id = ObjectId(note_id)
     except Exception as e:
         return {"error": "Invalid note ID format"}, 400
 
-    note = next((note for note in user.get("notes", []) if str(note.get("_id")) == note_id), None)
+    user_found, note = find_note(current_user_email, object_id)
+
+    if not user_found:
+        return {"error": "User not found"}, 404
 
     if not note:
         return {"error": "Note not found"}, 404
@@ -62,9 +136,8 @@ def get_note_by_id_service(note_id):
 
 def delete_note_service(note_id):
     current_user_email = get_jwt_identity()
-    user = users_collection.find_one({"email": current_user_email})
 
-    if not user:
+    if not _user_exists(current_user_email):
         return {"error": "User not found"}, 404
 
     try:
@@ -72,16 +145,45 @@ def delete_note_service(note_id):
     except Exception as e:
         return {"error": "Invalid note ID format"}, 400
 
-    users_collection.update_one({"email": current_user_email}, {"$pull": {"notes": {"_id": object_id}}})
+    notes_collection.delete_one({"owner": current_user_email, "_id": object_id})
+    remove_note(current_user_email, object_id)
 
     return {"success": True, "message": "Note deleted successfully!"}, 200
 
 def delete_all_notes_service():
     current_user_email = get_jwt_identity()
-    user = users_collection.find_one({"email": current_user_email})
 
-    if not user:
+    if not _user_exists(current_user_email):
         return {"error": "User not found"}, 404
 
-    users_collection.update_one({"email": current_user_email}, {"$set": {"notes": []}})
+    notes_collection.delete_many({"owner": current_user_email})
+    remove_all_notes(current_user_email)
     return {"success": True, "message": "All notes deleted successfully!"}, 200
+
+def search_notes_service(query, limit, page):
+    """Ranked full-text search over the current user's notes.
+
+    Uses the passage index kept by add/delete, so only notes containing a
+    query word are scored. Each hit has a snippet around the best matching
+    passage with the matched words' offsets in ``highlights``.
+    """
+    current_user_email = get_jwt_identity()
+
+    if not _user_exists(current_user_email):
+        return {"error": "User not found"}, 404
+
+    hits, has_more = search_notes(current_user_email, query, limit, (page - 1) * limit)
+
+    terms = tokenize(query)
+    results = []
+    for hit in hits:
+        snippet, highlights = highlight_snippet(hit["text"], terms, SNIPPET_CHARS)
+        results.append({
+            "_id": str(hit["note_id"]),
+            "title": hit["title"],
+            "snippet": snippet,
+            "highlights": highlights,
+            "score": round(hit["score"], 4)
+        })
+
+    return {"results": results, "page": page, "has_more": has_more}, 200
@@ -0,0 +1,173 @@
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+import time
+import pypdfium2
+from config import Config
+from services.ocr_cache_service import pdf_page_cache_key, get_cached_text, cache_text, get_cached_image_text, cache_image_text
+from services.ocr_service import submit_ocr_file, submit_pdf_page_ocr, ocr_error_response, OCRBusyError
+from services.streaming_service import format_sse
+from services.upload_service import spool_upload, sniff_image, remove_file, UploadError
+
+# Backoff while the shared pool is full and none of the batch's pages are in
+# flight; a page still waiting after OCR_REQUEST_TIMEOUT_SECONDS is reported busy
+BUSY_RETRY_SECONDS = 0.1
+BUSY_RETRY_MAX_SECONDS = 2
+
+def _cached(text):
+    # Same (text, seconds) result as an OCR pool future; no OCR ran
+    future = Future()
+    future.set_result((text, None))
+    return future
+
+def _image_jobs(images):
+    # A job is (submit, args, on_result). Pages already in the cache get an
+    # already finished future and need no OCR slot.
+    profile = Config.OCR_PREPROCESSING_PROFILE
+    for path, digest in images:
+        cached_text = get_cached_image_text(digest, path, profile)
+        if cached_text is not None:
+            yield _cached, (cached_text,), None
+        else:
+            yield submit_ocr_file, (path, profile), partial(cache_image_text, digest, path, profile)
+
+def _pdf_jobs(path, digest, page_count):
+    profile = Config.OCR_PREPROCESSING_PROFILE
+    for index in range(page_count):
+        key = pdf_page_cache_key(digest, index, profile)
+        cached_text = get_cached_text(key)
+        if cached_text is not None:
+            yield _cached, (cached_text,), None
+        else:
+            yield submit_pdf_page_ocr, (path, index, profile), partial(cache_text, key)
+
+def _spool_images(image_files):
+    """Spools and checks every image before any OCR starts.
+
+    Returns ``(path, digest)`` pairs; on a bad image the ones spooled so far
+    are removed and UploadError is raised.
+    """
+    images = []
+    try:
+        for image_file in image_files:
+            path, digest = spool_upload(image_file, Config.OCR_MAX_UPLOAD_BYTES)
+            images.append((path, digest))
+            sniff_image(path)
+    except UploadError:
+        _remove_files([path for path, _ in images])
+        raise
+    return images
+
+def _spool_pdf(pdf_file):
+    """Saves an uploaded PDF to a temporary file the OCR workers can open.
+
+    Returns the path, the file's SHA-256 and its page count; only the
+    document's page tree is read here, pages are parsed and rasterized later
+    by the workers.
+    """
+    path, digest = spool_upload(pdf_file, Config.OCR_MAX_UPLOAD_BYTES, suffix=".pdf")
+    try:
+        document = pypdfium2.PdfDocument(path)
+        page_count = len(document)
+        document.close()
+    except pypdfium2.PdfiumError:
+        remove_file(path)
+        raise UploadError("Invalid PDF file") from None
+    return path, digest, page_count
+
+def _remove_files(paths):
+    for path in paths:
+        remove_file(path)
+
+def stream_batch_ocr(jobs):
+    """OCRs pages concurrently and yields SSE "page" events in page order.
+
+    Up to OCR_WORKERS pages are in flight at once, so a handout takes about
+    as long as its slowest pages rather than the sum of all of them. When
+    the shared pool is full the batch waits for its own pages, or with
+    backoff once it has none in flight, instead of failing; only a batch
+    that cannot start at all gets a busy error.
+    """
+    pending = deque()
+    jobs = iter(jobs)
+    next_job = next(jobs, None)
+    page = 0
+    busy_since = None
+    try:
+        while next_job is not None or pending:
+            while next_job is not None and len(pending) < Config.OCR_WORKERS:
+                submit, args, on_result = next_job
+                try:
+                    pending.append((submit(*args), on_result))
+                except OCRBusyError as e:
+                    if pending:
+                        break
+                    response, _ = ocr_error_response(e)
+                    if page == 0:
+                        response["retry_after"] = Config.OCR_RETRY_AFTER_SECONDS
+                        yield format_sse(response, event="error")
+                        return
+                    # Pages of this batch were already accepted; keep going
+                    if busy_since is None:
+                        busy_since, delay = time.monotonic(), BUSY_RETRY_SECONDS
+                    if time.monotonic() - busy_since < Config.OCR_REQUEST_TIMEOUT_SECONDS:
+                        time.sleep(delay)
+                        delay = min(delay * 2, BUSY_RETRY_MAX_SECONDS)
+                        continue
+                    page += 1
+                    response["page"] = page
+                    yield format_sse(response, event="page")
+                busy_since = None
+                next_job = next(jobs, None)
+
+            if not pending:
+                continue
+            future, on_result = pending.popleft()
+            page += 1
+            try:
+                text, _ = future.result(timeout=Config.OCR_REQUEST_TIMEOUT_SECONDS)
+                if on_result:
+                    on_result(text)
+                yield format_sse({"page": page, "text": text}, event="page")
+            except Exception as e:
+                future.cancel()
+                response, _ = ocr_error_response(e)
+                response["page"] = page
+                yield format_sse(response, event="page")
+
+        yield format_sse({"pages": page}, event="done")
+    finally:
+        # Client went away or the batch failed; drop pages not started yet
+        for future, _ in pending:
+            future.cancel()
+
+def start_batch_ocr(image_files, pdf_file):
+    """Validates a batch upload of several images or one PDF.
+
+    Uploads are spooled to disk and checked up front. Returns
+    ``{"events", "close"}`` with status 200, where ``events`` streams the
+    per-page results and ``close`` must run once the response is done, or
+    an error payload with status 400 or 413.
+    """
+    image_files = [image_file for image_file in image_files if image_file]
+    if bool(image_files) == bool(pdf_file):
+        return {"error": "Upload either images or a single PDF"}, 400
+
+    if image_files:
+        if len(image_files) > Config.OCR_MAX_BATCH_PAGES:
+            return {"error": f"At most {Config.OCR_MAX_BATCH_PAGES} pages can be processed at once"}, 400
+        try:
+            images = _spool_images(image_files)
+        except UploadError as e:
+            return {"error": str(e)}, e.status_code
+        paths = [path for path, _ in images]
+        return {"events": stream_batch_ocr(_image_jobs(images)), "close": partial(_remove_files, paths)}, 200
+
+    try:
+        path, digest, page_count = _spool_pdf(pdf_file)
+    except UploadError as e:
+        return {"error": str(e)}, e.status_code
+    if page_count == 0 or page_count > Config.OCR_MAX_BATCH_PAGES:
+        remove_file(path)
+        return {"error": f"PDF must have between 1 and {Config.OCR_MAX_BATCH_PAGES} pages"}, 400
+    return {"events": stream_batch_ocr(_pdf_jobs(path, digest, page_count)), "close": partial(remove_file, path)}, 200
@@ -0,0 +1,130 @@
+import datetime
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+from pymongo.errors import PyMongoError
+from config import Config
+from db import ocr_cache_collection, ocr_image_hashes_collection
+from services.cache_service import TwoTierCache
+from services.ocr_worker import OCR_LANGUAGE
+
+# The difference hash compares neighbouring cells of a 17 x 16 grayscale
+# thumbnail: 16 rows of 16 bits. Pages of text look alike at small sizes,
+# so this is far larger than the usual 8 x 8 hash.
+PERCEPTUAL_HASH_SIZE = 16
+# Cells must differ by this many gray levels to set a bit, so flat paper
+# does not flip bits when an image is re-encoded
+PERCEPTUAL_MIN_DIFFERENCE = 8
+# Copies of one image measure a few bits apart; different pages of the same
+# layout measure tens of bits apart
+PERCEPTUAL_MAX_DISTANCE = 10
+PERCEPTUAL_MAX_CANDIDATES = 100
+
+ocr_cache = TwoTierCache(
+    ocr_cache_collection,
+    memory_size=Config.OCR_CACHE_MEMORY_SIZE,
+    ttl_seconds=Config.OCR_CACHE_TTL_SECONDS,
+    max_documents=Config.OCR_CACHE_MAX_DOCUMENTS
+)
+
+def _settings(profile):
+    return f"{OCR_LANGUAGE}:{profile}"
+
+def image_cache_key(digest, profile):
+    """Cache key for the OCR text of an image with SHA-256 ``digest``."""
+    return f"sha256:{digest}:{_settings(profile)}"
+
+def pdf_page_cache_key(pdf_digest, index, profile):
+    return f"pdf:{pdf_digest}:{index}:{_settings(profile)}"
+
+def perceptual_hash(source):
+    """Difference hash of an image file or stream, or None if it cannot be decoded.
+
+    Survives re-encoding, resizing and small exposure changes, which an
+    exact hash of the bytes does not. Copies are found by Hamming distance,
+    not equality.
+    """
+    try:
+        image = Image.open(source)
+        # JPEGs decode straight at a reduced size
+        image.draft("L", (PERCEPTUAL_HASH_SIZE * 8, PERCEPTUAL_HASH_SIZE * 8))
+        image = ImageOps.exif_transpose(image).convert("L")
+        small = image.resize((PERCEPTUAL_HASH_SIZE + 1, PERCEPTUAL_HASH_SIZE), Image.Resampling.BOX)
+    except (UnidentifiedImageError, OSError):
+        return None
+    pixels = np.asarray(small, dtype=np.int16)
+    return np.packbits(pixels[:, 1:] > pixels[:, :-1] + PERCEPTUAL_MIN_DIFFERENCE).tobytes()
+
+def hamming_distance(first, second):
+    return bin(int.from_bytes(first, "big") ^ int.from_bytes(second, "big")).count("1")
+
+def _bands(image_hash, profile):
+    """Splits a hash into per-row bands for the multikey index.
+
+    Two hashes within PERCEPTUAL_MAX_DISTANCE bits differ in at most that
+    many rows, so (by pigeonhole) they share some identical rows. Blank rows
+    are left out since every page has them.
+    """
+    row_bytes = PERCEPTUAL_HASH_SIZE // 8
+    rows = [image_hash[i:i + row_bytes] for i in range(0, len(image_hash), row_bytes)]
+    return [f"{_settings(profile)}:{index}:{row.hex()}" for index, row in enumerate(rows) if any(row)]
+
+def _find_similar(image_hash, profile):
+    bands = _bands(image_hash, profile)
+    if not bands:
+        return None
+    candidates = ocr_image_hashes_collection.find(
+        {"bands": {"$in": bands}},
+        {"hash": 1}
+    ).limit(PERCEPTUAL_MAX_CANDIDATES)
+    best = min(candidates, key=lambda candidate: hamming_distance(image_hash, candidate["hash"]), default=None)
+    if best and hamming_distance(image_hash, best["hash"]) <= PERCEPTUAL_MAX_DISTANCE:
+        return best["_id"]
+    return None
+
+def get_cached_text(key):
+    return ocr_cache.get(key)
+
+def cache_text(key, text):
+    ocr_cache.set(key, text)
+
+def get_cached_image_text(digest, source, profile):
+    """Returns the cached OCR text of an image (or of a copy of it), or None.
+
+    ``digest`` is the SHA-256 of the image file ``source``, which is only
+    read for the perceptual lookup.
+    """
+    text = ocr_cache.get(image_cache_key(digest, profile))
+    if text is not None or not Config.OCR_CACHE_PERCEPTUAL:
+        return text
+
+    image_hash = perceptual_hash(source)
+    if image_hash is None:
+        return None
+    try:
+        similar_key = _find_similar(image_hash, profile)
+    except PyMongoError as e:
+        print(f"Error reading cache: {e}")
+        return None
+    return ocr_cache.get(similar_key) if similar_key else None
+
+def cache_image_text(digest, source, profile, text):
+    key = image_cache_key(digest, profile)
+    ocr_cache.set(key, text)
+    if not Config.OCR_CACHE_PERCEPTUAL:
+        return
+
+    image_hash = perceptual_hash(source)
+    if image_hash is None:
+        return
+    try:
+        ocr_image_hashes_collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "hash": image_hash,
+                "bands": _bands(image_hash, profile),
+                "expires_at": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=Config.OCR_CACHE_TTL_SECONDS)
+            }},
+            upsert=True
+        )
+    except PyMongoError as e:
+        print(f"Error writing cache: {e}")
@@ -0,0 +1,158 @@
+import hashlib
+import io
+import threading
+from datetime import datetime, timedelta, timezone
+from bson import Binary, ObjectId
+from flask_jwt_extended import get_jwt_identity
+from concurrent.futures.process import BrokenProcessPool
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+from config import Config
+from db import ocr_jobs_collection
+from services.ocr_cache_service import get_cached_image_text, cache_image_text
+from services.ocr_service import submit_ocr, ocr_error_response, OCRBusyError
+from services.upload_service import sniff_image, UploadError
+
+# Images are stored in the job document, which MongoDB caps at 16 MB
+MAX_IMAGE_BYTES = min(15 * 1024 * 1024, Config.OCR_MAX_UPLOAD_BYTES)
+
+def _expires_at(seconds):
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+def create_ocr_job_service(image_file):
+    """Queues an uploaded image for OCR and returns the job id straight away."""
+    # Never reads more than one byte past the limit
+    image_bytes = image_file.read(MAX_IMAGE_BYTES + 1)
+    if len(image_bytes) > MAX_IMAGE_BYTES:
+        return {"error": "Image is too large"}, 413
+    try:
+        sniff_image(io.BytesIO(image_bytes))
+    except UploadError as e:
+        return {"error": str(e)}, e.status_code
+
+    profile = Config.OCR_PREPROCESSING_PROFILE
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    job = {
+        # Only the submitter can read the result
+        "owner": get_jwt_identity(),
+        "profile": profile,
+        "digest": digest,
+        "attempts": 0,
+        "created_at": datetime.now(timezone.utc),
+        # Jobs no worker ever picks up are cleaned up too
+        "expires_at": _expires_at(Config.OCR_JOB_RESULT_TTL_SECONDS)
+    }
+    cached_text = get_cached_image_text(digest, io.BytesIO(image_bytes), profile)
+    if cached_text is not None:
+        # Already seen; the job is done before anyone polls it
+        job.update(status="done", text=cached_text)
+    else:
+        job.update(status="queued", image=Binary(image_bytes))
+
+    result = ocr_jobs_collection.insert_one(job)
+    return {"job_id": str(result.inserted_id), "status": job["status"]}, 202
+
+def get_ocr_job_service(job_id):
+    try:
+        object_id = ObjectId(job_id)
+    except Exception as e:
+        return {"error": "Invalid job ID format"}, 400
+
+    # Other users' jobs are reported as missing, not forbidden
+    job = ocr_jobs_collection.find_one(
+        {"_id": object_id, "owner": get_jwt_identity()},
+        {"status": 1, "text": 1, "error": 1}
+    )
+    if not job:
+        return {"error": "Job not found"}, 404
+
+    response = {"job_id": job_id, "status": job["status"]}
+    if job["status"] == "done":
+        response["text"] = job["text"]
+    elif job["status"] == "failed":
+        response["error"] = job["error"]
+    return response, 200
+
+def claim_job():
+    """Atomically takes the oldest queued job, or one whose worker's lease ran out.
+
+    The lease lets another worker pick the job up again if the one
+    processing it dies.
+    """
+    now = datetime.now(timezone.utc)
+    return ocr_jobs_collection.find_one_and_update(
+        {"$or": [{"status": "queued"}, {"status": "running", "lease_until": {"$lt": now}}]},
+        {
+            "$set": {"status": "running", "lease_until": now + timedelta(seconds=Config.OCR_JOB_LEASE_SECONDS)},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def _requeue(job, count_attempt):
+    update = {"$set": {"status": "queued"}, "$unset": {"lease_until": ""}}
+    if not count_attempt:
+        update["$inc"] = {"attempts": -1}
+    ocr_jobs_collection.update_one({"_id": job["_id"], "status": "running"}, update)
+
+def _finish(job, fields):
+    # The image is no longer needed; the result is kept until the TTL expires
+    fields["expires_at"] = _expires_at(Config.OCR_JOB_RESULT_TTL_SECONDS)
+    ocr_jobs_collection.update_one(
+        {"_id": job["_id"], "status": "running"},
+        {"$set": fields, "$unset": {"image": "", "lease_until": ""}}
+    )
+
+def process_job(job):
+    """OCRs a claimed job in the OCR pool and stores the outcome.
+
+    Returns False when the pool was full and the job went back to the queue.
+    """
+    if job["attempts"] > Config.OCR_JOB_MAX_ATTEMPTS:
+        _finish(job, {"status": "failed", "error": "OCR failed repeatedly."})
+        return True
+
+    image_bytes = bytes(job["image"])
+    try:
+        future = submit_ocr(image_bytes, job.get("profile"))
+    except OCRBusyError:
+        _requeue(job, count_attempt=False)
+        return False
+
+    try:
+        text, _ = future.result(timeout=Config.OCR_REQUEST_TIMEOUT_SECONDS)
+    except Exception as e:
+        future.cancel()
+        response, _ = ocr_error_response(e)
+        if isinstance(e, BrokenProcessPool):
+            # The worker process died; retry until the attempts run out
+            _requeue(job, count_attempt=True)
+        else:
+            _finish(job, {"status": "failed", "error": response["error"]})
+        return True
+
+    digest = job.get("digest") or hashlib.sha256(image_bytes).hexdigest()
+    cache_image_text(digest, io.BytesIO(image_bytes), job.get("profile") or Config.OCR_PREPROCESSING_PROFILE, text)
+    _finish(job, {"status": "done", "text": text})
+    return True
+
+def run_job_worker(stop_event):
+    """Claims and processes jobs until ``stop_event`` is set."""
+    while not stop_event.is_set():
+        try:
+            job = claim_job()
+            if job is None or not process_job(job):
+                stop_event.wait(Config.OCR_JOB_POLL_SECONDS)
+        except PyMongoError as e:
+            print(f"Error processing OCR jobs: {e}")
+            stop_event.wait(Config.OCR_JOB_POLL_SECONDS)
+
+def start_job_workers(count, stop_event):
+    """Starts ``count`` daemon threads draining the OCR job queue."""
+    threads = []
+    for index in range(count):
+        thread = threading.Thread(target=run_job_worker, args=(stop_event,), name=f"ocr-job-worker-{index}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
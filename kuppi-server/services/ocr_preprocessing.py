@@ -0,0 +1,184 @@
+import numpy as np
+import pypdfium2
+from PIL import Image, ImageOps
+from config import Config
+
+# PIL refuses to decode images past twice this many pixels (and warns past
+# it); uploads are checked against the same limit before they get here
+Image.MAX_IMAGE_PIXELS = Config.OCR_MAX_IMAGE_PIXELS
+
+# Phone photos carry no meaningful DPI, so pages are assumed to be A4 and
+# scaled so their long side matches the target DPI
+PAGE_LONG_SIDE_INCHES = 11.69
+
+PROFILES = {
+    # Full resolution colour image, as uploaded
+    "none": {"target_dpi": None, "binarize": False, "deskew": False},
+    # Reduced-scale grayscale decode only
+    "fast": {"target_dpi": 200, "binarize": False, "deskew": False},
+    "standard": {"target_dpi": 300, "binarize": True, "deskew": False},
+    "full": {"target_dpi": 300, "binarize": True, "deskew": True},
+}
+
+SAUVOLA_K = 0.2
+SAUVOLA_R = 128
+# Rows binarized at a time; bounds the integral images to a few MB
+BINARIZE_STRIP_ROWS = 256
+DESKEW_MAX_DEGREES = 5
+DESKEW_STEP_DEGREES = 0.5
+DESKEW_SAMPLE_PIXELS = 200000
+# PDF pages are rendered at this resolution when the profile sets none
+PDF_RENDER_DPI = 300
+PDF_POINTS_PER_INCH = 72
+
+
+def decode(source, target_dpi):
+    """Opens an image as grayscale, downscaled to ``target_dpi`` where possible.
+
+    For JPEGs the scaling happens inside the decoder (draft mode decodes at
+    1/2, 1/4 or 1/8 scale directly to grayscale), so a 12 MP photo never
+    exists in memory at full size.
+    """
+    image = Image.open(source)
+    if target_dpi:
+        long_side = round(target_dpi * PAGE_LONG_SIDE_INCHES)
+        scale = long_side / max(image.size)
+        if scale < 1:
+            target_size = (round(image.width * scale), round(image.height * scale))
+            if image.format == "JPEG":
+                image.draft("L", target_size)
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((long_side, long_side), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        else:
+            image = ImageOps.exif_transpose(image)
+    else:
+        image = ImageOps.exif_transpose(image)
+    return image.convert("L")
+
+
+def _window_sums(integral, window, height, width):
+    """Sums over the window starting at every pixel, from an integral image."""
+    return (
+        integral[window:window + height, window:window + width]
+        - integral[:height, window:window + width]
+        - integral[window:window + height, :width]
+        + integral[:height, :width]
+    )
+
+
+def binarize(image, window=None):
+    """Sauvola adaptive thresholding, vectorized with integral images.
+
+    Thresholds follow local mean and contrast, so shadows and uneven phone
+    lighting do not wipe out parts of the page the way a global threshold
+    would. The page is processed in strips of rows, so the exact int64
+    integral images only ever cover one strip.
+    """
+    pixels = np.asarray(image, dtype=np.uint8)
+    height, width = pixels.shape
+    if window is None:
+        # Roughly a couple of text lines tall at typical scan resolutions
+        window = max(15, (min(height, width) // 40) | 1)
+    padded = np.pad(pixels, window // 2, mode="edge")
+    area = window * window
+    output = np.empty((height, width), dtype=np.uint8)
+
+    for top in range(0, height, BINARIZE_STRIP_ROWS):
+        rows = min(BINARIZE_STRIP_ROWS, height - top)
+        strip = padded[top:top + rows + window - 1].astype(np.int64)
+
+        integral = np.zeros((rows + window, width + window), dtype=np.int64)
+        np.cumsum(strip.cumsum(0), 1, out=integral[1:, 1:])
+        mean = _window_sums(integral, window, rows, width) / area
+
+        np.multiply(strip, strip, out=strip)
+        np.cumsum(strip.cumsum(0), 1, out=integral[1:, 1:])
+        # Becomes the local variance, then the threshold, in place
+        threshold = _window_sums(integral, window, rows, width) / area
+        threshold -= mean ** 2
+        np.maximum(threshold, 0, out=threshold)
+        np.sqrt(threshold, out=threshold)
+        threshold /= SAUVOLA_R
+        threshold -= 1
+        threshold *= SAUVOLA_K
+        threshold += 1
+        threshold *= mean
+
+        output[top:top + rows] = np.where(pixels[top:top + rows] > threshold, 255, 0)
+    return Image.fromarray(output)
+
+
+def estimate_skew(image):
+    """Estimates page rotation in degrees (counter-clockwise) by projection profiles.
+
+    Dark pixels are projected onto rows at each candidate angle at once (one
+    vectorized bincount for all angles); text lines line up, and the row
+    histogram is sharpest, at the true skew.
+    """
+    pixels = np.asarray(image)
+    ys, xs = np.nonzero(pixels < 128)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > DESKEW_SAMPLE_PIXELS:
+        sample = np.random.default_rng(0).choice(len(ys), DESKEW_SAMPLE_PIXELS, replace=False)
+        ys, xs = ys[sample], xs[sample]
+
+    angles = np.arange(-DESKEW_MAX_DEGREES, DESKEW_MAX_DEGREES + DESKEW_STEP_DEGREES / 2, DESKEW_STEP_DEGREES)
+    radians = np.deg2rad(angles)[:, None]
+    rows = ys[None, :] * np.cos(radians) - xs[None, :] * np.sin(radians)
+    rows = np.round(rows - rows.min()).astype(np.int32)
+
+    bins = rows.max() + 1
+    offsets = np.arange(len(angles))[:, None] * bins
+    histograms = np.bincount((rows + offsets).ravel(), minlength=len(angles) * bins).reshape(len(angles), bins)
+    # Rows line up when projecting along the text direction, i.e. at minus
+    # the page's rotation
+    return -float(angles[np.argmax(histograms.astype(np.float64).var(axis=1))])
+
+
+def deskew(image):
+    angle = estimate_skew(image)
+    if angle == 0:
+        return image
+    return image.rotate(-angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255)
+
+
+def _clean(image, settings):
+    if settings["binarize"]:
+        image = binarize(image)
+    if settings["deskew"]:
+        image = deskew(image)
+    return image
+
+
+def preprocess(source, profile):
+    """Runs the configured preprocessing profile on an image file or stream."""
+    settings = PROFILES[profile]
+    if settings["target_dpi"] is None and not settings["binarize"] and not settings["deskew"]:
+        return Image.open(source)
+
+    return _clean(decode(source, settings["target_dpi"]), settings)
+
+
+def render_pdf_page(path, index, profile):
+    """Renders one page of a PDF file and runs the preprocessing profile on it.
+
+    Only the requested page is parsed and rasterized, straight to grayscale
+    at the profile's DPI, so pages can be rendered in parallel by separate
+    workers.
+    """
+    settings = PROFILES[profile]
+    dpi = settings["target_dpi"] or PDF_RENDER_DPI
+    document = pypdfium2.PdfDocument(path)
+    try:
+        page = document[index]
+        scale = dpi / PDF_POINTS_PER_INCH
+        # A page can declare any size; render poster-sized pages smaller
+        # rather than allocating a huge bitmap
+        width, height = page.get_size()
+        scale = min(scale, (Config.OCR_MAX_IMAGE_PIXELS / max(width * height, 1)) ** 0.5)
+        image = page.render(scale=scale, grayscale=True).to_pil().convert("L")
+        page.close()
+    finally:
+        document.close()
+    return _clean(image, settings)
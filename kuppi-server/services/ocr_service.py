@@ -1,12 +1,129 @@
-import pytesseract
-from PIL import Image
-import io
+from config import Config
+from services.ocr_worker import init_ocr_worker, run_timed, ocr_image_bytes, ocr_image_file, ocr_pdf_page, OCRTimeoutError
+from services.ocr_cache_service import get_cached_image_text, cache_image_text
+from services.upload_service import spool_upload, sniff_image, remove_file, UploadError
+from services.metrics_service import ocr_seconds, dependency_in_flight
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
 
-def extract_text_from_image(image_file):
-    """Extracts text from an uploaded image file."""
+class OCRBusyError(Exception):
+    """Raised when every OCR worker is busy and the queue is full."""
+
+_executor = None
+_executor_lock = threading.Lock()
+# Jobs running plus jobs waiting; anything beyond is rejected straight away
+_slots = threading.BoundedSemaphore(Config.OCR_WORKERS + Config.OCR_QUEUE_SIZE)
+
+def _get_executor():
+    # Created lazily so each gunicorn worker gets its own pool after forking.
+    # Spawned (not forked) children don't inherit the Mongo client or threads,
+    # and only import services.ocr_worker.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=Config.OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_ocr_worker
+            )
+        return _executor
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+def _finished(future, task):
+    _slots.release()
+    dependency_in_flight.dec("tesseract")
+    # Tasks that never ran (cancelled, or lost with a dead worker) are not timed
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is None:
+        ocr_seconds.observe(future.result()[1], task, "success")
+    elif hasattr(error, "seconds"):
+        ocr_seconds.observe(error.seconds, task, "failure")
+
+def _submit(task, function, *args):
+    # The future's result is (text, seconds spent in the worker)
+    if not _slots.acquire(blocking=False):
+        raise OCRBusyError()
     try:
-        image = Image.open(io.BytesIO(image_file.read()))
-        extracted_text = pytesseract.image_to_string(image, lang="sin")
-        return {"text": extracted_text}, 200
+        future = _get_executor().submit(run_timed, function, *args)
+    except Exception:
+        _slots.release()
+        raise
+    dependency_in_flight.inc("tesseract")
+    future.add_done_callback(lambda done: _finished(done, task))
+    return future
+
+def submit_ocr(image_bytes, profile=None):
+    """Queues an OCR job and returns its future, or raises OCRBusyError.
+
+    The future's result is ``(text, seconds)``.
+    """
+    return _submit("image", ocr_image_bytes, image_bytes, profile or Config.OCR_PREPROCESSING_PROFILE)
+
+def submit_ocr_file(path, profile=None):
+    """Queues OCR of an image file; the worker reads it from disk itself."""
+    return _submit("image", ocr_image_file, path, profile or Config.OCR_PREPROCESSING_PROFILE)
+
+def submit_pdf_page_ocr(path, index, profile=None):
+    """Queues OCR of one page of a PDF file; the worker renders the page itself."""
+    return _submit("pdf_page", ocr_pdf_page, path, index, profile or Config.OCR_PREPROCESSING_PROFILE)
+
+def ocr_error_response(error):
+    """Maps an OCR failure to an error payload and status code."""
+    if isinstance(error, OCRBusyError):
+        return {"error": "OCR service is busy. Please try again shortly."}, 503
+    if isinstance(error, (FutureTimeoutError, OCRTimeoutError)):
+        return {"error": "OCR timed out."}, 504
+    if isinstance(error, BrokenProcessPool):
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        _reset_executor()
+        return {"error": str(error)}, 500
+    return {"error": str(error)}, 500
+
+def _extract_text(path, digest):
+    try:
+        sniff_image(path)
+    except UploadError as e:
+        return {"error": str(e)}, e.status_code
+
+    profile = Config.OCR_PREPROCESSING_PROFILE
+    cached_text = get_cached_image_text(digest, path, profile)
+    if cached_text is not None:
+        return {"text": cached_text}, 200
+
+    future = None
+    try:
+        future = submit_ocr_file(path, profile)
+        extracted_text, _ = future.result(timeout=Config.OCR_REQUEST_TIMEOUT_SECONDS)
     except Exception as e:
-        return {"error": str(e)}, 500
\ No newline at end of file
+        if future is not None:
+            future.cancel()
+        return ocr_error_response(e)
+
+    cache_image_text(digest, path, profile, extracted_text)
+    return {"text": extracted_text}, 200
+
+def extract_text_from_image(image_file):
+    """Extracts text from an uploaded image file.
+
+    The upload is spooled to disk rather than read into memory, and its
+    format and dimensions are checked from the header before anything is
+    decoded. Repeated uploads of the same image are answered from the cache
+    without taking an OCR slot.
+    """
+    try:
+        path, digest = spool_upload(image_file, Config.OCR_MAX_UPLOAD_BYTES)
+    except UploadError as e:
+        return {"error": str(e)}, e.status_code
+
+    try:
+        return _extract_text(path, digest)
+    finally:
+        remove_file(path)
@@ -0,0 +1,108 @@
+"""Code that runs inside the OCR worker processes.
+
+Kept apart from services.ocr_service so spawned workers import only what
+OCR needs, not MongoDB or the web app.
+"""
+import io
+import time
+import pytesseract
+from config import Config
+from services.ocr_preprocessing import preprocess, render_pdf_page
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+OCR_LANGUAGE = "sin"
+
+# pytesseract reports its timeout only through this RuntimeError message
+PYTESSERACT_TIMEOUT_MESSAGE = "Tesseract process timeout"
+
+class OCRTimeoutError(Exception):
+    """Raised when Tesseract gives up on an image after OCR_TIMEOUT_SECONDS."""
+
+# Warm Tesseract handle of the current OCR worker process, if any
+_tess_api = None
+
+def init_ocr_worker():
+    """Prepares an OCR worker process.
+
+    With the tesserocr backend the Sinhala model is loaded once here and the
+    handle reused for every image, instead of pytesseract starting a
+    tesseract process (and reloading sin.traineddata) per call. Falls back
+    to pytesseract when tesserocr is missing or cannot load the model.
+    """
+    global _tess_api
+    if Config.TESSERACT_PATH:
+        pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_PATH
+
+    if Config.OCR_BACKEND == "pytesseract" or tesserocr is None:
+        return
+    try:
+        if Config.TESSDATA_PATH:
+            _tess_api = tesserocr.PyTessBaseAPI(path=Config.TESSDATA_PATH, lang=OCR_LANGUAGE)
+        else:
+            _tess_api = tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE)
+    except RuntimeError as e:
+        print(f"Error loading tesserocr, falling back to pytesseract: {e}")
+
+def recognize(image):
+    """OCRs a PIL image with the worker's backend."""
+    if _tess_api is not None:
+        _tess_api.SetImage(image)
+        # Recognize gives up (returning False) once the timeout passes, so a
+        # stuck page does not hold the worker and its OCR slot
+        if not _tess_api.Recognize(timeout=int(Config.OCR_TIMEOUT_SECONDS * 1000)):
+            raise OCRTimeoutError("OCR timed out.")
+        return _tess_api.GetUTF8Text()
+    try:
+        # pytesseract kills the tesseract process once the timeout passes
+        return pytesseract.image_to_string(image, lang=OCR_LANGUAGE, timeout=Config.OCR_TIMEOUT_SECONDS)
+    except RuntimeError as e:
+        if str(e) == PYTESSERACT_TIMEOUT_MESSAGE:
+            raise OCRTimeoutError("OCR timed out.") from None
+        raise
+
+def ocr_image_bytes(image_bytes, profile):
+    """Runs in an OCR worker process."""
+    try:
+        return recognize(preprocess(io.BytesIO(image_bytes), profile))
+    except OCRTimeoutError:
+        raise
+    except Exception as e:
+        # Some pytesseract errors cannot be unpickled in the parent, which
+        # would mark the whole pool as broken; send back a plain error instead
+        raise RuntimeError(str(e)) from None
+
+def ocr_image_file(path, profile):
+    """Runs in an OCR worker process; the image is read from disk here."""
+    try:
+        return recognize(preprocess(path, profile))
+    except OCRTimeoutError:
+        raise
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+def ocr_pdf_page(path, index, profile):
+    """Runs in an OCR worker process."""
+    try:
+        return recognize(render_pdf_page(path, index, profile))
+    except OCRTimeoutError:
+        raise
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+def run_timed(function, *args):
+    """Runs an OCR task and returns ``(result, seconds)``.
+
+    The time is taken inside the worker process, so it excludes the time the
+    task waited for a free worker. Failures carry it as ``error.seconds``.
+    """
+    started = time.perf_counter()
+    try:
+        return function(*args), time.perf_counter() - started
+    except Exception as e:
+        # Exceptions keep their attributes when pickled back to the parent
+        e.seconds = time.perf_counter() - started
+        raise
@@ -1,4 +1,16 @@
 import random
+from services.otp_store import NOT_FOUND, EXPIRED, TOO_MANY_ATTEMPTS, INVALID
+
+OTP_ERRORS = {
+    NOT_FOUND: ({"error": "No OTP found for this email."}, 400),
+    EXPIRED: ({"error": "OTP has expired. Please request a new one."}, 400),
+    TOO_MANY_ATTEMPTS: ({"error": "Too many incorrect attempts. Request a new OTP."}, 403),
+    INVALID: ({"error": "Invalid OTP. Please try again."}, 400),
+}
 
 def generate_otp():
-    return str(random.randint(100000, 999999))
\ No newline at end of file
+    return str(random.randint(100000, 999999))
+
+def otp_error_response(result):
+    """Maps a failed OTPStore.verify result to an error payload and status code."""
+    return OTP_ERRORS[result]
@@ -0,0 +1,169 @@
+import datetime
+import threading
+import time
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from config import Config
+
+# MemoryOTPStore drops expired entries after this many issues
+MEMORY_SWEEP_INTERVAL = 1000
+
+# Outcomes of OTPStore.verify
+VERIFIED = "verified"
+NOT_FOUND = "not_found"
+EXPIRED = "expired"
+TOO_MANY_ATTEMPTS = "too_many_attempts"
+INVALID = "invalid"
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _utc(value):
+    # pymongo returns naive datetimes that are in UTC
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+class MongoOTPStore:
+    """OTPs in a collection keyed by ``email``, with a TTL on ``expires_at``.
+
+    Each step is one atomic operation, so concurrent requests cannot both
+    pass the cooldown or both use the same code:
+
+    - issue: an upsert matching on ``email`` alone, whose update pipeline
+      keeps the current entry while its cooldown lasts. An existing entry is
+      always updated in place, so the cooldown holds even without the unique
+      ``email`` index; the index also stops two first issues racing.
+    - verify: a ``find_one_and_delete`` matching the code, its expiry and
+      the attempt limit. Only a wrong code costs a second round trip, to
+      count the attempt.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def issue(self, email, otp, ttl_seconds, cooldown_seconds):
+        """Stores a new OTP for ``email``; returns False while the cooldown lasts."""
+        now = _now()
+        # A missing resend_after (entries written before it existed) sorts
+        # before any date, so those entries can be reissued
+        reissue = {"$not": [{"$gt": ["$resend_after", now]}]}
+        values = {
+            "otp": otp,
+            "attempts": 0,
+            "resend_after": now + datetime.timedelta(seconds=cooldown_seconds),
+            "expires_at": now + datetime.timedelta(seconds=ttl_seconds)
+        }
+        try:
+            previous = self._collection.find_one_and_update(
+                {"email": email},
+                [{"$set": {
+                    field: {"$cond": [reissue, {"$literal": value}, f"${field}"]}
+                    for field, value in values.items()
+                }}],
+                {"resend_after": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Another request inserted the first entry at the same moment
+            return False
+        # The entry as the update saw it decides, like the pipeline did
+        return previous is None or previous.get("resend_after") is None or _utc(previous["resend_after"]) <= now
+
+    def verify(self, email, otp, max_attempts):
+        """Checks a code and consumes the OTP if it matches."""
+        now = _now()
+        if self._collection.find_one_and_delete(
+            {"email": email, "otp": otp, "attempts": {"$lt": max_attempts}, "expires_at": {"$gt": now}},
+            {"_id": 1}
+        ):
+            return VERIFIED
+
+        entry = self._collection.find_one_and_update(
+            {"email": email},
+            {"$inc": {"attempts": 1}},
+            {"expires_at": 1, "attempts": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if entry is None:
+            return NOT_FOUND
+        if _utc(entry["expires_at"]) <= now:
+            self._collection.delete_one({"_id": entry["_id"]})
+            return EXPIRED
+        if entry["attempts"] > max_attempts:
+            self._collection.delete_one({"_id": entry["_id"]})
+            return TOO_MANY_ATTEMPTS
+        return INVALID
+
+    def delete(self, email, otp=None):
+        query = {"email": email}
+        if otp is not None:
+            query["otp"] = otp
+        self._collection.delete_one(query)
+
+
+class MemoryOTPStore:
+    """Same behaviour as MongoOTPStore, in this process only.
+
+    For tests and single-process deployments. OTPs do not survive a restart,
+    and the mail dispatcher's cleanup of undeliverable OTPs does not reach
+    them; they simply expire.
+    """
+
+    def __init__(self, timer=time.monotonic):
+        self._timer = timer
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._issues = 0
+
+    def issue(self, email, otp, ttl_seconds, cooldown_seconds):
+        now = self._timer()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry and entry["expires_at"] > now and entry["resend_after"] > now:
+                return False
+            self._entries[email] = {
+                "otp": otp,
+                "attempts": 0,
+                "resend_after": now + cooldown_seconds,
+                "expires_at": now + ttl_seconds
+            }
+            self._issues += 1
+            if self._issues % MEMORY_SWEEP_INTERVAL == 0:
+                # Stands in for the TTL index
+                for expired in [key for key, entry in self._entries.items() if entry["expires_at"] <= now]:
+                    del self._entries[expired]
+        return True
+
+    def verify(self, email, otp, max_attempts):
+        now = self._timer()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return NOT_FOUND
+            if entry["expires_at"] <= now:
+                del self._entries[email]
+                return EXPIRED
+            if entry["attempts"] >= max_attempts:
+                del self._entries[email]
+                return TOO_MANY_ATTEMPTS
+            if entry["otp"] != otp:
+                entry["attempts"] += 1
+                return INVALID
+            del self._entries[email]
+            return VERIFIED
+
+    def delete(self, email, otp=None):
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry and (otp is None or entry["otp"] == otp):
+                del self._entries[email]
+
+
+def create_otp_store(collection):
+    """Builds the store selected by Config.OTP_STORE ("mongo" or "memory")."""
+    if Config.OTP_STORE == "memory":
+        return MemoryOTPStore()
+    return MongoOTPStore(collection)
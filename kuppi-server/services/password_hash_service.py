@@ -0,0 +1,54 @@
+from config import Config
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+import threading
+
+class PasswordHashBusyError(Exception):
+    """Raised when every hashing worker is busy and the queue is full."""
+
+# hashlib's scrypt and pbkdf2 release the GIL, so threads hash in parallel
+# while the pool size caps how many cores logins can take
+_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+# Hashes running plus hashes waiting; anything beyond is rejected straight away
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE_SIZE)
+
+def _run(function, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashBusyError()
+    try:
+        future = _executor.submit(function, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        # Only a long queue makes a single hash this slow
+        raise PasswordHashBusyError()
+
+@lru_cache(maxsize=None)
+def _full_method(method):
+    # Werkzeug fills in default parameters for a bare method ("scrypt",
+    # "pbkdf2"); a throwaway hash shows the prefix stored hashes will carry
+    return generate_password_hash("", method).split("$", 1)[0]
+
+def hash_password(password):
+    """Hashes a password with the configured method; may raise PasswordHashBusyError."""
+    return _run(generate_password_hash, password, _full_method(Config.PASSWORD_HASH_METHOD))
+
+def verify_password(password_hash, password):
+    """Checks a password against a stored hash; may raise PasswordHashBusyError."""
+    return _run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with other than the configured parameters.
+
+    Werkzeug hashes start with their method and cost parameters, e.g.
+    ``scrypt:32768:8:1$salt$hash``, which serves as the parameter version.
+    """
+    return password_hash.split("$", 1)[0] != _full_method(Config.PASSWORD_HASH_METHOD)
+
+def busy_response():
+    return {"error": "Server is busy. Please try again shortly."}, 503
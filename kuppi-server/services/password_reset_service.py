@@ -1,33 +1,29 @@
-import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
 from db import users_collection, otp_storage_password_reset_collection
-from services.otp_service import generate_otp
-from services.email_service import send_email
+from services.otp_service import generate_otp, otp_error_response
+from services.otp_store import create_otp_store, VERIFIED
+from services.email_service import enqueue_email
+from services.user_cache_service import invalidate_user
+from services.password_hash_service import hash_password, busy_response, PasswordHashBusyError
 
 MAX_OTP_ATTEMPTS = 3
 OTP_EXPIRY_SECONDS = 600  # 10 minutes
 OTP_REQUEST_COOLDOWN_SECONDS = 60  # 1 minute
 
+password_reset_otp_store = create_otp_store(otp_storage_password_reset_collection)
+
 
 def request_password_reset_service(email):
     """Handles password reset requests by generating an OTP and sending it via email."""
-    user = users_collection.find_one({"email": email})
+    user = users_collection.find_one({"email": email}, {"_id": 1})
     if not user:
         return {"error": "User not found."}, 404
 
-    otp_data = otp_storage_password_reset_collection.find_one({"email": email})
-    if otp_data and (datetime.datetime.now() - otp_data.get("timestamp", datetime.datetime.min)).total_seconds() < OTP_REQUEST_COOLDOWN_SECONDS:
+    otp = generate_otp()
+    if not password_reset_otp_store.issue(email, otp, OTP_EXPIRY_SECONDS, OTP_REQUEST_COOLDOWN_SECONDS):
         return {"error": "Please wait before requesting another OTP."}, 429
 
-    otp = generate_otp()
     try:
-        otp_storage_password_reset_collection.update_one(
-            {"email": email},
-            {"$set": {"otp": otp, "timestamp": datetime.datetime.now(), "attempts": 0}},
-            upsert=True
-        )
-
         # Send OTP email
         subject = "Your Password Reset OTP"
         content = f"""
@@ -65,50 +61,39 @@ def request_password_reset_service(email):
                 </div>
                 """
         
-        if not send_email(email, subject, content):
-            otp_storage_password_reset_collection.delete_one({"email": email})  # Cleanup if email fails
+        cleanup = [{"collection": "otp_storage_password_reset", "filter": {"email": email, "otp": otp}}]
+        if not enqueue_email(email, subject, content, OTP_EXPIRY_SECONDS, cleanup):
+            password_reset_otp_store.delete(email, otp)  # Cleanup if email could not be queued
             return {"error": "Failed to send OTP. Please try again."}, 500
 
         return {"success": True, "message": "OTP sent to your email."}, 200
     except Exception as e:
         # Cleanup in case of any failure
-        otp_storage_password_reset_collection.delete_one({"email": email})
+        password_reset_otp_store.delete(email, otp)
         return {"error": f"An error occurred: {str(e)}"}, 500
 
 
 def verify_password_reset_otp_service(email, otp):
     """Verifies the OTP for password reset."""
-    otp_data = otp_storage_password_reset_collection.find_one({"email": email})
-    if not otp_data:
-        return {"error": "No OTP found for this email."}, 400
-
-    if (datetime.datetime.now() - otp_data["timestamp"]).total_seconds() > OTP_EXPIRY_SECONDS:
-        otp_storage_password_reset_collection.delete_one({"email": email})
-        return {"error": "OTP has expired. Please request a new one."}, 400
-
-    if otp_data["attempts"] >= MAX_OTP_ATTEMPTS:
-        otp_storage_password_reset_collection.delete_one({"email": email})
-        return {"error": "Too many incorrect attempts. Request a new OTP."}, 403
-
-    if otp != otp_data["otp"]:
-        otp_storage_password_reset_collection.update_one(
-            {"email": email}, {"$inc": {"attempts": 1}}
-        )
-        return {"error": "Invalid OTP. Please try again."}, 400
+    result = password_reset_otp_store.verify(email, otp, MAX_OTP_ATTEMPTS)
+    if result != VERIFIED:
+        return otp_error_response(result)
 
-    otp_storage_password_reset_collection.delete_one({"email": email})  # OTP verified, remove from storage
     return {"success": True, "message": "OTP verified. You can now reset your password."}, 200
 
 
 def reset_password_service(email, new_password):
     """Resets the user's password after OTP verification."""
-    user = users_collection.find_one({"email": email})
+    user = users_collection.find_one({"email": email}, {"_id": 1})
     if not user:
         return {"error": "User not found."}, 404
 
     try:
-        hashed_password = generate_password_hash(new_password)
+        hashed_password = hash_password(new_password)
         users_collection.update_one({"email": email}, {"$set": {"password": hashed_password}})
+        invalidate_user(email)
         return {"success": True, "message": "Password reset successful."}, 200
+    except PasswordHashBusyError:
+        return busy_response()
     except Exception as e:
         return {"error": f"An error occurred while resetting the password: {str(e)}"}, 500
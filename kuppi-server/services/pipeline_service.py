@@ -0,0 +1,74 @@
+import time
+from config import Config
+from services.generate_summary_service import summary_events
+from services.notes_service import add_note_service
+from services.ocr_service import extract_text_from_image
+from services.streaming_service import format_sse
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000)
+
+def _stage(stage, status, **details):
+    return format_sse(dict(details, stage=stage, status=status), "stage")
+
+def ocr_summary_pipeline(image_file, options):
+    """OCRs an image, summarizes the text and optionally saves it as a note.
+
+    The client uploads the image once and never sends the text back, and
+    the summary starts as soon as OCR finishes. Streams ``stage`` events as
+    each stage starts and finishes, the summary as ``chunk`` events, then
+    ``done``; a failure ends the stream with an ``error`` naming its stage.
+
+    ``options`` holds ``percentage``, ``style`` and ``mode`` for the summary,
+    ``include_text`` to also send the OCR text, and ``save`` with ``title``
+    to store the summary as a note.
+    """
+    started = time.perf_counter()
+
+    yield _stage("ocr", "running")
+    result, status_code = extract_text_from_image(image_file)
+    if status_code != 200:
+        if status_code == 503:
+            result["retry_after"] = Config.OCR_RETRY_AFTER_SECONDS
+        yield format_sse(dict(result, stage="ocr"), "error")
+        return
+    text = result["text"]
+    if not text.strip():
+        yield format_sse({"error": "No text found in the image", "stage": "ocr"}, "error")
+        return
+    ocr_details = {"ms": _elapsed_ms(started)}
+    if options.get("include_text"):
+        ocr_details["text"] = text
+    yield _stage("ocr", "done", **ocr_details)
+
+    summary_started = time.perf_counter()
+    yield _stage("summary", "running")
+    parts = []
+    events = summary_events({
+        "content": text,
+        "percentage": options.get("percentage", 50),
+        "style": options.get("style", "academic"),
+        "mode": options.get("mode")
+    })
+    try:
+        for event, payload in events:
+            if event == "chunk":
+                parts.append(payload["text"])
+                yield format_sse(payload, "chunk")
+            elif event == "error":
+                yield format_sse(dict(payload, stage="summary"), "error")
+                return
+            else:
+                yield _stage("summary", "done", ms=_elapsed_ms(summary_started), cached=payload["cached"])
+    finally:
+        events.close()
+
+    if options.get("save"):
+        yield _stage("save", "running")
+        result, status_code = add_note_service({"title": options["title"], "content": "".join(parts)})
+        if status_code != 201:
+            yield format_sse(dict(result, stage="save"), "error")
+            return
+        yield _stage("save", "done")
+
+    yield format_sse({"total_ms": _elapsed_ms(started), "saved": bool(options.get("save"))}, "done")
@@ -0,0 +1,108 @@
+import re
+import unicodedata
+
+# Full stop, question/exclamation marks, the danda some writers use and the
+# Sinhala kunddaliya
+SENTENCE_END = re.compile(r"(?<=[.?!।෴])\s+")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# Runs of Sinhala letters/signs (ZWJ and ZWNJ included, since they appear
+# inside conjuncts like ශ්‍රී), or runs of Latin letters and digits
+WORD = re.compile(r"[\u0D80-\u0DF3\u200C\u200D]+|[a-z0-9]+")
+JOINERS = re.compile(r"[\u200C\u200D]")
+WORD_ANY_CASE = re.compile(WORD.pattern, re.IGNORECASE)
+
+# Very common function words that carry no meaning on their own
+STOP_WORDS = {
+    "සහ", "හා", "ද", "ය", "යි", "වේ", "ඇත", "ඇති", "මෙම", "එම", "ඒ", "මේ", "බව",
+    "ලෙස", "සඳහා", "අතර", "හෝ", "වන", "විසින්", "තුළ", "නම්", "විට", "නැත", "කර",
+    "the", "a", "an", "and", "or", "of", "to", "in", "is", "are", "for", "on", "with"
+}
+
+
+def split_paragraphs(text):
+    return [paragraph.strip() for paragraph in PARAGRAPH_BREAK.split(text or "") if paragraph.strip()]
+
+
+def split_sentences(text):
+    """Splits Sinhala (or mixed Sinhala/English) text into sentences.
+
+    Single line breaks are treated as sentence boundaries too, since OCR
+    output and lecture notes often have one point per line without a full stop.
+    """
+    sentences = []
+    for line in (text or "").splitlines():
+        sentences.extend(sentence.strip() for sentence in SENTENCE_END.split(line) if sentence.strip())
+    return sentences
+
+
+def _pack(pieces, max_chars, separator):
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(separator) + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_text(text, max_chars):
+    """Splits text into chunks of at most ``max_chars`` on natural boundaries.
+
+    Paragraphs are kept whole where possible, then sentences; only a single
+    sentence longer than ``max_chars`` is cut mid-sentence.
+    """
+    pieces = []
+    for paragraph in split_paragraphs(text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in _pack(split_sentences(paragraph), max_chars, " "):
+            pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+    return _pack(pieces, max_chars, "\n\n")
+
+
+def tokenize(text):
+    """Splits text into normalized word tokens.
+
+    Text is NFC normalized and lower-cased, and zero-width joiners are dropped
+    from each word so that a conjunct typed with or without a joiner (for
+    example ශ්‍රී and ශ්රී) produces the same token. Stop words are removed.
+    """
+    normalized = unicodedata.normalize("NFC", text or "").lower()
+    tokens = (JOINERS.sub("", word) for word in WORD.findall(normalized))
+    return [token for token in tokens if token and token not in STOP_WORDS]
+
+
+def highlight_snippet(text, terms, max_chars):
+    """Cuts a snippet of about ``max_chars`` around the first matching term.
+
+    ``terms`` are tokens as produced by ``tokenize``. Returns the snippet and
+    a list of ``[start, end]`` offsets of every matching word inside it, so
+    the client can highlight them however it likes.
+    """
+    text = " ".join(unicodedata.normalize("NFC", text or "").split())
+    terms = set(terms)
+    matches = [
+        (match.start(), match.end())
+        for match in WORD_ANY_CASE.finditer(text)
+        if JOINERS.sub("", match.group().lower()) in terms
+    ]
+
+    start = 0
+    if matches and matches[0][1] > max_chars:
+        # Keep some words before the first match for context
+        start = text.rfind(" ", 0, max(0, matches[0][0] - max_chars // 4)) + 1
+    end = min(len(text), start + max_chars)
+    if end < len(text) and text.rfind(" ", start, end) > start:
+        end = text.rfind(" ", start, end)
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    shift = len(prefix) - start
+    highlights = [[match_start + shift, match_end + shift] for match_start, match_end in matches if match_start >= start and match_end <= end]
+    return f"{prefix}{text[start:end]}{suffix}", highlights
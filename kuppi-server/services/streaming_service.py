@@ -0,0 +1,21 @@
+import json
+from flask import Response, stream_with_context
+
+def format_sse(data, event=None):
+    """Formats one server-sent event with a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return f"{message}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def sse_response(events):
+    """Wraps a generator of formatted events in a streaming response.
+
+    When the client disconnects the WSGI server closes the response, which
+    raises GeneratorExit inside ``events``; generators should release any
+    upstream work in a ``finally`` block.
+    """
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import tempfile
+import warnings
+from PIL import Image, UnidentifiedImageError
+from config import Config
+
+# Formats phone cameras and scanners produce; anything else is refused
+# before a decoder for it is ever run
+ALLOWED_IMAGE_FORMATS = {"JPEG", "PNG", "WEBP", "TIFF", "BMP", "MPO"}
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+class UploadError(Exception):
+    """Raised for an upload that is refused; carries the HTTP status."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def spool_upload(upload, max_bytes, suffix=""):
+    """Copies an upload to a named temporary file, one chunk at a time.
+
+    Only a chunk is held in memory however large the upload is, and the
+    file can be handed to OCR worker processes by path. Returns the path and
+    the SHA-256 of the contents; raises UploadError (413) as soon as the
+    upload passes ``max_bytes``.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    descriptor, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(descriptor, "wb") as spool:
+            for chunk in iter(lambda: upload.read(SPOOL_CHUNK_BYTES), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"File is larger than {max_bytes // (1024 * 1024)} MB", 413)
+                digest.update(chunk)
+                spool.write(chunk)
+    except Exception:
+        remove_file(path)
+        raise
+    return path, digest.hexdigest()
+
+def sniff_image(source):
+    """Checks an image's format and dimensions from its header alone.
+
+    ``Image.open`` only parses the header, so a small file that would
+    decompress to billions of pixels (a decompression bomb) is refused here
+    without decoding it.
+    """
+    try:
+        with warnings.catch_warnings():
+            # PIL only warns between one and two times MAX_IMAGE_PIXELS
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                image_format = image.format
+                width, height = image.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise UploadError("Image has too many pixels", 413) from None
+    except (UnidentifiedImageError, OSError):
+        raise UploadError("Unsupported or corrupt image file") from None
+
+    if image_format not in ALLOWED_IMAGE_FORMATS:
+        raise UploadError(f"Unsupported image format: {image_format}")
+    if width * height > Config.OCR_MAX_IMAGE_PIXELS:
+        raise UploadError(f"Image is too large ({width}x{height} pixels)", 413)
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"Error removing uploaded file: {e}")
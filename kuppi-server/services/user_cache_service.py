@@ -0,0 +1,36 @@
+import threading
+from cachetools import TTLCache
+from config import Config
+from db import users_collection
+
+# Only what authenticated routes need; never the password or embedded notes
+USER_PROJECTION = {"_id": 0, "email": 1, "name": 1}
+
+_users = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL_SECONDS)
+_lock = threading.Lock()
+
+def get_user(email):
+    """Returns ``{"email", "name"}`` for an existing user, or None.
+
+    Found users are cached per worker for USER_CACHE_TTL_SECONDS; missing
+    ones are not, so a user who has just signed up is seen straight away.
+    """
+    with _lock:
+        user = _users.get(email)
+    if user is not None:
+        return user
+
+    user = users_collection.find_one({"email": email}, USER_PROJECTION)
+    if user is not None:
+        with _lock:
+            _users[email] = user
+    return user
+
+def invalidate_user(email):
+    """Drops a cached user; call after changing their account."""
+    with _lock:
+        _users.pop(email, None)
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
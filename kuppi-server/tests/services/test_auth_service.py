@@ -1,8 +1,8 @@
-import sys
-import os
 import unittest
 from unittest.mock import patch, MagicMock
-import datetime
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from pymongo.errors import PyMongoError
 from werkzeug.security import generate_password_hash
 from services.auth_service import (
     signup_user_service,
@@ -12,32 +12,50 @@ from services.auth_service import (
     OTP_EXPIRY_SECONDS,
     MAX_OTP_ATTEMPTS
 )
+from services.password_hash_service import PasswordHashBusyError
+from services.otp_store import MemoryOTPStore, VERIFIED, NOT_FOUND
 
-# Add the root directory to the sys.path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
-
-from __init__ import create_app  # Now you can import create_app from the root
+def jwt_app():
+    # Enough of an app for create_access_token, without create_app's start up
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret"
+    JWTManager(app)
+    return app
 
 class TestSignupService(unittest.TestCase):
 
+    def setUp(self):
+        self.now = 0
+        self.otp_store = MemoryOTPStore(timer=lambda: self.now)
+        patcher = patch("services.auth_service.signup_otp_store", self.otp_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def issue_otp(self, otp="123456"):
+        self.otp_store.issue("test@example.com", otp, OTP_EXPIRY_SECONDS, OTP_REQUEST_COOLDOWN_SECONDS)
+
     @patch("services.auth_service.users_collection")
     @patch("services.auth_service.pending_users_collection")
-    @patch("services.auth_service.otp_storage_signup_collection")
-    @patch("services.auth_service.send_email")
+    @patch("services.auth_service.enqueue_email")
     @patch("services.auth_service.generate_otp", return_value="123456")
     def test_signup_user_success(
-        self, mock_generate_otp, mock_send_email, mock_otp_collection, mock_pending_users_collection, mock_users_collection
+        self, mock_generate_otp, mock_enqueue_email, mock_pending_users_collection, mock_users_collection
     ):
         mock_users_collection.find_one.return_value = None
-        mock_otp_collection.find_one.return_value = None
-        mock_send_email.return_value = True
+        mock_enqueue_email.return_value = True
 
         response, status_code = signup_user_service("test@example.com", "Test User", "password123")
 
         self.assertEqual(status_code, 200)
         self.assertTrue(response["success"])
-        mock_otp_collection.update_one.assert_called_once()
-        mock_send_email.assert_called_once()
+        mock_pending_users_collection.update_one.assert_called_once()
+        mock_enqueue_email.assert_called_once()
+        # An undeliverable email only drops the OTP it carried
+        self.assertEqual(
+            mock_enqueue_email.call_args[0][4],
+            [{"collection": "otp_storage_signup", "filter": {"email": "test@example.com", "otp": "123456"}}]
+        )
+        self.assertEqual(self.otp_store.verify("test@example.com", "123456", MAX_OTP_ATTEMPTS), VERIFIED)
 
     @patch("services.auth_service.users_collection")
     def test_signup_user_already_exists(self, mock_users_collection):
@@ -49,98 +67,87 @@ class TestSignupService(unittest.TestCase):
         self.assertIn("error", response)
 
     @patch("services.auth_service.users_collection")
-    @patch("services.auth_service.otp_storage_signup_collection")
-    def test_signup_user_cooldown(self, mock_otp_collection, mock_users_collection):
+    @patch("services.auth_service.pending_users_collection")
+    @patch("services.auth_service.enqueue_email", return_value=True)
+    def test_signup_user_cooldown(self, mock_enqueue_email, mock_pending_users_collection, mock_users_collection):
         mock_users_collection.find_one.return_value = None
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "timestamp": datetime.datetime.now(),
-        }
+        self.issue_otp()
 
         response, status_code = signup_user_service("test@example.com", "Test User", "password123")
 
         self.assertEqual(status_code, 429)
         self.assertIn("error", response)
 
+        self.now += OTP_REQUEST_COOLDOWN_SECONDS
+        response, status_code = signup_user_service("test@example.com", "Test User", "password123")
+        self.assertEqual(status_code, 200)
+
     @patch("services.auth_service.users_collection")
-    @patch("services.auth_service.otp_storage_signup_collection")
-    @patch("services.auth_service.send_email")
+    @patch("services.auth_service.pending_users_collection")
+    @patch("services.auth_service.enqueue_email")
     @patch("services.auth_service.generate_otp", return_value="123456")
-    def test_signup_user_email_failure(self, mock_generate_otp, mock_send_email, mock_otp_collection, mock_users_collection):
+    def test_signup_user_email_failure(
+        self, mock_generate_otp, mock_enqueue_email, mock_pending_users_collection, mock_users_collection
+    ):
         mock_users_collection.find_one.return_value = None
-        mock_otp_collection.find_one.return_value = None
-        mock_send_email.return_value = False  # Simulate email send failure
+        mock_enqueue_email.return_value = False  # Simulate the outbox being unavailable
 
         response, status_code = signup_user_service("test@example.com", "Test User", "password123")
 
         self.assertEqual(status_code, 500)
         self.assertIn("error", response)
-        mock_otp_collection.delete_one.assert_called_once()  # Ensure this is called when email fails
-
-    # @patch("services.auth_service.otp_storage_signup_collection")
-    # def test_verify_signup_otp_success(self, mock_otp_collection):
-    #     mock_otp_collection.find_one.return_value = {
-    #         "email": "test@example.com",
-    #         "otp": "123456",
-    #         "timestamp": datetime.datetime.now() - datetime.timedelta(seconds=5),  # Ensure this is within the valid range
-    #         "attempts": 0,
-    #     }
-
-    #     response, status_code = verify_signup_otp_service("test@example.com", "123456")
-
-    #     self.assertEqual(status_code, 200)
-    #     self.assertTrue(response["success"])
-    #     mock_otp_collection.delete_one.assert_called_once()
-
-
-    @patch("services.auth_service.otp_storage_signup_collection")
-    def test_verify_signup_otp_expired(self, mock_otp_collection):
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "otp": "123456",
-            "timestamp": datetime.datetime.now() - datetime.timedelta(seconds=OTP_EXPIRY_SECONDS + 1),
-            "attempts": 0,
+        # The OTP is removed, so the user can ask again straight away
+        self.assertEqual(self.otp_store.verify("test@example.com", "123456", MAX_OTP_ATTEMPTS), NOT_FOUND)
+        mock_pending_users_collection.delete_one.assert_called_once()
+
+    @patch("services.auth_service.users_collection")
+    @patch("services.auth_service.pending_users_collection")
+    def test_verify_signup_otp_success(self, mock_pending_users_collection, mock_users_collection):
+        self.issue_otp()
+        mock_pending_users_collection.find_one_and_delete.return_value = {
+            "email": "test@example.com", "name": "Test User", "password": "hash"
         }
 
+        app = jwt_app()
+        with app.app_context():
+            response, status_code = verify_signup_otp_service("test@example.com", "123456")
+
+        self.assertEqual(status_code, 201)
+        self.assertTrue(response["success"])
+        mock_users_collection.insert_one.assert_called_once()
+        # The OTP is single use
+        self.assertEqual(verify_signup_otp_service("test@example.com", "123456")[1], 400)
+
+    def test_verify_signup_otp_expired(self):
+        self.issue_otp()
+        self.now += OTP_EXPIRY_SECONDS + 1
+
         response, status_code = verify_signup_otp_service("test@example.com", "123456")
 
         self.assertEqual(status_code, 400)
-        self.assertIn("error", response)
-        mock_otp_collection.delete_one.assert_called_once()
-
-    @patch("services.auth_service.otp_storage_signup_collection")
-    def test_verify_signup_otp_too_many_attempts(self, mock_otp_collection):
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "otp": "123456",
-            "timestamp": datetime.datetime.now(),
-            "attempts": MAX_OTP_ATTEMPTS,
-        }
+        self.assertIn("expired", response["error"])
+
+    def test_verify_signup_otp_too_many_attempts(self):
+        self.issue_otp()
+        for _ in range(MAX_OTP_ATTEMPTS):
+            verify_signup_otp_service("test@example.com", "654321")
 
         response, status_code = verify_signup_otp_service("test@example.com", "123456")
 
         self.assertEqual(status_code, 403)
         self.assertIn("error", response)
-        mock_otp_collection.delete_one.assert_called_once()
-
-    @patch("services.auth_service.otp_storage_signup_collection")
-    def test_verify_signup_otp_invalid(self, mock_otp_collection):
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "otp": "123456",
-            "timestamp": datetime.datetime.now(),
-            "attempts": 1,
-        }
+
+    def test_verify_signup_otp_invalid(self):
+        self.issue_otp()
 
         response, status_code = verify_signup_otp_service("test@example.com", "654321")
 
         self.assertEqual(status_code, 400)
-        self.assertIn("error", response)
-        mock_otp_collection.update_one.assert_called_once()
+        self.assertIn("Invalid", response["error"])
 
     @patch("services.auth_service.users_collection")
     def test_login_user_success(self, mock_users_collection):
-        app = create_app()  # Create app instance for context
+        app = jwt_app()
         with app.app_context():
             mock_users_collection.find_one.return_value = {
                 "email": "test@example.com",
@@ -152,6 +159,43 @@ class TestSignupService(unittest.TestCase):
             self.assertEqual(status_code, 200)
             self.assertTrue(response["success"])
 
+    @patch("services.auth_service.users_collection")
+    def test_login_rehashes_outdated_password_hash(self, mock_users_collection):
+        old_hash = generate_password_hash("correctpassword", method="pbkdf2:sha256:1000")
+        mock_users_collection.find_one.return_value = {"email": "test@example.com", "password": old_hash, "name": "Test User"}
+
+        app = jwt_app()
+        with app.app_context():
+            response, status_code = login_user_service("test@example.com", "correctpassword")
+
+        self.assertEqual(status_code, 200)
+        query, update = mock_users_collection.update_one.call_args[0]
+        self.assertEqual(query, {"email": "test@example.com", "password": old_hash})
+        self.assertTrue(update["$set"]["password"].startswith("scrypt:32768:8:1$"))
+
+    @patch("services.auth_service.users_collection")
+    def test_login_succeeds_when_rehash_cannot_be_saved(self, mock_users_collection):
+        old_hash = generate_password_hash("correctpassword", method="pbkdf2:sha256:1000")
+        mock_users_collection.find_one.return_value = {"email": "test@example.com", "password": old_hash, "name": "Test User"}
+        mock_users_collection.update_one.side_effect = PyMongoError("connection reset")
+
+        app = jwt_app()
+        with app.app_context():
+            response, status_code = login_user_service("test@example.com", "correctpassword")
+
+        self.assertEqual(status_code, 200)
+        self.assertTrue(response["success"])
+
+    @patch("services.auth_service.verify_password", side_effect=PasswordHashBusyError())
+    @patch("services.auth_service.users_collection")
+    def test_login_user_busy(self, mock_users_collection, mock_verify_password):
+        mock_users_collection.find_one.return_value = {"email": "test@example.com", "password": "hash"}
+
+        response, status_code = login_user_service("test@example.com", "correctpassword")
+
+        self.assertEqual(status_code, 503)
+        self.assertIn("error", response)
+
     @patch("services.auth_service.users_collection")
     def test_login_user_invalid_credentials(self, mock_users_collection):
         mock_users_collection.find_one.return_value = {"email": "test@example.com", "password": "wrongpassword"}
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import MagicMock
+from pymongo.errors import PyMongoError
+from services.cache_service import TwoTierCache, TRIM_CHECK_INTERVAL
+
+class TestTwoTierCache(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = MagicMock()
+        self.cache = TwoTierCache(self.collection, memory_size=2, ttl_seconds=60, max_documents=10)
+
+    def test_set_then_get_hits_memory(self):
+        self.cache.set("key", "value")
+
+        self.assertEqual(self.cache.get("key"), "value")
+        self.collection.find_one.assert_not_called()
+        self.assertEqual(self.cache.stats()["memory_hits"], 1)
+
+    def test_get_falls_back_to_persistent_tier(self):
+        self.collection.find_one.return_value = {"_id": "key", "value": "stored"}
+
+        self.assertEqual(self.cache.get("key"), "stored")
+        self.assertEqual(self.cache.get("key"), "stored")
+
+        self.collection.find_one.assert_called_once()
+        stats = self.cache.stats()
+        self.assertEqual(stats["persistent_hits"], 1)
+        self.assertEqual(stats["memory_hits"], 1)
+
+    def test_get_miss(self):
+        self.collection.find_one.return_value = None
+
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_memory_tier_is_lru_bounded(self):
+        self.collection.find_one.return_value = None
+        for key in ["a", "b", "c"]:
+            self.cache.set(key, key)
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["memory_entries"], 2)
+
+    def test_persistent_errors_are_treated_as_misses(self):
+        self.collection.find_one.side_effect = PyMongoError("down")
+        self.collection.update_one.side_effect = PyMongoError("down")
+
+        self.cache.set("key", "value")
+        self.cache.clear_memory()
+
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_trims_oldest_entries_past_max_documents(self):
+        self.collection.estimated_document_count.return_value = 13
+        self.collection.find.return_value.sort.return_value.limit.return_value = [{"_id": "old1"}, {"_id": "old2"}, {"_id": "old3"}]
+
+        for i in range(TRIM_CHECK_INTERVAL):
+            self.cache.set(f"key{i}", "value")
+
+        self.collection.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+        self.collection.delete_many.assert_called_once_with({"_id": {"$in": ["old1", "old2", "old3"]}})
+
+if __name__ == "__main__":
+    unittest.main()
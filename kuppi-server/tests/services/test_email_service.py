@@ -0,0 +1,163 @@
+import datetime
+import smtplib
+import unittest
+from unittest.mock import patch
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from services.email_service import enqueue_email, MailDispatcher
+
+class FakeSMTP:
+    """Stands in for an SMTP server connection; records what it is sent."""
+
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.failures = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def login(self, username, password):
+        self.username = username
+
+    def send_message(self, message):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(message)
+
+    def quit(self):
+        self.closed = True
+
+def outbox_message(attempts=1, deliver_within=600):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "_id": ObjectId(),
+        "to": "test@example.com",
+        "subject": "Your OTP",
+        "html": "<p>123456</p>",
+        "attempts": attempts,
+        "deliver_by": now + datetime.timedelta(seconds=deliver_within),
+        "on_failure": [{"collection": "otp_storage_signup", "filter": {"email": "test@example.com", "otp": "123456"}}]
+    }
+
+@patch("services.email_service.db")
+@patch("services.email_service.email_outbox_collection")
+@patch("services.email_service.Config")
+class TestMailDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        FakeSMTP.instances = []
+        self.dispatcher = MailDispatcher(smtp_factory=FakeSMTP)
+
+    def configure(self, mock_config):
+        mock_config.MAIL_SERVER = "localhost"
+        mock_config.MAIL_PORT = 465
+        mock_config.MAIL_USERNAME = "kuppi@example.com"
+        mock_config.MAIL_PASSWORD = "secret"
+        mock_config.MAIL_DEFAULT_SENDER = "kuppi@example.com"
+        mock_config.MAIL_TIMEOUT_SECONDS = 5
+        mock_config.MAIL_IDLE_SECONDS = 120
+        mock_config.MAIL_MAX_ATTEMPTS = 3
+        mock_config.MAIL_RETRY_BASE_SECONDS = 5
+
+    def last_update(self, mock_outbox):
+        return mock_outbox.update_one.call_args[0][1]["$set"]
+
+    def test_connection_reused_across_messages(self, mock_config, mock_outbox, mock_db):
+        self.configure(mock_config)
+
+        for _ in range(3):
+            self.dispatcher.deliver(outbox_message())
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        connection = FakeSMTP.instances[0]
+        self.assertEqual(len(connection.sent), 3)
+        self.assertEqual(connection.sent[0]["To"], "test@example.com")
+        self.assertEqual(connection.sent[0].get_content_subtype(), "html")
+        self.assertEqual(self.last_update(mock_outbox)["status"], "sent")
+
+    def test_reconnects_when_server_dropped_connection(self, mock_config, mock_outbox, mock_db):
+        self.configure(mock_config)
+        self.dispatcher.deliver(outbox_message())
+        FakeSMTP.instances[0].failures.append(smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+
+        self.dispatcher.deliver(outbox_message())
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(len(FakeSMTP.instances[1].sent), 1)
+        self.assertEqual(self.last_update(mock_outbox)["status"], "sent")
+
+    def test_transient_failure_retried_with_backoff(self, mock_config, mock_outbox, mock_db):
+        self.configure(mock_config)
+        self.dispatcher.deliver(outbox_message())
+        FakeSMTP.instances[0].failures.append(smtplib.SMTPResponseException(421, b"Try again later"))
+
+        before = datetime.datetime.now(datetime.timezone.utc)
+        self.dispatcher.deliver(outbox_message(attempts=2))
+
+        update = self.last_update(mock_outbox)
+        self.assertEqual(update["status"], "pending")
+        # Second attempt waits twice the base delay
+        self.assertGreaterEqual(update["next_attempt_at"] - before, datetime.timedelta(seconds=10))
+        mock_db.__getitem__.assert_not_called()
+
+    def test_permanent_failure_cleans_up(self, mock_config, mock_outbox, mock_db):
+        self.configure(mock_config)
+        self.dispatcher.deliver(outbox_message())
+        FakeSMTP.instances[0].failures.append(
+            smtplib.SMTPRecipientsRefused({"test@example.com": (550, b"No such user")})
+        )
+
+        self.dispatcher.deliver(outbox_message())
+
+        self.assertEqual(self.last_update(mock_outbox)["status"], "failed")
+        mock_db.__getitem__.assert_called_once_with("otp_storage_signup")
+        mock_db.__getitem__.return_value.delete_one.assert_called_once_with({"email": "test@example.com", "otp": "123456"})
+
+    def test_gives_up_after_max_attempts(self, mock_config, mock_outbox, mock_db):
+        self.configure(mock_config)
+        self.dispatcher.deliver(outbox_message())
+        FakeSMTP.instances[0].failures.append(smtplib.SMTPResponseException(451, b"Local error"))
+
+        self.dispatcher.deliver(outbox_message(attempts=3))
+
+        self.assertEqual(self.last_update(mock_outbox)["status"], "failed")
+        mock_db.__getitem__.return_value.delete_one.assert_called_once()
+
+    def test_expired_message_not_sent(self, mock_config, mock_outbox, mock_db):
+        self.configure(mock_config)
+
+        self.dispatcher.deliver(outbox_message(deliver_within=-1))
+
+        self.assertEqual(FakeSMTP.instances, [])
+        self.assertEqual(self.last_update(mock_outbox)["status"], "failed")
+
+    def test_unknown_cleanup_collection_ignored(self, mock_config, mock_outbox, mock_db):
+        self.configure(mock_config)
+        message = outbox_message(deliver_within=-1)
+        message["on_failure"] = [{"collection": "users", "filter": {}}]
+
+        self.dispatcher.deliver(message)
+
+        mock_db.__getitem__.assert_not_called()
+
+class TestEnqueueEmail(unittest.TestCase):
+
+    @patch("services.email_service.email_outbox_collection")
+    def test_enqueue_returns_without_sending(self, mock_outbox):
+        self.assertTrue(enqueue_email("test@example.com", "Subject", "<p>Hi</p>", 600))
+
+        message = mock_outbox.insert_one.call_args[0][0]
+        self.assertEqual(message["status"], "pending")
+        self.assertEqual(message["attempts"], 0)
+        self.assertEqual(message["expires_at"].tzinfo, datetime.timezone.utc)
+        self.assertLessEqual(message["deliver_by"] - message["created_at"], datetime.timedelta(seconds=600))
+
+    @patch("services.email_service.email_outbox_collection")
+    def test_enqueue_failure(self, mock_outbox):
+        mock_outbox.insert_one.side_effect = PyMongoError("not primary")
+
+        self.assertFalse(enqueue_email("test@example.com", "Subject", "<p>Hi</p>"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from services.extractive_summary_service import extractive_summary, rank_sentences
+
+class TestExtractiveSummaryService(unittest.TestCase):
+
+    def test_rank_sentences_prefers_central_sentences(self):
+        scores = rank_sentences([["තේ", "වගාව"], ["තේ", "වගාව", "කඳුකරය"], ["වැස්ස"]])
+
+        self.assertGreater(scores[0], scores[2])
+        self.assertGreater(scores[1], scores[2])
+        self.assertAlmostEqual(float(scores.sum()), 1.0, places=4)
+
+    def test_rank_sentences_without_shared_terms(self):
+        scores = rank_sentences([["අ"], ["ආ"], []])
+
+        self.assertTrue(all(abs(score - 1 / 3) < 1e-6 for score in scores))
+
+    def test_extractive_summary_respects_percentage_and_order(self):
+        sentences = [f"ලංකාවේ තේ වගාව {i} වැදගත්ය." for i in range(10)]
+        text = " ".join(sentences)
+
+        summary = extractive_summary(text, 30)
+
+        self.assertLessEqual(len(summary), len(text) * 0.3 + len(sentences[0]))
+        picked = summary.split(". ")
+        self.assertEqual(picked, sorted(picked, key=lambda sentence: text.index(sentence)))
+
+    def test_extractive_summary_short_input(self):
+        self.assertEqual(extractive_summary("එක් වාක්‍යයක් පමණි.", 10), "එක් වාක්‍යයක් පමණි.")
+        self.assertEqual(extractive_summary("", 10), "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+from flask import Flask
+from services.generate_answer_service import generate_answer_service, stream_answer_service
+
+class TestGenerateAnswerService(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.data = {"question": "ප්‍රභාසංශ්ලේෂණය යනු කුමක්ද?"}
+
+    def _stream(self, texts):
+        stream = MagicMock()
+        stream.__iter__.return_value = iter([MagicMock(text=text) for text in texts])
+        return stream
+
+    @patch("services.generate_answer_service.client")
+    def test_generate_answer_success(self, mock_client):
+        mock_client.models.generate_content.return_value = MagicMock(text="පිළිතුර")
+
+        response, status = generate_answer_service(self.data)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["answer"], "පිළිතුර")
+
+    @patch("services.generate_answer_service.get_jwt_identity", return_value="test@example.com")
+    @patch("services.generate_answer_service.search_passages")
+    @patch("services.generate_answer_service.client")
+    def test_generate_answer_from_notes(self, mock_client, mock_search_passages, mock_get_jwt_identity):
+        mock_search_passages.return_value = [
+            {"note_id": "n1", "title": "ජීව විද්‍යාව", "text": "ශාක ආහාර නිපදවයි."},
+            {"note_id": "n1", "title": "ජීව විද්‍යාව", "text": "හිරු එළිය අවශ්‍යයි."}
+        ]
+        mock_client.models.generate_content.return_value = MagicMock(text="පිළිතුර")
+
+        response, status = generate_answer_service(dict(self.data, mode="notes"))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["sources"], [{"note_id": "n1", "title": "ජීව විද්‍යාව"}])
+        prompt = mock_client.models.generate_content.call_args.kwargs["contents"]
+        self.assertIn("ශාක ආහාර නිපදවයි.", prompt)
+        self.assertIn(self.data["question"], prompt)
+        mock_search_passages.assert_called_once_with("test@example.com", self.data["question"], 5)
+
+    @patch("services.generate_answer_service.client")
+    def test_stream_answer_reports_latencies(self, mock_client):
+        stream = self._stream(["පිළි", "තුර"])
+        mock_client.models.generate_content_stream.return_value = stream
+
+        with self.app.app_context():
+            events = list(stream_answer_service(self.data))
+
+        self.assertEqual(len(events), 3)
+        self.assertTrue(events[0].startswith("event: chunk\n"))
+        done = json.loads(events[-1].split("data: ", 1)[1])
+        self.assertIsNotNone(done["first_token_ms"])
+        self.assertGreaterEqual(done["total_ms"], done["first_token_ms"])
+        stream.close.assert_called_once()
+
+    @patch("services.generate_answer_service.client")
+    def test_stream_answer_disconnect_closes_upstream(self, mock_client):
+        stream = self._stream(["පිළි", "තුර"])
+        mock_client.models.generate_content_stream.return_value = stream
+
+        with self.app.app_context():
+            events = stream_answer_service(self.data)
+            next(events)
+            events.close()
+
+        stream.close.assert_called_once()
+
+    @patch("services.generate_answer_service.client")
+    def test_stream_answer_error(self, mock_client):
+        mock_client.models.generate_content_stream.side_effect = Exception("quota exceeded")
+
+        with self.app.app_context():
+            events = list(stream_answer_service(self.data))
+
+        self.assertEqual(events, ['event: error\ndata: {"error": "quota exceeded"}\n\n'])
+
+if __name__ == "__main__":
+    unittest.main()
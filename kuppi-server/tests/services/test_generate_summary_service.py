@@ -0,0 +1,166 @@
+import unittest
+from unittest.mock import patch, MagicMock, ANY
+from services.generate_summary_service import generate_summary_service, stream_summary_service, summary_cache_key
+
+class TestGenerateSummaryService(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {"content": "මෙය පරීක්ෂණ සටහනකි.", "percentage": 40, "style": "casual"}
+
+    def test_cache_key_ignores_whitespace_differences(self):
+        self.assertEqual(
+            summary_cache_key("මෙය  පරීක්ෂණ\nසටහනකි. ", 40, "casual"),
+            summary_cache_key("මෙය පරීක්ෂණ සටහනකි.", 40, "casual")
+        )
+        self.assertNotEqual(
+            summary_cache_key("මෙය පරීක්ෂණ සටහනකි.", 40, "casual"),
+            summary_cache_key("මෙය පරීක්ෂණ සටහනකි.", 50, "casual")
+        )
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_generate_summary_cache_miss(self, mock_client, mock_summary_cache):
+        mock_summary_cache.get.return_value = None
+        mock_client.models.generate_content.return_value = MagicMock(text="සාරාංශය")
+
+        response, status = generate_summary_service(self.data)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["summary"], "සාරාංශය")
+        mock_client.models.generate_content.assert_called_once()
+        mock_summary_cache.set.assert_called_once()
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_empty_summaries_not_cached(self, mock_client, mock_summary_cache):
+        mock_summary_cache.get.return_value = None
+        for text in ["", None]:
+            mock_client.models.generate_content.return_value = MagicMock(text=text)
+            self.assertEqual(generate_summary_service(self.data)[1], 200)
+        stream = MagicMock()
+        stream.__iter__.return_value = iter([MagicMock(text="")])
+        mock_client.models.generate_content_stream.return_value = stream
+        list(stream_summary_service(self.data))
+
+        mock_summary_cache.set.assert_not_called()
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_generate_summary_cache_hit(self, mock_client, mock_summary_cache):
+        mock_summary_cache.get.return_value = "සාරාංශය"
+
+        response, status = generate_summary_service(self.data)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["summary"], "සාරාංශය")
+        mock_client.models.generate_content.assert_not_called()
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_generate_summary_error(self, mock_client, mock_summary_cache):
+        mock_summary_cache.get.return_value = None
+        mock_client.models.generate_content.side_effect = Exception("quota exceeded")
+
+        response, status = generate_summary_service(self.data)
+
+        self.assertEqual(status, 500)
+        self.assertEqual(response["error"], "quota exceeded")
+        mock_summary_cache.set.assert_not_called()
+
+    @patch("services.generate_summary_service.Config")
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_generate_summary_long_document_map_reduce(self, mock_client, mock_summary_cache, mock_config):
+        mock_config.SUMMARY_CHUNK_THRESHOLD_CHARS = 100
+        mock_config.SUMMARY_CHUNK_CHARS = 60
+        mock_config.SUMMARY_PRESHRINK_CHARS = 10000
+        mock_summary_cache.get.return_value = None
+        mock_client.models.generate_content.side_effect = lambda model, contents: MagicMock(text=f"summary:{len(contents)}")
+        content = "\n\n".join(["මෙය දිගු සටහනක කොටසකි. " * 2] * 4)
+
+        response, status = generate_summary_service({"content": content, "percentage": 50})
+
+        self.assertEqual(status, 200)
+        # One call per chunk plus the reduce pass
+        calls = mock_client.models.generate_content.call_args_list
+        self.assertEqual(len(calls), 5)
+        reduce_prompt = calls[-1].kwargs["contents"]
+        self.assertIn("Combine them into a single coherent summary", reduce_prompt)
+        self.assertIn(f"approximately {round(len(content.split()) * 0.5)} words", reduce_prompt)
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_stream_summary_emits_chunks(self, mock_client, mock_summary_cache):
+        mock_summary_cache.get.return_value = None
+        stream = MagicMock()
+        stream.__iter__.return_value = iter([MagicMock(text="සාරා"), MagicMock(text="ංශය")])
+        mock_client.models.generate_content_stream.return_value = stream
+
+        events = list(stream_summary_service(self.data))
+
+        self.assertEqual(events, [
+            'event: chunk\ndata: {"text": "සාරා"}\n\n',
+            'event: chunk\ndata: {"text": "ංශය"}\n\n',
+            'event: done\ndata: {"cached": false}\n\n'
+        ])
+        mock_summary_cache.set.assert_called_once_with(ANY, "සාරාංශය")
+        stream.close.assert_called_once()
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_stream_summary_disconnect_closes_upstream(self, mock_client, mock_summary_cache):
+        mock_summary_cache.get.return_value = None
+        stream = MagicMock()
+        stream.__iter__.return_value = iter([MagicMock(text="සාරා"), MagicMock(text="ංශය")])
+        mock_client.models.generate_content_stream.return_value = stream
+
+        events = stream_summary_service(self.data)
+        next(events)
+        events.close()  # What the WSGI server does when the client goes away
+
+        stream.close.assert_called_once()
+        mock_summary_cache.set.assert_not_called()
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_stream_summary_cache_hit(self, mock_client, mock_summary_cache):
+        mock_summary_cache.get.return_value = "සාරාංශය"
+
+        events = list(stream_summary_service(self.data))
+
+        self.assertEqual(len(events), 2)
+        self.assertIn('"cached": true', events[1])
+        mock_client.models.generate_content_stream.assert_not_called()
+
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_generate_summary_extractive_mode(self, mock_client, mock_summary_cache):
+        content = "ලංකාවේ තේ වගාව වැදගත්ය. තේ වගාව කඳුකරයේ පැතිරී ඇත. අද වැස්ස."
+
+        response, status = generate_summary_service({"content": content, "percentage": 50, "mode": "extractive"})
+
+        self.assertEqual(status, 200)
+        self.assertIn("තේ වගාව", response["summary"])
+        self.assertLess(len(response["summary"]), len(content))
+        mock_client.models.generate_content.assert_not_called()
+        mock_summary_cache.get.assert_not_called()
+
+    @patch("services.generate_summary_service.Config")
+    @patch("services.generate_summary_service.summary_cache")
+    @patch("services.generate_summary_service.client")
+    def test_generate_summary_preshrinks_very_long_input(self, mock_client, mock_summary_cache, mock_config):
+        mock_config.SUMMARY_CHUNK_THRESHOLD_CHARS = 100
+        mock_config.SUMMARY_CHUNK_CHARS = 1000
+        mock_config.SUMMARY_PRESHRINK_CHARS = 500
+        mock_summary_cache.get.return_value = None
+        mock_client.models.generate_content.return_value = MagicMock(text="සාරාංශය")
+        content = " ".join(f"වාක්‍යය අංක {i} ලංකාව ගැනයි." for i in range(100))
+
+        response, status = generate_summary_service({"content": content, "percentage": 50})
+
+        self.assertEqual(status, 200)
+        map_prompts = [call.kwargs["contents"] for call in mock_client.models.generate_content.call_args_list[:-1]]
+        self.assertLessEqual(sum(len(prompt.split("\n\n", 1)[1]) for prompt in map_prompts), 500)
+
+if __name__ == "__main__":
+    unittest.main()
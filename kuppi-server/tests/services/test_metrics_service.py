@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+from flask import Flask
+import metrics
+from routes.metrics_routes import metrics_bp
+from services.metrics_service import instrument_app
+from services.streaming_service import sse_response, format_sse
+
+class TestMetricsService(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        instrument_app(self.app)
+        self.app.register_blueprint(metrics_bp)
+
+        @self.app.route("/ok")
+        def ok():
+            return "ok"
+
+        @self.app.route("/stream")
+        def stream():
+            return sse_response(format_sse(number) for number in range(2))
+
+        @self.app.route("/broken")
+        def broken():
+            raise RuntimeError("boom")
+
+        self.client = self.app.test_client()
+
+    def series(self, name):
+        return dict(next(series for metric, series in metrics.collect() if metric.name == name))
+
+    @patch("services.metrics_service.Config")
+    def test_requests_counted_per_endpoint(self, mock_config):
+        mock_config.METRICS_DIR = None
+        before = self.series("http_requests_total")
+
+        self.client.get("/ok")
+        self.client.get("/broken")
+        self.client.get("/missing")
+
+        after = self.series("http_requests_total")
+        for labels in [("ok", "GET", "200"), ("broken", "GET", "500"), ("unmatched", "GET", "404")]:
+            self.assertEqual(after.get(labels, 0) - before.get(labels, 0), 1)
+        self.assertGreaterEqual(self.series("http_request_errors_total")[("broken", "GET")], 1)
+        self.assertEqual(self.series("http_requests_in_flight")[("ok",)], 0)
+
+    @patch("services.metrics_service.Config")
+    def test_streams_recorded_when_they_end(self, mock_config):
+        mock_config.METRICS_DIR = None
+        before = self.series("http_requests_total").get(("stream", "GET", "200"), 0)
+
+        response = self.client.get("/stream", buffered=False)
+        self.assertEqual(self.series("http_requests_in_flight")[("stream",)], 1)
+        self.assertEqual(response.get_data(as_text=True), format_sse(0) + format_sse(1))
+        response.close()
+
+        self.assertEqual(self.series("http_requests_in_flight")[("stream",)], 0)
+        self.assertEqual(self.series("http_requests_total")[("stream", "GET", "200")] - before, 1)
+
+    @patch("services.metrics_service.Config")
+    def test_metrics_endpoint_serves_text_format(self, mock_config):
+        mock_config.METRICS_DIR = None
+        self.client.get("/ok")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        text = response.get_data(as_text=True)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        self.assertIn('http_request_duration_seconds_count{endpoint="ok",method="GET"}', text)
+        self.assertIn("# TYPE mongo_command_duration_seconds histogram", text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch
+from bson import ObjectId
+from services.note_index_service import index_note, remove_note, search_passages, search_notes
+
+class TestNoteIndexService(unittest.TestCase):
+
+    def setUp(self):
+        self.owner = "test@example.com"
+        self.note_id = ObjectId()
+
+    @patch("services.note_index_service.note_index_stats_collection")
+    @patch("services.note_index_service.note_passages_collection")
+    def test_index_note(self, mock_passages, mock_stats):
+        index_note(self.owner, self.note_id, "ජීව විද්‍යාව", "ප්‍රභාසංශ්ලේෂණය ශාක වල සිදු වේ. ශාක ආහාර නිපදවයි.")
+
+        documents = mock_passages.insert_many.call_args[0][0]
+        self.assertEqual(len(documents), 1)
+        self.assertEqual(documents[0]["tf"]["ශාක"], 2)
+        self.assertIn("විද්යාව", documents[0]["terms"])  # Joiners are normalized away
+        mock_stats.update_one.assert_called_once_with(
+            {"_id": self.owner},
+            {"$inc": {"passage_count": 1, "total_length": documents[0]["length"]}},
+            upsert=True
+        )
+
+    @patch("services.note_index_service.note_index_stats_collection")
+    @patch("services.note_index_service.note_passages_collection")
+    def test_remove_note(self, mock_passages, mock_stats):
+        mock_passages.find.return_value = [{"_id": ObjectId(), "length": 4}, {"_id": ObjectId(), "length": 6}]
+
+        remove_note(self.owner, self.note_id)
+
+        mock_passages.delete_many.assert_called_once_with({"owner": self.owner, "note_id": self.note_id})
+        mock_stats.update_one.assert_called_once_with({"_id": self.owner}, {"$inc": {"passage_count": -2, "total_length": -10}})
+
+    @patch("services.note_index_service.note_index_stats_collection")
+    @patch("services.note_index_service.note_passages_collection")
+    def test_search_passages_ranks_by_bm25(self, mock_passages, mock_stats):
+        strong, weak = ObjectId(), ObjectId()
+        mock_stats.find_one.return_value = {"_id": self.owner, "passage_count": 10, "total_length": 100}
+        mock_passages.find.side_effect = [
+            [
+                {"_id": weak, "length": 10, "tf": {"ශාක": 1}},
+                {"_id": strong, "length": 10, "tf": {"ශාක": 2, "ප්රභාසංශ්ලේෂණය": 1}}
+            ],
+            [
+                {"_id": weak, "note_id": self.note_id, "title": "අ", "position": 1, "text": "weak"},
+                {"_id": strong, "note_id": self.note_id, "title": "අ", "position": 0, "text": "strong"}
+            ]
+        ]
+
+        results = search_passages(self.owner, "ප්‍රභාසංශ්ලේෂණය සහ ශාක", top_k=2)
+
+        self.assertEqual([result["text"] for result in results], ["strong", "weak"])
+        query, projection = mock_passages.find.call_args_list[0][0]
+        self.assertEqual(query, {"owner": self.owner, "terms": {"$in": ["ප්රභාසංශ්ලේෂණය", "ශාක"]}})
+        self.assertEqual(projection, {"note_id": 1, "length": 1, "tf.ප්රභාසංශ්ලේෂණය": 1, "tf.ශාක": 1})
+
+    @patch("services.note_index_service.note_index_stats_collection")
+    @patch("services.note_index_service.note_passages_collection")
+    def test_search_passages_without_index(self, mock_passages, mock_stats):
+        mock_stats.find_one.return_value = None
+
+        self.assertEqual(search_passages(self.owner, "ශාක", top_k=3), [])
+        mock_passages.find.assert_not_called()
+
+    @patch("services.note_index_service.note_index_stats_collection")
+    @patch("services.note_index_service.note_passages_collection")
+    def test_search_notes_ranks_notes_by_best_passage(self, mock_passages, mock_stats):
+        note_a, note_b = ObjectId(), ObjectId()
+        a1, a2, b1 = ObjectId(), ObjectId(), ObjectId()
+        mock_stats.find_one.return_value = {"_id": self.owner, "passage_count": 10, "total_length": 100}
+        mock_passages.find.side_effect = [
+            [
+                {"_id": a1, "note_id": note_a, "length": 10, "tf": {"ශාක": 1}},
+                {"_id": a2, "note_id": note_a, "length": 10, "tf": {"ශාක": 3}},
+                {"_id": b1, "note_id": note_b, "length": 10, "tf": {"ශාක": 2}}
+            ],
+            [{"_id": a2, "note_id": note_a, "title": "A", "position": 1, "text": "a2"}]
+        ]
+
+        hits, has_more = search_notes(self.owner, "ශාක", limit=1, offset=0)
+
+        self.assertEqual([hit["text"] for hit in hits], ["a2"])
+        self.assertTrue(has_more)
+        self.assertEqual(mock_passages.find.call_args_list[1][0][0], {"_id": {"$in": [a2]}})
+
+if __name__ == "__main__":
+    unittest.main()
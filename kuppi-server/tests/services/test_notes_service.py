@@ -5,24 +5,36 @@ from services.notes_service import (
     get_notes_service,
     get_note_by_id_service,
     delete_note_service,
-    delete_all_notes_service
+    delete_all_notes_service,
+    search_notes_service
 )
+from services.user_cache_service import clear_user_cache
+import services.notes_service as notes_service
 from bson import ObjectId
+import datetime
 
 class TestNotesService(unittest.TestCase):
 
     def setUp(self):
         self.email = "test@example.com"
-        self.user = {"email": self.email, "notes": []}
+        self.user = {"_id": ObjectId(), "email": self.email}
         self.note_id = "5f9f1b0b9b9b9b9b9b9b0001"
         self.title = "Test Note"
         self.content = "This is a test note. It contains multiple words for preview testing."
         self.data = {"title": self.title, "content": self.content}
         self.object_id = ObjectId(self.note_id)
-
+        # User checks go through the user cache; send its lookups to the
+        # users_collection mock of each test
+        clear_user_cache()
+        patcher = patch("services.user_cache_service.users_collection")
+        patcher.start().find_one.side_effect = lambda *args: notes_service.users_collection.find_one(*args)
+        self.addCleanup(patcher.stop)
+
+    @patch("services.notes_service.index_note")
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_add_note_service_success(self, mock_get_jwt_identity, mock_users_collection):
+    def test_add_note_service_success(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection, mock_index_note):
         mock_get_jwt_identity.return_value = self.email
         mock_users_collection.find_one.return_value = self.user
 
@@ -31,11 +43,14 @@ class TestNotesService(unittest.TestCase):
         self.assertEqual(status, 201)
         self.assertEqual(response["success"], True)
         self.assertEqual(response["message"], "Note added successfully!")
-        mock_users_collection.update_one.assert_called_once()
+        mock_notes_collection.insert_one.assert_called_once()
+        self.assertEqual(mock_notes_collection.insert_one.call_args[0][0]["owner"], self.email)
+        mock_index_note.assert_called_once_with(self.email, mock_notes_collection.insert_one.return_value.inserted_id, self.title, self.content)
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_add_note_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection):
+    def test_add_note_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
         mock_users_collection.find_one.return_value = None
 
@@ -44,9 +59,10 @@ class TestNotesService(unittest.TestCase):
         self.assertEqual(status, 404)
         self.assertEqual(response["error"], "User not found")
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_add_note_service_missing_data(self, mock_get_jwt_identity, mock_users_collection):
+    def test_add_note_service_missing_data(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
         mock_users_collection.find_one.return_value = self.user
 
@@ -55,14 +71,15 @@ class TestNotesService(unittest.TestCase):
         self.assertEqual(status, 400)
         self.assertEqual(response["error"], "Title and content are required")
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_get_notes_service_success(self, mock_get_jwt_identity, mock_users_collection):
+    def test_get_notes_service_success(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
-        mock_users_collection.find_one.return_value = {
-            "email": self.email,
-            "notes": [{"_id": self.object_id, "title": self.title, "content": self.content}]
-        }
+        mock_users_collection.find_one.return_value = self.user
+        mock_notes_collection.find.return_value.sort.return_value = [
+            {"_id": self.object_id, "title": self.title, "preview": " ".join(self.content.split(" ")[:10])}
+        ]
 
         response, status = get_notes_service()
 
@@ -72,10 +89,51 @@ class TestNotesService(unittest.TestCase):
             "title": self.title,
             "content": " ".join(self.content.split(" ")[:10])
         }])
+        self.assertIsNone(response["next_cursor"])
+        projection = mock_notes_collection.find.call_args[0][1]
+        self.assertNotIn("content", projection)
+
+    @patch("services.notes_service.notes_collection")
+    @patch("services.notes_service.users_collection")
+    @patch("services.notes_service.get_jwt_identity")
+    def test_get_notes_service_paginated(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
+        mock_get_jwt_identity.return_value = self.email
+        mock_users_collection.find_one.return_value = self.user
+        created_at = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        page = [
+            {"_id": ObjectId(), "title": f"Note {i}", "preview": "preview", "created_at": created_at}
+            for i in range(3)
+        ]
+        mock_notes_collection.find.return_value.sort.return_value.limit.return_value = page
+
+        response, status = get_notes_service(limit=2)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(response["notes"]), 2)
+        mock_notes_collection.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+        # The cursor points at the last returned note
+        response, status = get_notes_service(limit=2, after=response["next_cursor"])
+
+        query = mock_notes_collection.find.call_args[0][0]
+        self.assertEqual(query["$or"][1], {"created_at": created_at, "_id": {"$gt": page[1]["_id"]}})
+
+    @patch("services.notes_service.notes_collection")
+    @patch("services.notes_service.users_collection")
+    @patch("services.notes_service.get_jwt_identity")
+    def test_get_notes_service_invalid_cursor(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
+        mock_get_jwt_identity.return_value = self.email
+        mock_users_collection.find_one.return_value = self.user
 
+        response, status = get_notes_service(limit=2, after="not-a-cursor")
+
+        self.assertEqual(status, 400)
+        self.assertEqual(response["error"], "Invalid cursor")
+
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_get_notes_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection):
+    def test_get_notes_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
         mock_users_collection.find_one.return_value = None
 
@@ -84,12 +142,30 @@ class TestNotesService(unittest.TestCase):
         self.assertEqual(status, 404)
         self.assertEqual(response["error"], "User not found")
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_get_note_by_id_service_success(self, mock_get_jwt_identity, mock_users_collection):
+    def test_get_note_by_id_service_success(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
+        mock_users_collection.find_one.return_value = self.user
+        mock_notes_collection.find_one.return_value = {"_id": self.object_id, "title": self.title, "content": self.content}
+
+        response, status = get_note_by_id_service(self.note_id)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["note"]["_id"], self.note_id)
+        self.assertEqual(response["note"]["title"], self.title)
+        self.assertEqual(response["note"]["content"], self.content)
+        mock_users_collection.find_one.assert_not_called()
+
+    @patch("services.notes_service.notes_collection")
+    @patch("services.notes_service.users_collection")
+    @patch("services.notes_service.get_jwt_identity")
+    def test_get_note_by_id_service_embedded_fallback(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
+        mock_get_jwt_identity.return_value = self.email
+        mock_notes_collection.find_one.return_value = None
         mock_users_collection.find_one.return_value = {
-            "email": self.email,
+            "_id": self.user["_id"],
             "notes": [{"_id": self.object_id, "title": self.title, "content": self.content}]
         }
 
@@ -97,13 +173,15 @@ class TestNotesService(unittest.TestCase):
 
         self.assertEqual(status, 200)
         self.assertEqual(response["note"]["_id"], self.note_id)
-        self.assertEqual(response["note"]["title"], self.title)
-        self.assertEqual(response["note"]["content"], self.content)
+        projection = mock_users_collection.find_one.call_args[0][1]
+        self.assertEqual(projection, {"notes": {"$elemMatch": {"_id": self.object_id}}})
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_get_note_by_id_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection):
+    def test_get_note_by_id_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
+        mock_notes_collection.find_one.return_value = None
         mock_users_collection.find_one.return_value = None
 
         response, status = get_note_by_id_service(self.note_id)
@@ -111,63 +189,67 @@ class TestNotesService(unittest.TestCase):
         self.assertEqual(status, 404)
         self.assertEqual(response["error"], "User not found")
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_get_note_by_id_service_note_not_found(self, mock_get_jwt_identity, mock_users_collection):
+    def test_get_note_by_id_service_note_not_found(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
-        mock_users_collection.find_one.return_value = {"email": self.email, "notes": []}
+        mock_users_collection.find_one.return_value = self.user
+        mock_notes_collection.find_one.return_value = None
 
         response, status = get_note_by_id_service(self.note_id)
 
         self.assertEqual(status, 404)
         self.assertEqual(response["error"], "Note not found")
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_get_note_by_id_service_invalid_id(self, mock_get_jwt_identity, mock_users_collection):
+    def test_get_note_by_id_service_invalid_id(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
-        mock_users_collection.find_one.return_value = {"email": self.email, "notes": []}
+        mock_users_collection.find_one.return_value = self.user
 
         response, status = get_note_by_id_service("invalid_id")
 
         self.assertEqual(status, 400)
         self.assertEqual(response["error"], "Invalid note ID format")
 
+    @patch("services.notes_service.remove_note")
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_delete_note_service_success(self, mock_get_jwt_identity, mock_users_collection):
+    def test_delete_note_service_success(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection, mock_remove_note):
         mock_get_jwt_identity.return_value = self.email
-        mock_users_collection.find_one.return_value = {
-            "email": self.email,
-            "notes": [{"_id": self.object_id, "title": self.title, "content": self.content}]
-        }
+        mock_users_collection.find_one.return_value = self.user
 
         response, status = delete_note_service(self.note_id)
 
         self.assertEqual(status, 200)
         self.assertEqual(response["success"], True)
         self.assertEqual(response["message"], "Note deleted successfully!")
-        mock_users_collection.update_one.assert_called_once()
+        mock_notes_collection.delete_one.assert_called_once_with({"owner": self.email, "_id": self.object_id})
+        mock_remove_note.assert_called_once_with(self.email, self.object_id)
 
+    @patch("services.notes_service.remove_all_notes")
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_delete_all_notes_service_success(self, mock_get_jwt_identity, mock_users_collection):
+    def test_delete_all_notes_service_success(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection, mock_remove_all_notes):
         mock_get_jwt_identity.return_value = self.email
-        mock_users_collection.find_one.return_value = {
-            "email": self.email,
-            "notes": [{"_id": self.object_id, "title": self.title, "content": self.content}]
-        }
+        mock_users_collection.find_one.return_value = self.user
 
         response, status = delete_all_notes_service()
 
         self.assertEqual(status, 200)
         self.assertEqual(response["success"], True)
         self.assertEqual(response["message"], "All notes deleted successfully!")
-        mock_users_collection.update_one.assert_called_once()
+        mock_notes_collection.delete_many.assert_called_once_with({"owner": self.email})
+        mock_remove_all_notes.assert_called_once_with(self.email)
 
+    @patch("services.notes_service.notes_collection")
     @patch("services.notes_service.users_collection")
     @patch("services.notes_service.get_jwt_identity")
-    def test_delete_all_notes_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection):
+    def test_delete_all_notes_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection, mock_notes_collection):
         mock_get_jwt_identity.return_value = self.email
         mock_users_collection.find_one.return_value = None
 
@@ -176,6 +258,40 @@ class TestNotesService(unittest.TestCase):
         self.assertEqual(status, 404)
         self.assertEqual(response["error"], "User not found")
 
+    @patch("services.notes_service.search_notes")
+    @patch("services.notes_service.users_collection")
+    @patch("services.notes_service.get_jwt_identity")
+    def test_search_notes_service_success(self, mock_get_jwt_identity, mock_users_collection, mock_search_notes):
+        mock_get_jwt_identity.return_value = self.email
+        mock_users_collection.find_one.return_value = self.user
+        mock_search_notes.return_value = ([
+            {"note_id": self.object_id, "title": self.title, "text": "ශාක ආහාර නිපදවයි.", "score": 1.23456}
+        ], True)
+
+        response, status = search_notes_service("ශාක", 10, 2)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["results"], [{
+            "_id": self.note_id,
+            "title": self.title,
+            "snippet": "ශාක ආහාර නිපදවයි.",
+            "highlights": [[0, 3]],
+            "score": 1.2346
+        }])
+        self.assertTrue(response["has_more"])
+        mock_search_notes.assert_called_once_with(self.email, "ශාක", 10, 10)
+
+    @patch("services.notes_service.users_collection")
+    @patch("services.notes_service.get_jwt_identity")
+    def test_search_notes_service_user_not_found(self, mock_get_jwt_identity, mock_users_collection):
+        mock_get_jwt_identity.return_value = self.email
+        mock_users_collection.find_one.return_value = None
+
+        response, status = search_notes_service("ශාක", 10, 1)
+
+        self.assertEqual(status, 404)
+        self.assertEqual(response["error"], "User not found")
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,226 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from PIL import Image
+from services.cache_service import TwoTierCache
+from services.ocr_batch_service import start_batch_ocr, stream_batch_ocr
+from services.ocr_service import OCRBusyError
+from services.ocr_worker import OCRTimeoutError
+
+def parse_events(events):
+    parsed = []
+    for message in events:
+        lines = message.strip().split("\n")
+        event = lines[0][len("event: "):] if lines[0].startswith("event: ") else None
+        parsed.append((event, json.loads(lines[-1][len("data: "):])))
+    return parsed
+
+def page_image(number):
+    # Pages are told apart by their width
+    image = io.BytesIO()
+    Image.new("L", (10 + number, 20), 255).save(image, "PNG")
+    image.seek(0)
+    return image
+
+def page_number(path):
+    with Image.open(path) as image:
+        return image.width - 10
+
+def make_pdf(page_count):
+    pages = [Image.new("RGB", (200, 300), "white") for _ in range(page_count)]
+    pdf = io.BytesIO()
+    pages[0].save(pdf, "PDF", save_all=True, append_images=pages[1:])
+    pdf.seek(0)
+    return pdf
+
+@patch("services.ocr_batch_service.Config")
+class TestBatchOCRService(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.cache_collection = MagicMock()
+        self.cache_collection.find_one.return_value = None
+        for patcher in [
+            patch("services.ocr_service._get_executor", return_value=self.executor),
+            patch("services.ocr_cache_service.ocr_cache", TwoTierCache(self.cache_collection, 16, 60, 100))
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def configure(self, mock_config, workers=4):
+        mock_config.OCR_WORKERS = workers
+        mock_config.OCR_MAX_BATCH_PAGES = 5
+        mock_config.OCR_REQUEST_TIMEOUT_SECONDS = 5
+        mock_config.OCR_RETRY_AFTER_SECONDS = 5
+        mock_config.OCR_MAX_UPLOAD_BYTES = 1024 * 1024
+        mock_config.OCR_PREPROCESSING_PROFILE = "standard"
+
+    def test_pages_streamed_in_order_and_run_concurrently(self, mock_config):
+        self.configure(mock_config)
+
+        def slow_first_page(path, profile):
+            # The first page finishes last; it must still be sent first
+            number = page_number(path)
+            time.sleep(0.3 if number == 1 else 0.1)
+            return f"page-{number}"
+
+        images = [page_image(number) for number in range(1, 5)]
+        with patch("services.ocr_service.ocr_image_file", side_effect=slow_first_page):
+            batch, status = start_batch_ocr(images, None)
+            start = time.perf_counter()
+            events = parse_events(batch["events"])
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(status, 200)
+        self.assertEqual(events[:-1], [("page", {"page": n, "text": f"page-{n}"}) for n in range(1, 5)])
+        self.assertEqual(events[-1], ("done", {"pages": 4}))
+        # About the slowest page, not the sum (0.6 s) of all pages
+        self.assertLess(elapsed, 0.5)
+
+    def test_at_most_workers_pages_in_flight(self, mock_config):
+        self.configure(mock_config, workers=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def track(path, profile):
+            with lock:
+                running.append(path)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(path)
+            return "text"
+
+        images = [page_image(number) for number in range(5)]
+        with patch("services.ocr_service.ocr_image_file", side_effect=track):
+            batch, _ = start_batch_ocr(images, None)
+            list(batch["events"])
+
+        self.assertLessEqual(max(peak), 2)
+
+    def test_failed_page_reported_without_stopping_batch(self, mock_config):
+        self.configure(mock_config)
+
+        def fail_second(path, profile):
+            if page_number(path) == 2:
+                raise OCRTimeoutError("OCR timed out.")
+            return str(page_number(path))
+
+        with patch("services.ocr_service.ocr_image_file", side_effect=fail_second):
+            batch, _ = start_batch_ocr([page_image(1), page_image(2), page_image(3)], None)
+            events = parse_events(batch["events"])
+
+        self.assertEqual(events[1], ("page", {"page": 2, "error": "OCR timed out."}))
+        self.assertEqual(events[2], ("page", {"page": 3, "text": "3"}))
+
+    @patch("services.ocr_service._slots", threading.BoundedSemaphore(1))
+    def test_busy_when_batch_cannot_start(self, mock_config):
+        self.configure(mock_config)
+        release = threading.Event()
+
+        with patch("services.ocr_service.ocr_image_bytes", side_effect=lambda *_: release.wait()):
+            from services.ocr_service import submit_ocr
+            blocker = submit_ocr(b"other request")
+            batch, _ = start_batch_ocr([page_image(1)], None)
+            events = parse_events(batch["events"])
+            release.set()
+            blocker.result()
+
+        self.assertEqual(events[0][0], "error")
+        self.assertIn("busy", events[0][1]["error"])
+
+    def busy_then_free(self, busy_calls):
+        # A submit that finds the shared pool full for its first busy_calls calls
+        calls = []
+
+        def submit(text):
+            calls.append(text)
+            if 1 < len(calls) <= 1 + busy_calls:
+                raise OCRBusyError()
+            future = Future()
+            future.set_result((text, 0.1))
+            return future
+        return submit
+
+    @patch("services.ocr_batch_service.time.sleep")
+    def test_waits_for_pool_once_batch_started(self, mock_sleep, mock_config):
+        self.configure(mock_config)
+        # The first busy call only pauses submitting while page 1 is in flight
+        submit = self.busy_then_free(busy_calls=3)
+
+        events = parse_events(stream_batch_ocr([(submit, ("1",), None), (submit, ("2",), None)]))
+
+        self.assertEqual(events, [("page", {"page": 1, "text": "1"}), ("page", {"page": 2, "text": "2"}), ("done", {"pages": 2})])
+        # Backs off between retries
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [0.1, 0.2])
+
+    def test_page_reported_busy_when_pool_stays_full(self, mock_config):
+        self.configure(mock_config)
+        mock_config.OCR_REQUEST_TIMEOUT_SECONDS = 0
+        submit = self.busy_then_free(busy_calls=2)
+
+        events = parse_events(stream_batch_ocr([(submit, (str(number),), None) for number in (1, 2, 3)]))
+
+        self.assertEqual(events[0], ("page", {"page": 1, "text": "1"}))
+        self.assertEqual(events[1][1]["page"], 2)
+        self.assertIn("busy", events[1][1]["error"])
+        self.assertEqual(events[2:], [("page", {"page": 3, "text": "3"}), ("done", {"pages": 3})])
+
+    def test_pdf_pages_rendered_by_workers(self, mock_config):
+        self.configure(mock_config)
+
+        with patch("services.ocr_service.ocr_pdf_page", side_effect=lambda path, index, profile: f"page {index}") as mock_page:
+            batch, status = start_batch_ocr([], make_pdf(3))
+            events = parse_events(batch["events"])
+            path = mock_page.call_args[0][0]
+            self.assertTrue(os.path.exists(path))
+            batch["close"]()
+
+        self.assertEqual(status, 200)
+        self.assertEqual([data.get("text") for _, data in events[:-1]], ["page 0", "page 1", "page 2"])
+        self.assertFalse(os.path.exists(path))
+
+    def test_repeated_pages_served_from_cache(self, mock_config):
+        self.configure(mock_config)
+
+        with patch("services.ocr_service.ocr_pdf_page", side_effect=lambda path, index, profile: f"page {index}") as mock_page:
+            for _ in range(2):
+                batch, _ = start_batch_ocr([], make_pdf(2))
+                events = parse_events(batch["events"])
+                batch["close"]()
+
+        self.assertEqual([data.get("text") for _, data in events[:-1]], ["page 0", "page 1"])
+        self.assertEqual(mock_page.call_count, 2)
+
+    def test_rejects_invalid_uploads(self, mock_config):
+        self.configure(mock_config)
+
+        cases = [
+            ([], None, 400),
+            ([page_image(1)], make_pdf(1), 400),
+            ([page_image(number) for number in range(6)], None, 400),
+            ([], make_pdf(6), 400),
+            ([], io.BytesIO(b"not a pdf"), 400),
+            ([page_image(1), io.BytesIO(b"not an image")], None, 400),
+            ([page_image(1), io.BytesIO(b"x" * (2 * 1024 * 1024))], None, 413)
+        ]
+        with tempfile.TemporaryDirectory() as spool_directory, patch("tempfile.tempdir", spool_directory):
+            for images, pdf, expected_status in cases:
+                response, status = start_batch_ocr(images, pdf)
+                self.assertEqual(status, expected_status)
+                self.assertIn("error", response)
+                # Nothing spooled is left behind
+                self.assertEqual(os.listdir(spool_directory), [])
+
+if __name__ == "__main__":
+    unittest.main()
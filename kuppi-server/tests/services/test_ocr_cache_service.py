@@ -0,0 +1,102 @@
+import hashlib
+import io
+import random
+import unittest
+from unittest.mock import patch, MagicMock
+from PIL import Image, ImageDraw
+from services.cache_service import TwoTierCache
+from services.ocr_cache_service import (
+    perceptual_hash, hamming_distance, image_cache_key, get_cached_image_text, cache_image_text,
+    PERCEPTUAL_MAX_DISTANCE
+)
+
+def page_bytes(lines, size=(600, 800), image_format="PNG"):
+    image = Image.new("L", (600, 800), 255)
+    draw = ImageDraw.Draw(image)
+    for top, width in lines:
+        draw.rectangle([40, top, 40 + width, top + 14], fill=0)
+    buffer = io.BytesIO()
+    image.resize(size).save(buffer, image_format)
+    return buffer.getvalue()
+
+def cache_args(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest(), io.BytesIO(image_bytes)
+
+class FakeHashCollection:
+    """Just enough of a collection for the perceptual hash lookups."""
+
+    def __init__(self):
+        self.documents = {}
+
+    def update_one(self, query, update, upsert=False):
+        self.documents[query["_id"]] = dict(update["$set"], _id=query["_id"])
+
+    def find(self, query, projection):
+        bands = set(query["bands"]["$in"])
+        cursor = MagicMock()
+        cursor.limit.return_value = [document for document in self.documents.values() if bands & set(document["bands"])]
+        return cursor
+
+class TestOCRCacheService(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(1)
+        # Pages sharing one layout, so they only differ in line lengths
+        self.pages = [[(60 + 40 * row, random.randint(200, 520)) for row in range(15)] for _ in range(10)]
+        cache_collection = MagicMock()
+        cache_collection.find_one.return_value = None
+        self.hashes = FakeHashCollection()
+        for patcher in [
+            patch("services.ocr_cache_service.ocr_cache", TwoTierCache(cache_collection, 16, 60, 100)),
+            patch("services.ocr_cache_service.ocr_image_hashes_collection", self.hashes),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_perceptual_hash_close_for_reencoded_copies(self):
+        for lines in self.pages:
+            original = page_bytes(lines)
+            copy = page_bytes(lines, size=(450, 600), image_format="JPEG")
+            self.assertLessEqual(hamming_distance(perceptual_hash(io.BytesIO(original)), perceptual_hash(io.BytesIO(copy))), PERCEPTUAL_MAX_DISTANCE)
+
+    def test_perceptual_hash_far_for_different_pages(self):
+        hashes = [perceptual_hash(io.BytesIO(page_bytes(lines))) for lines in self.pages]
+        for i, first in enumerate(hashes):
+            for second in hashes[i + 1:]:
+                self.assertGreater(hamming_distance(first, second), PERCEPTUAL_MAX_DISTANCE)
+
+    def test_perceptual_hash_of_invalid_image(self):
+        self.assertIsNone(perceptual_hash(io.BytesIO(b"not an image")))
+
+    def test_key_depends_on_digest_and_settings(self):
+        key = image_cache_key("abc", "standard")
+
+        self.assertEqual(key, image_cache_key("abc", "standard"))
+        self.assertNotEqual(key, image_cache_key("abc", "full"))
+        self.assertNotEqual(key, image_cache_key("abd", "standard"))
+
+    @patch("services.ocr_cache_service.Config")
+    def test_exact_copy_hits(self, mock_config):
+        mock_config.OCR_CACHE_PERCEPTUAL = False
+        image = page_bytes(self.pages[0])
+
+        cache_image_text(*cache_args(image), "standard", "පාඨය")
+
+        self.assertEqual(get_cached_image_text(*cache_args(image), "standard"), "පාඨය")
+        self.assertIsNone(get_cached_image_text(*cache_args(image), "full"))
+        self.assertIsNone(get_cached_image_text(*cache_args(page_bytes(self.pages[0], image_format="JPEG")), "standard"))
+
+    @patch("services.ocr_cache_service.Config")
+    def test_reencoded_copy_hits_with_perceptual_hash(self, mock_config):
+        mock_config.OCR_CACHE_PERCEPTUAL = True
+        mock_config.OCR_CACHE_TTL_SECONDS = 60
+        for number, lines in enumerate(self.pages):
+            cache_image_text(*cache_args(page_bytes(lines)), "standard", f"page {number}")
+
+        copy = page_bytes(self.pages[3], size=(450, 600), image_format="JPEG")
+
+        self.assertEqual(get_cached_image_text(*cache_args(copy), "standard"), "page 3")
+        self.assertIsNone(get_cached_image_text(*cache_args(copy), "full"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import io
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timezone
+from unittest.mock import patch, MagicMock
+from bson import Binary, ObjectId
+from PIL import Image
+from services.ocr_job_service import create_ocr_job_service, get_ocr_job_service, claim_job, process_job
+from services.ocr_service import OCRBusyError
+from services.ocr_worker import OCRTimeoutError
+
+def finished_future(result=None, error=None):
+    future = Future()
+    if error:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("L", (40, 30), 255).save(buffer, "PNG")
+    return buffer.getvalue()
+
+IMAGE_BYTES = png_bytes()
+
+class TestOCRJobService(unittest.TestCase):
+
+    def setUp(self):
+        self.job_id = ObjectId()
+        patcher = patch("services.ocr_job_service.get_cached_image_text", return_value=None)
+        self.mock_get_cached_text = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("services.ocr_job_service.cache_image_text")
+        self.mock_cache_text = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("services.ocr_job_service.get_jwt_identity", return_value="test@example.com")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.job = {"_id": self.job_id, "image": Binary(b"image-bytes"), "profile": "standard", "attempts": 1}
+
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_create_job_returns_immediately(self, mock_jobs):
+        mock_jobs.insert_one.return_value = MagicMock(inserted_id=self.job_id)
+
+        response, status = create_ocr_job_service(io.BytesIO(IMAGE_BYTES))
+
+        self.assertEqual(status, 202)
+        self.assertEqual(response, {"job_id": str(self.job_id), "status": "queued"})
+        job = mock_jobs.insert_one.call_args[0][0]
+        self.assertEqual(job["status"], "queued")
+        self.assertEqual(bytes(job["image"]), IMAGE_BYTES)
+        self.assertEqual(job["owner"], "test@example.com")
+        self.assertEqual(job["expires_at"].tzinfo, timezone.utc)
+
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_create_job_done_immediately_when_cached(self, mock_jobs):
+        self.mock_get_cached_text.return_value = "සිංහල"
+        mock_jobs.insert_one.return_value = MagicMock(inserted_id=self.job_id)
+
+        response, status = create_ocr_job_service(io.BytesIO(IMAGE_BYTES))
+
+        self.assertEqual(response["status"], "done")
+        job = mock_jobs.insert_one.call_args[0][0]
+        self.assertEqual(job["text"], "සිංහල")
+        self.assertNotIn("image", job)
+
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_create_job_rejects_non_image(self, mock_jobs):
+        response, status = create_ocr_job_service(io.BytesIO(b"not an image"))
+
+        self.assertEqual(status, 400)
+        mock_jobs.insert_one.assert_not_called()
+
+    @patch("services.ocr_job_service.MAX_IMAGE_BYTES", 4)
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_create_job_rejects_large_image(self, mock_jobs):
+        response, status = create_ocr_job_service(io.BytesIO(IMAGE_BYTES))
+
+        self.assertEqual(status, 413)
+        mock_jobs.insert_one.assert_not_called()
+
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_get_job(self, mock_jobs):
+        cases = [
+            ({"status": "queued"}, {"status": "queued"}),
+            ({"status": "done", "text": "සිංහල"}, {"status": "done", "text": "සිංහල"}),
+            ({"status": "failed", "error": "OCR timed out."}, {"status": "failed", "error": "OCR timed out."}),
+        ]
+        for job, expected in cases:
+            mock_jobs.find_one.return_value = dict(job, _id=self.job_id)
+
+            response, status = get_ocr_job_service(str(self.job_id))
+
+            self.assertEqual(status, 200)
+            self.assertEqual(response, dict(expected, job_id=str(self.job_id)))
+        query, projection = mock_jobs.find_one.call_args[0]
+        self.assertEqual(query, {"_id": self.job_id, "owner": "test@example.com"})
+        # The stored image is never read back
+        self.assertNotIn("image", projection)
+
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_get_job_not_found_and_invalid_id(self, mock_jobs):
+        mock_jobs.find_one.return_value = None
+
+        self.assertEqual(get_ocr_job_service(str(self.job_id))[1], 404)
+        self.assertEqual(get_ocr_job_service("not-an-id")[1], 400)
+
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_claim_takes_queued_or_expired_jobs(self, mock_jobs):
+        claim_job()
+
+        query, update = mock_jobs.find_one_and_update.call_args[0]
+        self.assertIn({"status": "queued"}, query["$or"])
+        self.assertEqual(update["$set"]["status"], "running")
+        self.assertEqual(update["$inc"], {"attempts": 1})
+
+    @patch("services.ocr_job_service.submit_ocr", return_value=finished_future(("text", 0.5)))
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_process_job_stores_result(self, mock_jobs, mock_submit):
+        self.assertTrue(process_job(self.job))
+
+        mock_submit.assert_called_once_with(b"image-bytes", "standard")
+        self.assertEqual(self.mock_cache_text.call_args[0][2:], ("standard", "text"))
+        query, update = mock_jobs.update_one.call_args[0]
+        self.assertEqual(query, {"_id": self.job_id, "status": "running"})
+        self.assertEqual(update["$set"]["status"], "done")
+        self.assertEqual(update["$set"]["text"], "text")
+        self.assertIn("image", update["$unset"])
+
+    @patch("services.ocr_job_service.submit_ocr", return_value=finished_future(error=OCRTimeoutError("OCR timed out.")))
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_process_job_stores_failure(self, mock_jobs, mock_submit):
+        process_job(self.job)
+
+        update = mock_jobs.update_one.call_args[0][1]
+        self.assertEqual(update["$set"]["status"], "failed")
+        self.assertEqual(update["$set"]["error"], "OCR timed out.")
+
+    @patch("services.ocr_job_service.submit_ocr", side_effect=OCRBusyError())
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_process_job_requeues_when_busy(self, mock_jobs, mock_submit):
+        self.assertFalse(process_job(self.job))
+
+        update = mock_jobs.update_one.call_args[0][1]
+        self.assertEqual(update["$set"], {"status": "queued"})
+        self.assertEqual(update["$inc"], {"attempts": -1})
+
+    @patch("services.ocr_service._reset_executor")
+    @patch("services.ocr_job_service.submit_ocr", return_value=finished_future(error=BrokenProcessPool("worker died")))
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_process_job_retries_when_worker_dies(self, mock_jobs, mock_submit, mock_reset):
+        process_job(self.job)
+
+        update = mock_jobs.update_one.call_args[0][1]
+        self.assertEqual(update["$set"], {"status": "queued"})
+        self.assertNotIn("$inc", update)
+
+    @patch("services.ocr_job_service.submit_ocr")
+    @patch("services.ocr_job_service.ocr_jobs_collection")
+    def test_process_job_gives_up_after_max_attempts(self, mock_jobs, mock_submit):
+        self.job["attempts"] = 10
+
+        process_job(self.job)
+
+        mock_submit.assert_not_called()
+        self.assertEqual(mock_jobs.update_one.call_args[0][1]["$set"]["status"], "failed")
+
+if __name__ == "__main__":
+    unittest.main()
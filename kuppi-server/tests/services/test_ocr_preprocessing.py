@@ -0,0 +1,72 @@
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image, ImageDraw
+from services.ocr_preprocessing import decode, binarize, estimate_skew, deskew, preprocess, render_pdf_page
+
+class TestOCRPreprocessing(unittest.TestCase):
+
+    def setUp(self):
+        # A page of dark text-like bars
+        self.page = Image.new("L", (1200, 1600), 255)
+        draw = ImageDraw.Draw(self.page)
+        for y in range(100, 1500, 40):
+            draw.rectangle([100, y, 1100, y + 12], fill=0)
+
+    def _jpeg(self, size):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, (200, 180, 160)).save(buffer, "JPEG")
+        buffer.seek(0)
+        return buffer
+
+    def test_decode_downscales_to_target_dpi(self):
+        image = decode(self._jpeg((4000, 3000)), target_dpi=100)
+
+        self.assertEqual(image.mode, "L")
+        self.assertEqual(max(image.size), round(100 * 11.69))
+
+    def test_decode_does_not_upscale(self):
+        image = decode(self._jpeg((400, 300)), target_dpi=300)
+
+        self.assertEqual(image.size, (400, 300))
+
+    def test_binarize_handles_uneven_lighting(self):
+        background = np.tile(np.linspace(80, 250, 1200), (1600, 1)).astype(np.uint8)
+        shaded = Image.fromarray(np.minimum(background, np.asarray(self.page)))
+
+        pixels = np.asarray(binarize(shaded))
+
+        self.assertEqual(set(np.unique(pixels)), {0, 255})
+        # Text stays dark and paper turns white on both the dark and bright side
+        self.assertEqual(pixels[106, 150], 0)
+        self.assertEqual(pixels[90, 150], 255)
+        self.assertEqual(pixels[106, 1050], 0)
+        self.assertEqual(pixels[90, 1050], 255)
+
+    def test_estimate_skew(self):
+        for angle in [3, -2.5]:
+            rotated = self.page.rotate(angle, expand=True, fillcolor=255)
+            self.assertAlmostEqual(estimate_skew(rotated), angle, delta=0.5)
+            self.assertAlmostEqual(estimate_skew(deskew(rotated)), 0, delta=0.5)
+
+    def test_preprocess_none_keeps_original(self):
+        image = preprocess(self._jpeg((400, 300)), "none")
+
+        self.assertEqual((image.mode, image.size), ("RGB", (400, 300)))
+
+    def test_render_pdf_page(self):
+        # A4 page at 72 points per inch
+        pages = [Image.new("RGB", (595, 842), "white"), self.page.convert("RGB")]
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf:
+            pages[0].save(pdf, "PDF", save_all=True, append_images=pages[1:], resolution=72)
+        self.addCleanup(os.remove, pdf.name)
+
+        image = render_pdf_page(pdf.name, 0, "fast")
+
+        self.assertEqual(image.mode, "L")
+        self.assertAlmostEqual(image.height, 842 * 200 / 72, delta=2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+import io
+import os
+import pickle
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from PIL import Image
+import services.ocr_worker as ocr_worker
+from services.cache_service import TwoTierCache
+from services.ocr_service import extract_text_from_image, submit_ocr
+from services.ocr_worker import init_ocr_worker, recognize, OCRTimeoutError
+
+def png_bytes(size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new("L", size, 255).save(buffer, "PNG")
+    return buffer.getvalue()
+
+class TestOCRService(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.image_bytes = png_bytes()
+        self.image_file = io.BytesIO(self.image_bytes)
+        self.cache_collection = MagicMock()
+        self.cache_collection.find_one.return_value = None
+        patcher = patch("services.ocr_cache_service.ocr_cache", TwoTierCache(self.cache_collection, 16, 60, 100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    @patch("services.ocr_service.ocr_image_file")
+    @patch("services.ocr_service._get_executor")
+    def test_extract_text_success(self, mock_get_executor, mock_ocr_image_file):
+        mock_get_executor.return_value = self.executor
+        spooled = []
+
+        def ocr_image_file(path, profile):
+            # The worker gets the spooled upload by path
+            with open(path, "rb") as image:
+                spooled.append((path, image.read(), profile))
+            return "සිංහල පාඨය"
+
+        mock_ocr_image_file.side_effect = ocr_image_file
+
+        response, status = extract_text_from_image(self.image_file)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["text"], "සිංහල පාඨය")
+        path, contents, profile = spooled[0]
+        self.assertEqual((contents, profile), (self.image_bytes, "standard"))
+        self.assertFalse(os.path.exists(path))
+
+    @patch("services.ocr_service.submit_ocr_file")
+    def test_extract_text_rejects_bad_uploads(self, mock_submit_ocr_file):
+        cases = [
+            (io.BytesIO(b"not an image"), 400),
+            (io.BytesIO(png_bytes((9000, 9000))), 413),
+        ]
+        for image_file, expected_status in cases:
+            response, status = extract_text_from_image(image_file)
+            self.assertEqual(status, expected_status)
+            self.assertIn("error", response)
+
+        with patch("services.ocr_service.Config") as mock_config:
+            mock_config.OCR_MAX_UPLOAD_BYTES = 10
+            response, status = extract_text_from_image(io.BytesIO(self.image_bytes))
+        self.assertEqual(status, 413)
+
+        mock_submit_ocr_file.assert_not_called()
+
+    @patch("services.ocr_service._slots", threading.BoundedSemaphore(1))
+    @patch("services.ocr_service._get_executor")
+    def test_extract_text_rejects_when_queue_full(self, mock_get_executor):
+        mock_get_executor.return_value = self.executor
+        release = threading.Event()
+
+        with patch("services.ocr_service.ocr_image_bytes", side_effect=lambda *_: release.wait()):
+            future = submit_ocr(b"first")
+            response, status = extract_text_from_image(self.image_file)
+            release.set()
+            future.result()
+
+        self.assertEqual(status, 503)
+        self.assertIn("busy", response["error"])
+
+    @patch("services.ocr_service.ocr_seconds")
+    @patch("services.ocr_service._get_executor")
+    def test_duration_excludes_queueing(self, mock_get_executor, mock_ocr_seconds):
+        mock_get_executor.return_value = self.executor
+
+        def ocr(image_bytes, profile):
+            if image_bytes == b"slow":
+                time.sleep(0.2)
+                return "slow"
+            raise OCRTimeoutError("OCR timed out.")
+
+        with patch("services.ocr_service.ocr_image_bytes", side_effect=ocr):
+            slow = submit_ocr(b"slow")
+            # Waits behind the slow job in the single worker
+            queued = submit_ocr(b"queued")
+            self.assertEqual(slow.result()[0], "slow")
+            self.assertIsInstance(queued.exception(), OCRTimeoutError)
+            self.executor.shutdown(wait=True)  # Let done callbacks run
+
+        (slow_seconds, *slow_labels), (queued_seconds, *queued_labels) = [
+            observe.args for observe in mock_ocr_seconds.observe.call_args_list
+        ]
+        self.assertGreaterEqual(slow_seconds, 0.2)
+        self.assertEqual(slow_labels, ["image", "success"])
+        self.assertLess(queued_seconds, 0.1)
+        self.assertEqual(queued_labels, ["image", "failure"])
+
+    @patch("services.ocr_service.ocr_image_bytes", return_value="text")
+    @patch("services.ocr_service._get_executor")
+    def test_slot_released_after_job(self, mock_get_executor, mock_ocr_image_bytes):
+        mock_get_executor.return_value = self.executor
+        slots = threading.BoundedSemaphore(1)
+
+        with patch("services.ocr_service._slots", slots):
+            submit_ocr(b"first").result()
+            self.executor.shutdown(wait=True)  # Let done callbacks run
+
+            self.assertTrue(slots.acquire(blocking=False))
+
+    @patch("services.ocr_service.Config")
+    @patch("services.ocr_service._get_executor")
+    def test_extract_text_timeout(self, mock_get_executor, mock_config):
+        mock_config.OCR_REQUEST_TIMEOUT_SECONDS = 0.05
+        mock_config.OCR_MAX_UPLOAD_BYTES = 1024 * 1024
+        mock_config.OCR_PREPROCESSING_PROFILE = "standard"
+        mock_get_executor.return_value = self.executor
+        release = threading.Event()
+
+        with patch("services.ocr_service.ocr_image_file", side_effect=lambda *_: release.wait()):
+            response, status = extract_text_from_image(self.image_file)
+            release.set()
+
+        self.assertEqual(status, 504)
+
+    @patch("services.ocr_service._get_executor")
+    def test_extract_text_tesseract_timeout(self, mock_get_executor):
+        mock_get_executor.return_value = self.executor
+
+        with patch("services.ocr_service.ocr_image_file", side_effect=OCRTimeoutError("OCR timed out.")):
+            response, status = extract_text_from_image(self.image_file)
+
+        self.assertEqual(status, 504)
+
+    @patch("services.ocr_service.ocr_image_file", return_value="සිංහල පාඨය")
+    @patch("services.ocr_service._get_executor")
+    def test_duplicate_upload_served_from_cache(self, mock_get_executor, mock_ocr_image_file):
+        mock_get_executor.return_value = self.executor
+
+        first = extract_text_from_image(io.BytesIO(self.image_bytes))
+        with patch("services.ocr_service._slots", threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()  # Pool busy; a cached image must not need a slot
+            second = extract_text_from_image(io.BytesIO(self.image_bytes))
+
+        self.assertEqual(first, second)
+        self.assertEqual(second, ({"text": "සිංහල පාඨය"}, 200))
+        mock_ocr_image_file.assert_called_once()
+        self.cache_collection.update_one.assert_called_once()
+
+    @patch("services.ocr_service.ocr_image_file", side_effect=OCRTimeoutError("OCR timed out."))
+    @patch("services.ocr_service._get_executor")
+    def test_failures_not_cached(self, mock_get_executor, mock_ocr_image_file):
+        mock_get_executor.return_value = self.executor
+
+        extract_text_from_image(self.image_file)
+
+        self.cache_collection.update_one.assert_not_called()
+
+class TestOCRBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Image.new("L", (10, 10), 255)
+
+    def tearDown(self):
+        ocr_worker._tess_api = None
+
+    @patch("services.ocr_worker.Config")
+    @patch("services.ocr_worker.tesserocr")
+    def test_tesserocr_handle_is_reused(self, mock_tesserocr, mock_config):
+        mock_config.OCR_BACKEND = "auto"
+        mock_config.TESSERACT_PATH = None
+        mock_config.TESSDATA_PATH = "/usr/share/tesseract-ocr/5/tessdata"
+        mock_config.OCR_TIMEOUT_SECONDS = 30
+        api = mock_tesserocr.PyTessBaseAPI.return_value
+        api.Recognize.return_value = True
+        api.GetUTF8Text.return_value = "පාඨය"
+
+        init_ocr_worker()
+        texts = [recognize(self.image), recognize(self.image)]
+
+        self.assertEqual(texts, ["පාඨය", "පාඨය"])
+        mock_tesserocr.PyTessBaseAPI.assert_called_once_with(path="/usr/share/tesseract-ocr/5/tessdata", lang="sin")
+        self.assertEqual(api.SetImage.call_count, 2)
+
+    @patch("services.ocr_worker.Config")
+    @patch("services.ocr_worker.tesserocr")
+    def test_tesserocr_timeout(self, mock_tesserocr, mock_config):
+        mock_config.OCR_BACKEND = "tesserocr"
+        mock_config.TESSDATA_PATH = None
+        mock_config.TESSERACT_PATH = None
+        mock_config.OCR_TIMEOUT_SECONDS = 30
+        api = mock_tesserocr.PyTessBaseAPI.return_value
+        api.Recognize.return_value = False
+
+        init_ocr_worker()
+        with self.assertRaises(OCRTimeoutError):
+            recognize(self.image)
+
+        api.Recognize.assert_called_once_with(timeout=30000)
+        api.GetUTF8Text.assert_not_called()
+
+    @patch("services.ocr_worker.pytesseract")
+    @patch("services.ocr_worker.Config")
+    @patch("services.ocr_worker.tesserocr")
+    def test_falls_back_to_pytesseract_when_model_fails_to_load(self, mock_tesserocr, mock_config, mock_pytesseract):
+        mock_config.OCR_BACKEND = "auto"
+        mock_config.TESSERACT_PATH = None
+        mock_config.TESSDATA_PATH = None
+        mock_tesserocr.PyTessBaseAPI.side_effect = RuntimeError("Failed to init API")
+        mock_pytesseract.image_to_string.return_value = "පාඨය"
+
+        init_ocr_worker()
+
+        self.assertEqual(recognize(self.image), "පාඨය")
+        mock_pytesseract.image_to_string.assert_called_once()
+
+    @patch("services.ocr_worker.pytesseract")
+    @patch("services.ocr_worker.Config")
+    @patch("services.ocr_worker.tesserocr")
+    def test_pytesseract_backend_forced(self, mock_tesserocr, mock_config, mock_pytesseract):
+        mock_config.OCR_BACKEND = "pytesseract"
+        mock_config.TESSERACT_PATH = None
+
+        init_ocr_worker()
+        recognize(self.image)
+
+        mock_tesserocr.PyTessBaseAPI.assert_not_called()
+        mock_pytesseract.image_to_string.assert_called_once()
+
+    @patch("services.ocr_worker.pytesseract")
+    @patch("services.ocr_worker.Config")
+    def test_pytesseract_timeout_raised_as_ocr_timeout(self, mock_config, mock_pytesseract):
+        mock_config.OCR_BACKEND = "pytesseract"
+        mock_config.TESSERACT_PATH = None
+        mock_pytesseract.image_to_string.side_effect = RuntimeError("Tesseract process timeout")
+
+        init_ocr_worker()
+        with self.assertRaises(OCRTimeoutError):
+            recognize(self.image)
+        # Survives the trip back from the worker process as its own type
+        self.assertIsInstance(pickle.loads(pickle.dumps(OCRTimeoutError("OCR timed out."))), OCRTimeoutError)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import datetime
+import unittest
+from unittest.mock import MagicMock
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from services.otp_store import (
+    MemoryOTPStore, MongoOTPStore, VERIFIED, NOT_FOUND, EXPIRED, TOO_MANY_ATTEMPTS, INVALID
+)
+
+EMAIL = "test@example.com"
+
+class TestMemoryOTPStore(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.store = MemoryOTPStore(timer=lambda: self.now)
+
+    def test_cooldown_then_reissue(self):
+        self.assertTrue(self.store.issue(EMAIL, "111111", 600, 60))
+        self.assertFalse(self.store.issue(EMAIL, "222222", 600, 60))
+
+        self.now = 60
+        self.assertTrue(self.store.issue(EMAIL, "222222", 600, 60))
+        self.assertEqual(self.store.verify(EMAIL, "111111", 3), INVALID)
+        self.assertEqual(self.store.verify(EMAIL, "222222", 3), VERIFIED)
+
+    def test_verify_outcomes(self):
+        self.assertEqual(self.store.verify(EMAIL, "111111", 3), NOT_FOUND)
+
+        self.store.issue(EMAIL, "111111", 600, 60)
+        self.assertEqual([self.store.verify(EMAIL, "000000", 3) for _ in range(3)], [INVALID] * 3)
+        self.assertEqual(self.store.verify(EMAIL, "111111", 3), TOO_MANY_ATTEMPTS)
+        self.assertEqual(self.store.verify(EMAIL, "111111", 3), NOT_FOUND)
+
+        self.now = 100
+        self.store.issue(EMAIL, "111111", 600, 60)
+        self.now = 701
+        self.assertEqual(self.store.verify(EMAIL, "111111", 3), EXPIRED)
+
+    def test_delete_only_matching_otp(self):
+        self.store.issue(EMAIL, "111111", 600, 60)
+
+        self.store.delete(EMAIL, "999999")
+        self.assertEqual(self.store.verify(EMAIL, "000000", 3), INVALID)
+
+        self.store.delete(EMAIL, "111111")
+        self.assertEqual(self.store.verify(EMAIL, "111111", 3), NOT_FOUND)
+
+class TestMongoOTPStore(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = MagicMock()
+        self.store = MongoOTPStore(self.collection)
+
+    def test_issue_is_one_upsert_on_email(self):
+        self.collection.find_one_and_update.return_value = None
+
+        self.assertTrue(self.store.issue(EMAIL, "111111", 600, 60))
+
+        query, pipeline = self.collection.find_one_and_update.call_args[0][:2]
+        # Never a second document for the same email, index or not
+        self.assertEqual(query, {"email": EMAIL})
+        _, otp, keep = pipeline[0]["$set"]["otp"]["$cond"]
+        self.assertEqual((otp, keep), ({"$literal": "111111"}, "$otp"))
+        expires_at = pipeline[0]["$set"]["expires_at"]["$cond"][1]["$literal"]
+        self.assertEqual(expires_at.tzinfo, datetime.timezone.utc)
+        self.assertTrue(self.collection.find_one_and_update.call_args[1]["upsert"])
+
+    def test_issue_decided_by_previous_cooldown(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cases = [
+            ({"resend_after": (now + datetime.timedelta(seconds=30)).replace(tzinfo=None)}, False),
+            ({"resend_after": (now - datetime.timedelta(seconds=1)).replace(tzinfo=None)}, True),
+            ({}, True),
+        ]
+        for previous, expected in cases:
+            self.collection.find_one_and_update.return_value = dict(previous, _id=ObjectId())
+            self.assertEqual(self.store.issue(EMAIL, "111111", 600, 60), expected)
+
+    def test_concurrent_first_issue_hits_unique_index(self):
+        self.collection.find_one_and_update.side_effect = DuplicateKeyError("E11000 duplicate key")
+
+        self.assertFalse(self.store.issue(EMAIL, "111111", 600, 60))
+
+    def test_correct_code_consumed_in_one_round_trip(self):
+        self.collection.find_one_and_delete.return_value = {"_id": ObjectId()}
+
+        self.assertEqual(self.store.verify(EMAIL, "111111", 3), VERIFIED)
+
+        query = self.collection.find_one_and_delete.call_args[0][0]
+        self.assertEqual(query["otp"], "111111")
+        self.assertEqual(query["attempts"], {"$lt": 3})
+        self.collection.find_one_and_update.assert_not_called()
+
+    def test_wrong_code_counts_attempt(self):
+        self.collection.find_one_and_delete.return_value = None
+        expires_at = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)).replace(tzinfo=None)  # Naive, as pymongo returns it
+        self.collection.find_one_and_update.return_value = {"_id": ObjectId(), "attempts": 1, "expires_at": expires_at}
+
+        self.assertEqual(self.store.verify(EMAIL, "000000", 3), INVALID)
+        self.assertEqual(self.collection.find_one_and_update.call_args[0][1], {"$inc": {"attempts": 1}})
+        self.collection.delete_one.assert_not_called()
+
+    def test_exhausted_or_expired_otp_removed(self):
+        self.collection.find_one_and_delete.return_value = None
+        future = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+        past = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)
+        cases = [
+            ({"_id": ObjectId(), "attempts": 4, "expires_at": future}, TOO_MANY_ATTEMPTS),
+            ({"_id": ObjectId(), "attempts": 1, "expires_at": past}, EXPIRED),
+            (None, NOT_FOUND),
+        ]
+        for entry, expected in cases:
+            self.collection.find_one_and_update.return_value = entry
+            self.assertEqual(self.store.verify(EMAIL, "111111", 3), expected)
+
+        self.assertEqual(self.collection.delete_one.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+from services.password_hash_service import hash_password, verify_password, needs_rehash, PasswordHashBusyError
+
+@patch("services.password_hash_service.Config")
+class TestPasswordHashService(unittest.TestCase):
+
+    def configure(self, mock_config):
+        mock_config.PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+        mock_config.PASSWORD_HASH_TIMEOUT_SECONDS = 5
+
+    def test_hash_round_trip_with_configured_method(self, mock_config):
+        self.configure(mock_config)
+
+        password_hash = hash_password("secret")
+
+        self.assertTrue(password_hash.startswith("pbkdf2:sha256:1000$"))
+        self.assertTrue(verify_password(password_hash, "secret"))
+        self.assertFalse(verify_password(password_hash, "wrong"))
+        self.assertFalse(needs_rehash(password_hash))
+
+    def test_hash_with_other_parameters_needs_rehash(self, mock_config):
+        self.configure(mock_config)
+
+        self.assertTrue(needs_rehash(generate_password_hash("secret", method="pbkdf2:sha256:2000")))
+        self.assertTrue(needs_rehash(generate_password_hash("secret", method="scrypt:16384:8:1")))
+
+    def test_method_without_parameters_uses_werkzeug_defaults(self, mock_config):
+        self.configure(mock_config)
+        mock_config.PASSWORD_HASH_METHOD = "pbkdf2"
+
+        password_hash = hash_password("secret")
+
+        self.assertFalse(needs_rehash(password_hash))
+        self.assertFalse(needs_rehash(generate_password_hash("secret", method="pbkdf2")))
+        self.assertTrue(needs_rehash(generate_password_hash("secret", method="pbkdf2:sha256:1000")))
+
+    def test_rejects_when_queue_full(self, mock_config):
+        self.configure(mock_config)
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+
+        with patch("services.password_hash_service._executor", executor), \
+                patch("services.password_hash_service._slots", threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()  # Another request is hashing
+            with self.assertRaises(PasswordHashBusyError):
+                hash_password("secret")
+            slots.release()
+
+            self.assertTrue(verify_password(generate_password_hash("secret", method="pbkdf2:sha256:1000"), "secret"))
+            executor.shutdown(wait=True)  # Let done callbacks run
+            self.assertTrue(slots.acquire(blocking=False))
+
+    def test_slow_queue_reported_as_busy(self, mock_config):
+        self.configure(mock_config)
+        mock_config.PASSWORD_HASH_TIMEOUT_SECONDS = 0.05
+        release = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        executor.submit(release.wait)
+
+        with patch("services.password_hash_service._executor", executor):
+            with self.assertRaises(PasswordHashBusyError):
+                hash_password("secret")
+        release.set()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
-import datetime
+from services.otp_store import MemoryOTPStore, VERIFIED, NOT_FOUND
 from services.password_reset_service import (
     request_password_reset_service,
     verify_password_reset_otp_service,
@@ -12,23 +12,29 @@ from services.password_reset_service import (
 
 class TestPasswordResetService(unittest.TestCase):
 
+    def setUp(self):
+        self.now = 0
+        self.otp_store = MemoryOTPStore(timer=lambda: self.now)
+        patcher = patch("services.password_reset_service.password_reset_otp_store", self.otp_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def issue_otp(self, otp="123456"):
+        self.otp_store.issue("test@example.com", otp, OTP_EXPIRY_SECONDS, OTP_REQUEST_COOLDOWN_SECONDS)
+
     @patch("services.password_reset_service.users_collection")
-    @patch("services.password_reset_service.otp_storage_password_reset_collection")
-    @patch("services.password_reset_service.send_email")
+    @patch("services.password_reset_service.enqueue_email")
     @patch("services.password_reset_service.generate_otp", return_value="123456")
-    def test_request_password_reset_success(
-        self, mock_generate_otp, mock_send_email, mock_otp_collection, mock_users_collection
-    ):
+    def test_request_password_reset_success(self, mock_generate_otp, mock_enqueue_email, mock_users_collection):
         mock_users_collection.find_one.return_value = {"email": "test@example.com"}
-        mock_otp_collection.find_one.return_value = None
-        mock_send_email.return_value = True
+        mock_enqueue_email.return_value = True
 
         response, status_code = request_password_reset_service("test@example.com")
 
         self.assertEqual(status_code, 200)
         self.assertTrue(response["success"])
-        mock_otp_collection.update_one.assert_called_once()
-        mock_send_email.assert_called_once()
+        mock_enqueue_email.assert_called_once()
+        self.assertEqual(self.otp_store.verify("test@example.com", "123456", MAX_OTP_ATTEMPTS), VERIFIED)
 
     @patch("services.password_reset_service.users_collection")
     def test_request_password_reset_user_not_found(self, mock_users_collection):
@@ -40,13 +46,9 @@ class TestPasswordResetService(unittest.TestCase):
         self.assertIn("error", response)
 
     @patch("services.password_reset_service.users_collection")
-    @patch("services.password_reset_service.otp_storage_password_reset_collection")
-    def test_request_password_reset_cooldown(self, mock_otp_collection, mock_users_collection):
+    def test_request_password_reset_cooldown(self, mock_users_collection):
         mock_users_collection.find_one.return_value = {"email": "test@example.com"}
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "timestamp": datetime.datetime.now(),
-        }
+        self.issue_otp()
 
         response, status_code = request_password_reset_service("test@example.com")
 
@@ -54,77 +56,53 @@ class TestPasswordResetService(unittest.TestCase):
         self.assertIn("error", response)
 
     @patch("services.password_reset_service.users_collection")
-    @patch("services.password_reset_service.otp_storage_password_reset_collection")
-    @patch("services.password_reset_service.send_email", return_value=False)
-    def test_request_password_reset_email_failure(self, mock_send_email, mock_otp_collection, mock_users_collection):
+    @patch("services.password_reset_service.enqueue_email", return_value=False)
+    @patch("services.password_reset_service.generate_otp", return_value="123456")
+    def test_request_password_reset_email_failure(self, mock_generate_otp, mock_enqueue_email, mock_users_collection):
         mock_users_collection.find_one.return_value = {"email": "test@example.com"}
-        mock_otp_collection.find_one.return_value = None
 
         response, status_code = request_password_reset_service("test@example.com")
 
         self.assertEqual(status_code, 500)
         self.assertIn("error", response)
-        mock_otp_collection.delete_one.assert_called_once()
+        self.assertEqual(self.otp_store.verify("test@example.com", "123456", MAX_OTP_ATTEMPTS), NOT_FOUND)
 
-    @patch("services.password_reset_service.otp_storage_password_reset_collection")
-    def test_verify_password_reset_otp_success(self, mock_otp_collection):
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "otp": "123456",
-            "timestamp": datetime.datetime.now(),
-            "attempts": 0,
-        }
+    def test_verify_password_reset_otp_success(self):
+        self.issue_otp()
 
         response, status_code = verify_password_reset_otp_service("test@example.com", "123456")
 
         self.assertEqual(status_code, 200)
         self.assertTrue(response["success"])
-        mock_otp_collection.delete_one.assert_called_once()
+        # The OTP is single use
+        self.assertEqual(verify_password_reset_otp_service("test@example.com", "123456")[1], 400)
 
-    @patch("services.password_reset_service.otp_storage_password_reset_collection")
-    def test_verify_password_reset_otp_expired(self, mock_otp_collection):
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "otp": "123456",
-            "timestamp": datetime.datetime.now() - datetime.timedelta(seconds=OTP_EXPIRY_SECONDS + 1),
-            "attempts": 0,
-        }
+    def test_verify_password_reset_otp_expired(self):
+        self.issue_otp()
+        self.now += OTP_EXPIRY_SECONDS + 1
 
         response, status_code = verify_password_reset_otp_service("test@example.com", "123456")
 
         self.assertEqual(status_code, 400)
-        self.assertIn("error", response)
-        mock_otp_collection.delete_one.assert_called_once()
+        self.assertIn("expired", response["error"])
 
-    @patch("services.password_reset_service.otp_storage_password_reset_collection")
-    def test_verify_password_reset_otp_too_many_attempts(self, mock_otp_collection):
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "otp": "123456",
-            "timestamp": datetime.datetime.now(),
-            "attempts": MAX_OTP_ATTEMPTS,
-        }
+    def test_verify_password_reset_otp_too_many_attempts(self):
+        self.issue_otp()
+        for _ in range(MAX_OTP_ATTEMPTS):
+            verify_password_reset_otp_service("test@example.com", "654321")
 
         response, status_code = verify_password_reset_otp_service("test@example.com", "123456")
 
         self.assertEqual(status_code, 403)
         self.assertIn("error", response)
-        mock_otp_collection.delete_one.assert_called_once()
 
-    @patch("services.password_reset_service.otp_storage_password_reset_collection")
-    def test_verify_password_reset_otp_invalid(self, mock_otp_collection):
-        mock_otp_collection.find_one.return_value = {
-            "email": "test@example.com",
-            "otp": "123456",
-            "timestamp": datetime.datetime.now(),
-            "attempts": 1,
-        }
+    def test_verify_password_reset_otp_invalid(self):
+        self.issue_otp()
 
         response, status_code = verify_password_reset_otp_service("test@example.com", "654321")
 
         self.assertEqual(status_code, 400)
-        self.assertIn("error", response)
-        mock_otp_collection.update_one.assert_called_once()
+        self.assertIn("Invalid", response["error"])
 
     @patch("services.password_reset_service.users_collection")
     def test_reset_password_success(self, mock_users_collection):
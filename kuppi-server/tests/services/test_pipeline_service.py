@@ -0,0 +1,88 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+from services.pipeline_service import ocr_summary_pipeline
+
+def parse_events(events):
+    parsed = []
+    for message in events:
+        lines = message.strip().split("\n")
+        parsed.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+    return parsed
+
+def summary(*events):
+    def fake_summary_events(data):
+        yield from events
+    return fake_summary_events
+
+class TestPipelineService(unittest.TestCase):
+
+    def setUp(self):
+        self.image_file = io.BytesIO(b"image-bytes")
+        self.options = {"percentage": 40, "style": "casual", "mode": None, "include_text": False, "save": False, "title": None}
+
+    @patch("services.pipeline_service.add_note_service")
+    @patch("services.pipeline_service.summary_events", side_effect=summary(("chunk", {"text": "සාරාං"}), ("chunk", {"text": "ශය"}), ("done", {"cached": False})))
+    @patch("services.pipeline_service.extract_text_from_image", return_value=({"text": "සිංහල පාඨය"}, 200))
+    def test_ocr_then_summary(self, mock_extract, mock_summary_events, mock_add_note):
+        events = parse_events(ocr_summary_pipeline(self.image_file, self.options))
+
+        self.assertEqual(
+            [(event, data.get("stage"), data.get("status")) for event, data in events],
+            [
+                ("stage", "ocr", "running"), ("stage", "ocr", "done"),
+                ("stage", "summary", "running"), ("chunk", None, None), ("chunk", None, None),
+                ("stage", "summary", "done"), ("done", None, None)
+            ]
+        )
+        # The OCR text goes straight into the summary, not back to the client
+        self.assertNotIn("text", events[1][1])
+        mock_summary_events.assert_called_once_with({"content": "සිංහල පාඨය", "percentage": 40, "style": "casual", "mode": None})
+        mock_add_note.assert_not_called()
+        self.assertFalse(events[-1][1]["saved"])
+
+    @patch("services.pipeline_service.add_note_service", return_value=({"success": True}, 201))
+    @patch("services.pipeline_service.summary_events", side_effect=summary(("chunk", {"text": "සාරාංශය"}), ("done", {"cached": True})))
+    @patch("services.pipeline_service.extract_text_from_image", return_value=({"text": "සිංහල පාඨය"}, 200))
+    def test_saves_summary_as_note(self, mock_extract, mock_summary_events, mock_add_note):
+        self.options.update(save=True, title="රසායනය", include_text=True)
+
+        events = parse_events(ocr_summary_pipeline(self.image_file, self.options))
+
+        mock_add_note.assert_called_once_with({"title": "රසායනය", "content": "සාරාංශය"})
+        self.assertEqual(events[1][1]["text"], "සිංහල පාඨය")
+        self.assertIn(("stage", {"stage": "save", "status": "done"}), events)
+        self.assertTrue(events[-1][1]["saved"])
+
+    @patch("services.pipeline_service.summary_events")
+    @patch("services.pipeline_service.extract_text_from_image", return_value=({"error": "OCR service is busy. Please try again shortly."}, 503))
+    def test_ocr_failure_stops_pipeline(self, mock_extract, mock_summary_events):
+        events = parse_events(ocr_summary_pipeline(self.image_file, self.options))
+
+        self.assertEqual(events[-1][0], "error")
+        self.assertEqual(events[-1][1]["stage"], "ocr")
+        self.assertIn("retry_after", events[-1][1])
+        mock_summary_events.assert_not_called()
+
+    @patch("services.pipeline_service.add_note_service")
+    @patch("services.pipeline_service.summary_events", side_effect=summary(("error", {"error": "quota exceeded"})))
+    @patch("services.pipeline_service.extract_text_from_image", return_value=({"text": "සිංහල පාඨය"}, 200))
+    def test_summary_failure_not_saved(self, mock_extract, mock_summary_events, mock_add_note):
+        self.options.update(save=True, title="රසායනය")
+
+        events = parse_events(ocr_summary_pipeline(self.image_file, self.options))
+
+        self.assertEqual(events[-1], ("error", {"error": "quota exceeded", "stage": "summary"}))
+        mock_add_note.assert_not_called()
+
+    @patch("services.pipeline_service.summary_events")
+    @patch("services.pipeline_service.extract_text_from_image", return_value=({"text": "  \n"}, 200))
+    def test_blank_image(self, mock_extract, mock_summary_events):
+        events = parse_events(ocr_summary_pipeline(self.image_file, self.options))
+
+        self.assertEqual(events[-1][0], "error")
+        mock_summary_events.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
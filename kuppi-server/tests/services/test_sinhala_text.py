@@ -0,0 +1,51 @@
+import unittest
+from services.sinhala_text import split_sentences, split_paragraphs, chunk_text, tokenize, highlight_snippet
+
+class TestSinhalaText(unittest.TestCase):
+
+    def test_split_sentences(self):
+        text = "ශ්‍රී ලංකාව දූපතකි. එය ඉන්දියන් සාගරයේ පිහිටා ඇත? ඔව්!\nනව පේළිය"
+
+        self.assertEqual(split_sentences(text), [
+            "ශ්‍රී ලංකාව දූපතකි.",
+            "එය ඉන්දියන් සාගරයේ පිහිටා ඇත?",
+            "ඔව්!",
+            "නව පේළිය"
+        ])
+
+    def test_split_sentences_keeps_decimal_numbers(self):
+        self.assertEqual(split_sentences("අගය 3.14 වේ. ඊළඟ වාක්‍යය"), ["අගය 3.14 වේ.", "ඊළඟ වාක්‍යය"])
+
+    def test_split_paragraphs(self):
+        self.assertEqual(split_paragraphs("පළමු ඡේදය\n\n\nදෙවන ඡේදය\n"), ["පළමු ඡේදය", "දෙවන ඡේදය"])
+
+    def test_chunk_text_respects_max_chars(self):
+        paragraph = " ".join(["මෙය වාක්‍යයකි."] * 20)
+        text = "\n\n".join([paragraph] * 5)
+
+        chunks = chunk_text(text, 200)
+
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        self.assertTrue(all(chunk.endswith(".") for chunk in chunks))
+        self.assertEqual("".join(chunks).replace(" ", "").replace("\n", ""), text.replace(" ", "").replace("\n", ""))
+
+    def test_chunk_text_packs_short_paragraphs(self):
+        self.assertEqual(chunk_text("අ\n\nආ\n\nඇ", 100), ["අ\n\nආ\n\nඇ"])
+
+    def test_chunk_text_splits_overlong_sentence(self):
+        self.assertEqual(chunk_text("අ" * 25, 10), ["අ" * 10, "අ" * 10, "අ" * 5])
+
+    def test_tokenize_normalizes_joiners_and_drops_stop_words(self):
+        self.assertEqual(tokenize("ශ්‍රී ලංකාව සහ ශ්රී Lanka"), ["ශ්රී", "ලංකාව", "ශ්රී", "lanka"])
+
+    def test_highlight_snippet_matches_joiner_variants(self):
+        text = " ".join(["වෙනත්"] * 40) + " ශ්‍රී ලංකාව " + " ".join(["තවත්"] * 40)
+
+        snippet, highlights = highlight_snippet(text, tokenize("ශ්රී"), 80)
+
+        self.assertTrue(snippet.startswith("…") and snippet.endswith("…"))
+        self.assertLessEqual(len(snippet), 82)
+        self.assertEqual([snippet[start:end] for start, end in highlights], ["ශ්‍රී"])
+
+if __name__ == "__main__":
+    unittest.main()
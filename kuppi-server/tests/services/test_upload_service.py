@@ -0,0 +1,69 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import Image
+from services.upload_service import spool_upload, sniff_image, UploadError
+
+def image_bytes(size, image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("L", size, 255).save(buffer, image_format)
+    return buffer.getvalue()
+
+class ChunkCounter(io.BytesIO):
+    """Records the largest read, to show uploads are copied in chunks."""
+
+    largest_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.largest_read = max(self.largest_read, len(data))
+        return data
+
+class TestUploadService(unittest.TestCase):
+
+    def test_spool_upload_copies_in_chunks(self):
+        contents = os.urandom(3 * 1024 * 1024)
+        upload = ChunkCounter(contents)
+
+        path, digest = spool_upload(upload, 4 * 1024 * 1024)
+        self.addCleanup(os.remove, path)
+
+        with open(path, "rb") as spooled:
+            self.assertEqual(spooled.read(), contents)
+        self.assertEqual(len(digest), 64)
+        self.assertLessEqual(upload.largest_read, 1024 * 1024)
+
+    def test_spool_upload_stops_past_limit(self):
+        with tempfile.TemporaryDirectory() as spool_directory, patch("tempfile.tempdir", spool_directory):
+            with self.assertRaises(UploadError) as raised:
+                spool_upload(io.BytesIO(os.urandom(3 * 1024 * 1024)), 1024 * 1024)
+
+            self.assertEqual(raised.exception.status_code, 413)
+            # The partial file is removed
+            self.assertEqual(os.listdir(spool_directory), [])
+
+    def test_sniff_accepts_common_formats(self):
+        for image_format in ["PNG", "JPEG", "WEBP", "TIFF"]:
+            sniff_image(io.BytesIO(image_bytes((40, 30), image_format)))
+
+    def test_sniff_rejects_other_formats_and_garbage(self):
+        for data in [image_bytes((40, 30), "GIF"), b"not an image", b""]:
+            with self.assertRaises(UploadError) as raised:
+                sniff_image(io.BytesIO(data))
+            self.assertEqual(raised.exception.status_code, 400)
+
+    @patch("services.upload_service.Config")
+    def test_sniff_rejects_huge_dimensions_without_decoding(self, mock_config):
+        mock_config.OCR_MAX_IMAGE_PIXELS = 1000
+        data = image_bytes((100, 100))
+
+        with patch.object(Image.Image, "load", side_effect=AssertionError("decoded")):
+            with self.assertRaises(UploadError) as raised:
+                sniff_image(io.BytesIO(data))
+
+        self.assertEqual(raised.exception.status_code, 413)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import patch
+from cachetools import TTLCache
+from services.user_cache_service import get_user, invalidate_user, clear_user_cache
+
+@patch("services.user_cache_service.users_collection")
+class TestUserCacheService(unittest.TestCase):
+
+    def setUp(self):
+        clear_user_cache()
+
+    def test_user_cached_after_first_lookup(self, mock_users_collection):
+        mock_users_collection.find_one.return_value = {"email": "test@example.com", "name": "Test User"}
+
+        first = get_user("test@example.com")
+        second = get_user("test@example.com")
+
+        self.assertEqual(first, second)
+        self.assertEqual(second["name"], "Test User")
+        mock_users_collection.find_one.assert_called_once()
+        # Never loads the password hash or embedded notes
+        projection = mock_users_collection.find_one.call_args[0][1]
+        self.assertEqual(projection, {"_id": 0, "email": 1, "name": 1})
+
+    def test_missing_user_not_cached(self, mock_users_collection):
+        mock_users_collection.find_one.return_value = None
+        self.assertIsNone(get_user("new@example.com"))
+
+        mock_users_collection.find_one.return_value = {"email": "new@example.com", "name": "New User"}
+        self.assertEqual(get_user("new@example.com")["name"], "New User")
+
+    def test_invalidate_forces_lookup(self, mock_users_collection):
+        mock_users_collection.find_one.return_value = {"email": "test@example.com", "name": "Old Name"}
+        get_user("test@example.com")
+
+        mock_users_collection.find_one.return_value = {"email": "test@example.com", "name": "New Name"}
+        invalidate_user("test@example.com")
+
+        self.assertEqual(get_user("test@example.com")["name"], "New Name")
+        self.assertEqual(mock_users_collection.find_one.call_count, 2)
+
+    def test_entries_expire(self, mock_users_collection):
+        mock_users_collection.find_one.return_value = {"email": "test@example.com", "name": "Test User"}
+        now = [0]
+        with patch("services.user_cache_service._users", TTLCache(maxsize=10, ttl=60, timer=lambda: now[0])):
+            get_user("test@example.com")
+            now[0] = 61
+            get_user("test@example.com")
+
+        self.assertEqual(mock_users_collection.find_one.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import metrics
+from db import CommandMetrics, PoolMetrics
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("metrics._registry", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_histogram_buckets_sum_and_count(self):
+        latency = metrics.histogram("test_seconds", "Test latency", ("route",), buckets=(0.1, 1))
+        for value in [0.05, 0.1, 0.5, 3]:
+            latency.observe(value, "/notes")
+
+        series = latency.snapshot()[("/notes",)]
+        # Bounds are inclusive; 3 s falls in the overflow bucket
+        self.assertEqual(series["buckets"], [2, 1, 1])
+        self.assertAlmostEqual(series["sum"], 3.65)
+        self.assertEqual(series["count"], 4)
+
+    def test_counter_and_registry(self):
+        requests = metrics.counter("test_total", "Test count", ("status",))
+        self.assertIs(metrics.counter("test_total", "Test count", ("status",)), requests)
+        with self.assertRaises(ValueError):
+            metrics.histogram("test_total", "Clashing name")
+        with self.assertRaises(ValueError):
+            requests.inc()  # Missing label
+
+        threads = [threading.Thread(target=lambda: [requests.inc("200") for _ in range(1000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(requests.snapshot(), {("200",): 4000})
+        self.assertEqual([metric.name for metric, _ in metrics.collect()], ["test_total"])
+
+    def test_timed_records_outcome_and_in_flight(self):
+        latency = metrics.histogram("call_seconds", "Call latency", ("operation", "outcome"))
+        in_flight = metrics.gauge("calls_in_flight", "Calls in progress", ("dependency",))
+
+        with metrics.timed(latency, "answer", gauge=in_flight, gauge_labels=("gemini",)):
+            self.assertEqual(in_flight.snapshot(), {("gemini",): 1})
+        with self.assertRaises(RuntimeError):
+            with metrics.timed(latency, "answer"):
+                raise RuntimeError("quota exceeded")
+
+        def stream():
+            with metrics.timed(latency, "answer_stream"):
+                yield "chunk"
+                yield "chunk"
+        chunks = stream()
+        next(chunks)
+        chunks.close()  # Client went away mid-stream
+
+        self.assertEqual(sorted(latency.snapshot()), [
+            ("answer", "failure"), ("answer", "success"), ("answer_stream", "cancelled")
+        ])
+        self.assertEqual(in_flight.snapshot(), {("gemini",): 0})
+
+    def test_render_text_format(self):
+        latency = metrics.histogram("request_seconds", "Request latency", ("endpoint",), buckets=(0.1, 1))
+        latency.observe(0.05, "notes.get_notes")
+        latency.observe(0.5, "notes.get_notes")
+        metrics.counter("requests_total", "Requests", ("status",)).inc('say "hi"\n')
+
+        text = metrics.render(metrics.families())
+
+        self.assertEqual(text.splitlines(), [
+            "# HELP request_seconds Request latency",
+            "# TYPE request_seconds histogram",
+            'request_seconds_bucket{endpoint="notes.get_notes",le="0.1"} 1',
+            'request_seconds_bucket{endpoint="notes.get_notes",le="1"} 2',
+            'request_seconds_bucket{endpoint="notes.get_notes",le="+Inf"} 2',
+            'request_seconds_sum{endpoint="notes.get_notes"} 0.55',
+            'request_seconds_count{endpoint="notes.get_notes"} 2',
+            "# HELP requests_total Requests",
+            "# TYPE requests_total counter",
+            'requests_total{status="say \\"hi\\"\\n"} 1',
+        ])
+
+    def test_snapshots_merged_across_workers(self):
+        latency = metrics.histogram("request_seconds", "Request latency", (), buckets=(1,))
+        requests = metrics.counter("requests_total", "Requests")
+        in_flight = metrics.gauge("in_flight", "In flight")
+        latency.observe(0.5)
+        requests.inc()
+        in_flight.inc()
+
+        def other_worker(pid, written_at):
+            return {"pid": pid, "written_at": written_at, "families": [
+                {"name": "request_seconds", "kind": "histogram", "description": "Request latency", "label_names": [],
+                 "buckets": [1], "series": [[[], {"buckets": [0, 1], "sum": 2.0, "count": 1}]]},
+                {"name": "requests_total", "kind": "counter", "description": "Requests", "label_names": [], "series": [[[], 2]]},
+                {"name": "in_flight", "kind": "gauge", "description": "In flight", "label_names": [], "series": [[[], 3]]},
+            ]}
+
+        with tempfile.TemporaryDirectory() as directory:
+            metrics.write_snapshot(directory)
+            metrics.write_snapshot(directory)
+            self.assertEqual(os.listdir(directory), [metrics._snapshot_name()])
+            self.assertTrue(metrics._snapshot_name().startswith(f"{os.getpid()}-"))
+            # 101 is a dead worker's pid, reused by a live one
+            for name, pid, written_at in [("101-a", 101, 1.0), ("101-b", 101, 2.0), ("102-c", 102, 1.0)]:
+                with open(os.path.join(directory, f"{name}.json"), "w") as snapshot:
+                    json.dump(other_worker(pid, written_at), snapshot)
+            # Worker 102 has exited: its totals stay, its gauges do not
+            with patch("metrics._process_alive", side_effect=lambda pid: pid == 101):
+                merged = {family["name"]: family["series"] for family in metrics.read_snapshots(directory)}
+
+        self.assertEqual(merged["requests_total"], [[[], 7]])
+        self.assertEqual(merged["in_flight"], [[[], 4]])
+        self.assertEqual(merged["request_seconds"], [[[], {"buckets": [1, 3], "sum": 6.5, "count": 4}]])
+
+class TestMongoListeners(unittest.TestCase):
+
+    def command_event(self, command_name, command=None, request_id=1, duration_micros=2500):
+        return SimpleNamespace(
+            command_name=command_name, command=command or {}, connection_id=("localhost", 27017),
+            request_id=request_id, duration_micros=duration_micros
+        )
+
+    @patch("db.mongo_command_seconds")
+    def test_commands_recorded_by_collection(self, mock_histogram):
+        listener = CommandMetrics()
+
+        listener.started(self.command_event("find", {"find": "notes"}))
+        listener.succeeded(self.command_event("find"))
+        listener.started(self.command_event("getMore", {"getMore": 123, "collection": "notes"}, request_id=2))
+        listener.failed(self.command_event("getMore", request_id=2))
+
+        self.assertEqual(mock_histogram.observe.call_args_list[0][0], (0.0025, "notes", "find", "success"))
+        self.assertEqual(mock_histogram.observe.call_args_list[1][0], (0.0025, "notes", "getMore", "failure"))
+        self.assertEqual(listener._collections, {})
+
+    @patch("db.mongo_pool_wait_seconds")
+    def test_pool_checkout_waits_recorded(self, mock_histogram):
+        listener = PoolMetrics()
+
+        listener.connection_checked_out(SimpleNamespace(duration=0.002))
+        listener.connection_check_out_failed(SimpleNamespace(duration=5.0, reason="timeout"))
+
+        self.assertEqual([call[0] for call in mock_histogram.observe.call_args_list], [(0.002, "success"), (5.0, "timeout")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Drains the asynchronous OCR job queue outside the API processes.
+
+Lets OCR capacity scale separately from the API: run as many of these as
+needed (on any machine that can reach MongoDB) and set
+OCR_JOB_EMBEDDED_WORKERS=0 for the API. Run from the kuppi-server
+directory:
+
+    python -m workers.ocr_job_worker --threads 4
+
+Each thread handles one job at a time in this process's OCR pool
+(OCR_WORKERS processes). Stops after the current jobs on SIGINT or SIGTERM.
+"""
+import argparse
+import signal
+import threading
+from config import Config
+from db import ensure_indexes
+from services.ocr_job_service import start_job_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=Config.OCR_WORKERS, help="jobs processed at once")
+    args = parser.parse_args()
+
+    ensure_indexes()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    threads = start_job_workers(args.threads, stop_event)
+    print(f"OCR job worker started with {args.threads} threads")
+    while not stop_event.wait(1):
+        pass
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()